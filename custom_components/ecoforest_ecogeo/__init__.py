@@ -1,50 +1,121 @@
 import logging
 
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
-from homeassistant.const import CONF_HOST, CONF_PASSWORD, CONF_USERNAME, Platform
+from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.const import Platform
 from homeassistant.exceptions import ConfigEntryNotReady
-from pyecoforest.exceptions import EcoforestAuthenticationRequired, EcoforestConnectionError
+from homeassistant.helpers import config_validation as cv, entity_registry as er
+from homeassistant.helpers.storage import Store
+from homeassistant.helpers.typing import ConfigType
+from pyecoforest.exceptions import EcoforestAuthenticationRequired
 
-from .const import DOMAIN
-from .coordinator import EcoforestCoordinator
-from .overrides.api import EcoGeoApi
+from .const import CONF_OPENMETRICS, DATA_CATALOG, DATA_SCHEDULER, DOMAIN, STORAGE_VERSION
+from .coordinator import EcoforestCoordinator, create_api
+from .overrides.catalog import alarm_descriptions, catalog_mapping, load_catalog
+from .scheduler import PollScheduler
+from .services import async_setup_services
+from .view import async_register_view
 
-PLATFORMS = [Platform.SENSOR, Platform.SWITCH, Platform.NUMBER, Platform.BUTTON]
+PLATFORMS = [Platform.SENSOR, Platform.BINARY_SENSOR, Platform.SWITCH, Platform.NUMBER, Platform.BUTTON]
 
 
 _LOGGER = logging.getLogger(__name__)
 
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
 
-async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
-    """Set up Ecoforest from a config entry."""
-
-    api = EcoGeoApi(entry.data[CONF_HOST], entry.data[CONF_USERNAME], entry.data[CONF_PASSWORD])
-
-    try:
-        device = await api.get()
-        _LOGGER.debug("Ecoforest: %s", device)
-    except EcoforestAuthenticationRequired:
-        _LOGGER.error("Authentication on device")
-        return False
-    except EcoforestConnectionError as err:
-        _LOGGER.error("Error communicating with device")
-        raise ConfigEntryNotReady from err
 
-    coordinator = EcoforestCoordinator(hass, api)
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    """Set up the Ecoforest services."""
+    async_setup_services(hass)
+    return True
 
-    await coordinator.async_config_entry_first_refresh()
 
-    hass.data.setdefault(DOMAIN, {})[entry.entry_id] = coordinator
+async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
+    """Set up Ecoforest from a config entry."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if DATA_SCHEDULER not in domain_data:
+        domain_data[DATA_SCHEDULER] = PollScheduler(hass)
+    scheduler: PollScheduler = domain_data[DATA_SCHEDULER]
+    if DATA_CATALOG not in domain_data:
+        domain_data[DATA_CATALOG] = await hass.async_add_executor_job(load_catalog)
+    catalog = domain_data[DATA_CATALOG]
+
+    api = create_api(entry.data, limiter=scheduler.limiter)
+    api.alarm_descriptions = alarm_descriptions(catalog)
+
+    coordinator = EcoforestCoordinator(hass, api, catalog_mapping(catalog))
+    coordinator.apply_options(entry.options)
+    # entities enabled in an earlier run are polled from the first refresh on
+    coordinator.async_update_poll_set(entry.entry_id)
+
+    if await coordinator.async_load_store(_store(hass, entry)):
+        # the entities come up with the values of the last run, the device confirms them in the background
+        entry.async_create_background_task(hass, coordinator.async_refresh(), f"{DOMAIN} {entry.entry_id} refresh")
+    else:
+        await coordinator.async_refresh()
+        if not coordinator.last_update_success:
+            await api.close()
+            if isinstance(coordinator.last_exception.__cause__, EcoforestAuthenticationRequired):
+                _LOGGER.error("Authentication on device")
+                return False
+            raise ConfigEntryNotReady from coordinator.last_exception
+
+    domain_data[entry.entry_id] = coordinator
+    scheduler.async_register(entry.entry_id, coordinator)
+    if entry.options.get(CONF_OPENMETRICS):
+        async_register_view(hass)
+
+    @callback
+    def _async_registry_updated(event: Event) -> None:
+        action = event.data["action"]
+        if action == "update" and "disabled_by" not in event.data.get("changes", {}):
+            return
+        # the registry reports the entities of every integration, skip the ones of other entries
+        if action == "remove":
+            if event.data["entity_id"] not in coordinator.catalog_entity_ids:
+                return
+        else:
+            entity = er.async_get(hass).async_get(event.data["entity_id"])
+            if entity is None or entity.config_entry_id != entry.entry_id:
+                return
+        coordinator.async_update_poll_set(entry.entry_id)
+
+    entry.async_on_unload(hass.bus.async_listen(er.EVENT_ENTITY_REGISTRY_UPDATED, _async_registry_updated))
+    entry.async_on_unload(entry.add_update_listener(_async_options_updated))
 
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
 
     return True
 
 
+async def _async_options_updated(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Apply changed options."""
+    coordinator: EcoforestCoordinator = hass.data[DOMAIN][entry.entry_id]
+    coordinator.apply_options(entry.options)
+    if entry.options.get(CONF_OPENMETRICS):
+        async_register_view(hass)
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     if unload_ok := await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
-        hass.data[DOMAIN].pop(entry.entry_id)
+        scheduler: PollScheduler = hass.data[DOMAIN][DATA_SCHEDULER]
+        scheduler.async_unregister(entry.entry_id)
+        if not scheduler.devices:
+            hass.data[DOMAIN].pop(DATA_SCHEDULER)
+            hass.data[DOMAIN].pop(DATA_CATALOG)
+
+        coordinator: EcoforestCoordinator = hass.data[DOMAIN].pop(entry.entry_id)
+        await coordinator.async_save_store()
+        await coordinator.api.close()
 
     return unload_ok
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Remove the stored metrics and snapshot of a removed entry."""
+    await _store(hass, entry).async_remove()
+
+
+def _store(hass: HomeAssistant, entry: ConfigEntry) -> Store:
+    return Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry.entry_id}")
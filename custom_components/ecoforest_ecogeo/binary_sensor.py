@@ -0,0 +1,37 @@
+"""Binary sensor platform for Ecoforest."""
+
+from __future__ import annotations
+
+from homeassistant.components.binary_sensor import BinarySensorEntity
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_ALIAS
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+
+from .const import DOMAIN
+from .coordinator import EcoforestCoordinator
+from .entity import EcoforestEntity
+
+
+async def async_setup_entry(
+    hass: HomeAssistant, config_entry: ConfigEntry, async_add_entities: AddEntitiesCallback
+) -> None:
+    """Set up the Ecoforest binary sensor platform."""
+    coordinator: EcoforestCoordinator = hass.data[DOMAIN][config_entry.entry_id]
+
+    device_alias = config_entry.data[CONF_ALIAS] if CONF_ALIAS in config_entry.data else None
+    # the Registers.csv coils, disabled until somebody enables them
+    entities = [
+        EcoforestBinarySensor(coordinator, key, definition, device_alias) for key, definition in coordinator.catalog.items() if definition["entity_type"] == "binary"
+    ]
+
+    async_add_entities(entities)
+
+
+class EcoforestBinarySensor(EcoforestEntity, BinarySensorEntity):
+    """Representation of an Ecoforest coil."""
+
+    @property
+    def is_on(self) -> bool | None:
+        """Return the state of the coil."""
+        return self.data.state.get(self.entity_description.key)
@@ -57,4 +57,3 @@ class EcoforestButtonEntity(EcoforestEntity, ButtonEntity):
     async def async_press(self) -> None:
         """Button press."""
         await self.coordinator.api.turn_switch(self.entity_description.key, True)
-        await self.coordinator.async_request_refresh()
@@ -8,15 +8,37 @@ from typing import Any
 from pyecoforest.exceptions import EcoforestAuthenticationRequired
 import voluptuous as vol
 
-from homeassistant.config_entries import ConfigFlow, ConfigFlowResult
-from homeassistant.const import CONF_HOST, CONF_PASSWORD, CONF_USERNAME, CONF_ALIAS
-
-from .const import DOMAIN, MANUFACTURER
-from .overrides.api import EcoGeoApi
+from homeassistant.config_entries import ConfigEntry, ConfigFlow, ConfigFlowResult, OptionsFlow
+from homeassistant.const import CONF_HOST, CONF_PASSWORD, CONF_PORT, CONF_USERNAME, CONF_ALIAS
+from homeassistant.core import callback
+
+from .const import (
+    ACTIVE_POLLING_INTERVAL,
+    ACTIVE_POWER,
+    CONF_ACTIVE_INTERVAL,
+    CONF_ACTIVE_POWER,
+    CONF_IDLE_CYCLES,
+    CONF_IDLE_INTERVAL,
+    CONF_MAX_STALE_AGE,
+    CONF_OPENMETRICS,
+    CONF_POWER_HYSTERESIS,
+    CONF_TRANSPORT,
+    CONF_UNIT_ID,
+    DOMAIN,
+    IDLE_CYCLES,
+    IDLE_POLLING_INTERVAL,
+    MANUFACTURER,
+    POWER_HYSTERESIS,
+    TRANSPORT_EASYNET,
+    TRANSPORT_MODBUS,
+)
+from .coordinator import create_api
+from .overrides.api import MAX_STALE_AGE
+from .overrides.transport import MODBUS_PORT, MODBUS_UNIT_ID
 
 _LOGGER = logging.getLogger(__name__)
 
-STEP_USER_DATA_SCHEMA = vol.Schema(
+STEP_EASYNET_DATA_SCHEMA = vol.Schema(
     {
         vol.Required(CONF_HOST): str,
         vol.Required(CONF_USERNAME): str,
@@ -25,34 +47,63 @@ STEP_USER_DATA_SCHEMA = vol.Schema(
     }
 )
 
+STEP_MODBUS_DATA_SCHEMA = vol.Schema(
+    {
+        vol.Required(CONF_HOST): str,
+        vol.Required(CONF_PORT, default=MODBUS_PORT): vol.All(vol.Coerce(int), vol.Range(min=1, max=65535)),
+        vol.Required(CONF_UNIT_ID, default=MODBUS_UNIT_ID): vol.All(vol.Coerce(int), vol.Range(min=0, max=255)),
+        vol.Optional(CONF_ALIAS): str,
+    }
+)
+
 
 class EcoForestEcoGeoConfigFlow(ConfigFlow, domain=DOMAIN):
     """Handle a config flow for Ecoforest."""
 
     VERSION = 1
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry: ConfigEntry) -> OptionsFlow:
+        """Get the options flow for this handler."""
+        return EcoforestOptionsFlow(config_entry)
+
     async def async_step_user(
         self, user_input: dict[str, Any] | None = None
     ) -> ConfigFlowResult:
-        """Handle the initial step."""
+        """Handle the initial step, pick how to talk to the heat pump."""
+        return self.async_show_menu(step_id="user", menu_options=[TRANSPORT_EASYNET, TRANSPORT_MODBUS])
+
+    async def async_step_easynet(
+        self, user_input: dict[str, Any] | None = None
+    ) -> ConfigFlowResult:
+        """Set up over the Easynet web interface."""
+        return await self._async_step_transport(TRANSPORT_EASYNET, STEP_EASYNET_DATA_SCHEMA, user_input)
+
+    async def async_step_modbus(
+        self, user_input: dict[str, Any] | None = None
+    ) -> ConfigFlowResult:
+        """Set up over Modbus TCP."""
+        return await self._async_step_transport(TRANSPORT_MODBUS, STEP_MODBUS_DATA_SCHEMA, user_input)
+
+    async def _async_step_transport(
+        self, transport: str, schema: vol.Schema, user_input: dict[str, Any] | None
+    ) -> ConfigFlowResult:
         errors: dict[str, str] = {}
 
         if user_input is not None:
+            user_input = {**user_input, CONF_TRANSPORT: transport}
+            api = create_api(user_input)
             try:
-                api = EcoGeoApi(
-                    user_input[CONF_HOST],
-                    user_input[CONF_USERNAME],
-                    user_input[CONF_PASSWORD],
-                )
-                device = await api.get()
+                model_name = await api.get_model_name()
             except EcoforestAuthenticationRequired:
                 errors["base"] = "invalid_auth"
             except Exception:
                 _LOGGER.exception("Unexpected exception")
                 errors["base"] = "cannot_connect"
             else:
-                device_id = device.model_name
-                title = f"{MANUFACTURER} {device.model_name}"
+                device_id = model_name
+                title = f"{MANUFACTURER} {model_name}"
 
                 if CONF_ALIAS in user_input:
                     device_id = user_input[CONF_ALIAS]
@@ -65,9 +116,67 @@ class EcoForestEcoGeoConfigFlow(ConfigFlow, domain=DOMAIN):
                     title=title,
                     data=user_input
                 )
+            finally:
+                await api.close()
 
         return self.async_show_form(
-            step_id="user",
-            data_schema=STEP_USER_DATA_SCHEMA,
+            step_id=transport,
+            data_schema=schema,
             errors=errors,
         )
+
+
+class EcoforestOptionsFlow(OptionsFlow):
+    """Handle the adaptive polling options."""
+
+    def __init__(self, config_entry: ConfigEntry) -> None:
+        """Initialize options flow."""
+        self._config_entry = config_entry
+
+    async def async_step_init(
+        self, user_input: dict[str, Any] | None = None
+    ) -> ConfigFlowResult:
+        """Manage the polling bounds."""
+        errors: dict[str, str] = {}
+
+        if user_input is not None:
+            if user_input[CONF_ACTIVE_INTERVAL] > user_input[CONF_IDLE_INTERVAL]:
+                errors["base"] = "invalid_bounds"
+            else:
+                return self.async_create_entry(title="", data=user_input)
+
+        options = self._config_entry.options
+        schema = vol.Schema(
+            {
+                vol.Required(
+                    CONF_ACTIVE_INTERVAL,
+                    default=options.get(CONF_ACTIVE_INTERVAL, int(ACTIVE_POLLING_INTERVAL.total_seconds())),
+                ): vol.All(vol.Coerce(int), vol.Range(min=1, max=3600)),
+                vol.Required(
+                    CONF_IDLE_INTERVAL,
+                    default=options.get(CONF_IDLE_INTERVAL, int(IDLE_POLLING_INTERVAL.total_seconds())),
+                ): vol.All(vol.Coerce(int), vol.Range(min=1, max=3600)),
+                vol.Required(
+                    CONF_ACTIVE_POWER,
+                    default=options.get(CONF_ACTIVE_POWER, ACTIVE_POWER),
+                ): vol.All(vol.Coerce(int), vol.Range(min=0)),
+                vol.Required(
+                    CONF_POWER_HYSTERESIS,
+                    default=options.get(CONF_POWER_HYSTERESIS, POWER_HYSTERESIS),
+                ): vol.All(vol.Coerce(float), vol.Range(min=0, max=1)),
+                vol.Required(
+                    CONF_IDLE_CYCLES,
+                    default=options.get(CONF_IDLE_CYCLES, IDLE_CYCLES),
+                ): vol.All(vol.Coerce(int), vol.Range(min=1, max=1000)),
+                vol.Required(
+                    CONF_MAX_STALE_AGE,
+                    default=options.get(CONF_MAX_STALE_AGE, MAX_STALE_AGE),
+                ): vol.All(vol.Coerce(int), vol.Range(min=0)),
+                vol.Required(
+                    CONF_OPENMETRICS,
+                    default=options.get(CONF_OPENMETRICS, False),
+                ): bool,
+            }
+        )
+
+        return self.async_show_form(step_id="init", data_schema=schema, errors=errors)
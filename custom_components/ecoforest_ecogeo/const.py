@@ -4,3 +4,49 @@ DOMAIN = "ecoforest_ecogeo"
 MANUFACTURER = "Ecoforest"
 
 POLLING_INTERVAL = timedelta(seconds=30)
+SLOW_POLLING_INTERVAL = timedelta(minutes=5)
+
+# the poll interval adapts to the decoded state, these are the defaults of the options
+CONF_ACTIVE_INTERVAL = "active_interval"
+CONF_IDLE_INTERVAL = "idle_interval"
+CONF_ACTIVE_POWER = "active_power"
+CONF_IDLE_CYCLES = "idle_cycles"
+CONF_POWER_HYSTERESIS = "power_hysteresis"
+# seconds the last good values of a failing register block are kept
+CONF_MAX_STALE_AGE = "max_stale_age"
+# wire protocol of the entry, entries created before there was a choice use Easynet
+CONF_TRANSPORT = "transport"
+TRANSPORT_EASYNET = "easynet"
+TRANSPORT_MODBUS = "modbus"
+# Modbus unit identifier of the controller
+CONF_UNIT_ID = "unit_id"
+
+# serve the device on the OpenMetrics endpoint
+CONF_OPENMETRICS = "openmetrics"
+# while the compressor runs or an alarm is raised
+ACTIVE_POLLING_INTERVAL = timedelta(seconds=5)
+# once the pump has been idle for IDLE_CYCLES polls in a row
+IDLE_POLLING_INTERVAL = timedelta(minutes=2)
+IDLE_CYCLES = 10
+# power_electric in W from which the pump counts as running
+ACTIVE_POWER = 150
+# it only counts as stopped again below this share of ACTIVE_POWER
+POWER_HYSTERESIS = 0.5
+
+# the store of an entry (metrics and device snapshot) is saved at most this often, in seconds
+STORE_SAVE_DELAY = 60
+STORAGE_VERSION = 1
+
+# burst captures and register scans are written to this directory of the configuration
+CAPTURE_DIRECTORY = "ecoforest_captures"
+
+# key of the Registers.csv catalog in hass.data[DOMAIN], loaded once for all entries
+DATA_CATALOG = "catalog"
+# key of the PollScheduler shared by all entries in hass.data[DOMAIN]
+DATA_SCHEDULER = "scheduler"
+# set in hass.data[DOMAIN] once the OpenMetrics view is registered, views can't be removed
+DATA_OPENMETRICS_VIEW = "openmetrics_view"
+# requests in flight across all devices
+MAX_IN_FLIGHT_REQUESTS = 8
+# random delay added to each poll, as a share of the spacing between devices
+POLL_JITTER = 0.1
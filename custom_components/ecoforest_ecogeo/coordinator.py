@@ -1,39 +1,304 @@
 """The ecoforest coordinator."""
 
 import logging
+from collections.abc import Mapping
+from datetime import timedelta
+from time import monotonic, time
+from typing import Any
 
 from pyecoforest.exceptions import EcoforestError
 
-from homeassistant.core import HomeAssistant
+from homeassistant.const import CONF_HOST, CONF_PASSWORD, CONF_PORT, CONF_USERNAME
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.storage import Store
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
 
-from .overrides.api import EcoGeoApi
+from .overrides.api import MAPPING, MAX_STALE_AGE, EcoGeoApi, PollTiers
+from .overrides.capture import BurstCapture
 from .overrides.device import EcoGeoDevice
-from .const import POLLING_INTERVAL
+from .overrides.metrics import MetricsEngine
+from .overrides.transport import MODBUS_PORT, MODBUS_UNIT_ID, ModbusTransport
+from .const import (
+    ACTIVE_POLLING_INTERVAL,
+    ACTIVE_POWER,
+    CONF_ACTIVE_INTERVAL,
+    CONF_ACTIVE_POWER,
+    CONF_IDLE_CYCLES,
+    CONF_IDLE_INTERVAL,
+    CONF_MAX_STALE_AGE,
+    CONF_POWER_HYSTERESIS,
+    CONF_TRANSPORT,
+    CONF_UNIT_ID,
+    IDLE_CYCLES,
+    IDLE_POLLING_INTERVAL,
+    POLLING_INTERVAL,
+    POWER_HYSTERESIS,
+    SLOW_POLLING_INTERVAL,
+    STORE_SAVE_DELAY,
+    TRANSPORT_EASYNET,
+    TRANSPORT_MODBUS,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
 
+def create_api(data: Mapping[str, Any], **kwargs: Any) -> EcoGeoApi:
+    """Build the api of a config entry's data, over the transport it was set up with."""
+    if data.get(CONF_TRANSPORT, TRANSPORT_EASYNET) == TRANSPORT_MODBUS:
+        transport = ModbusTransport(data[CONF_HOST], data.get(CONF_PORT, MODBUS_PORT), data.get(CONF_UNIT_ID, MODBUS_UNIT_ID))
+        return EcoGeoApi(data[CONF_HOST], transport=transport, **kwargs)
+
+    return EcoGeoApi(data[CONF_HOST], data[CONF_USERNAME], data[CONF_PASSWORD], **kwargs)
+
+
 class EcoforestCoordinator(DataUpdateCoordinator[EcoGeoDevice]):
     """DataUpdateCoordinator to gather data from ecoforest device."""
 
-    def __init__(self, hass: HomeAssistant, api: EcoGeoApi) -> None:
+    def __init__(self, hass: HomeAssistant, api: EcoGeoApi, catalog: dict[str, dict] | None = None) -> None:
         """Initialize DataUpdateCoordinator."""
 
+        # polls are timed by the PollScheduler shared by all entries, not by the coordinator itself
         super().__init__(
             hass,
             _LOGGER,
             name="ecoforest_ecogeo",
-            update_interval=POLLING_INTERVAL,
+            update_interval=None,
         )
         self.api = api
+        # the coordinator publishes the device of a write batch, the entities that wrote only wait for it
+        api.on_written = self.async_set_updated_data
+        self.poll_interval = POLLING_INTERVAL
+        # seconds the last poll started after its planned slot
+        self.poll_lag = 0.0
+        self.active_interval = ACTIVE_POLLING_INTERVAL
+        self.idle_interval = IDLE_POLLING_INTERVAL
+        self.active_power = ACTIVE_POWER
+        self.power_hysteresis = POWER_HYSTERESIS
+        self.idle_cycles = IDLE_CYCLES
+        self._active = False
+        self._idle_cycles = 0
+        # the fast tier is read on every poll, whatever the poll interval currently is
+        self.tier_intervals = {
+            PollTiers.Slow: SLOW_POLLING_INTERVAL,
+        }
+        self._last_polled: dict[str, float] = {}
+        # MAPPING like definitions of the Registers.csv entities, only the enabled ones are polled
+        self.catalog = catalog or {}
+        self._catalog_polled: set[str] = set()
+        # entity ids of the enabled catalog entities, a removed one is no longer in the registry to be looked up
+        self.catalog_entity_ids: set[str] = set()
+        self.deadbands = {name: definition["deadband"] for name, definition in MAPPING.items() if "deadband" in definition}
+        # state values the listeners were last called back with
+        self._published: dict[str, Any] | None = None
+        self._published_stale: dict[str, float] = {}
+        self._published_success = False
+        # energy totals and COP, persisted in the store set by async_load_store
+        self.metrics = MetricsEngine()
+        self._store: Store | None = None
+        self._save_scheduled = False
+        # wall clock time of the data, kept in the snapshot
+        self._read_time: float | None = None
+        # running burst capture, the scheduler doesn't poll meanwhile
+        self.capture: BurstCapture | None = None
+
+    def apply_options(self, options: Mapping[str, Any]) -> None:
+        """Take the adaptive polling bounds and threshold from the config entry options."""
+        self.active_interval = timedelta(seconds=options.get(CONF_ACTIVE_INTERVAL, ACTIVE_POLLING_INTERVAL.total_seconds()))
+        self.idle_interval = timedelta(seconds=options.get(CONF_IDLE_INTERVAL, IDLE_POLLING_INTERVAL.total_seconds()))
+        self.active_power = options.get(CONF_ACTIVE_POWER, ACTIVE_POWER)
+        self.power_hysteresis = options.get(CONF_POWER_HYSTERESIS, POWER_HYSTERESIS)
+        self.idle_cycles = options.get(CONF_IDLE_CYCLES, IDLE_CYCLES)
+        self.api.max_stale_age = options.get(CONF_MAX_STALE_AGE, MAX_STALE_AGE)
+        self.poll_interval = self._bounded(self.poll_interval)
+
+    def _bounded(self, interval: timedelta) -> timedelta:
+        return min(max(interval, self.active_interval), self.idle_interval)
+
+    def _adapt_poll_interval(self, state: dict[str, Any]) -> None:
+        """Poll fast while the compressor runs or an alarm is raised, slow once idle for a while."""
+        power = state.get("power_electric") or 0
+        # the threshold to stop is lower than the one to start, a pump hovering around it doesn't flap
+        threshold = self.active_power * self.power_hysteresis if self._active else self.active_power
+        self._active = power >= threshold or bool(state.get("alarm"))
+
+        if self._active:
+            self._idle_cycles = 0
+            interval = self.active_interval
+        else:
+            self._idle_cycles += 1
+            interval = self.idle_interval if self._idle_cycles >= self.idle_cycles else POLLING_INTERVAL
+
+        interval = self._bounded(interval)
+        if interval != self.poll_interval:
+            _LOGGER.debug("Polling every %s", interval)
+            self.poll_interval = interval
+
+    def _due_tiers(self, now: float) -> list[str]:
+        """Return the poll tiers whose interval has elapsed."""
+        # ticks never land exactly on the interval, allow half a tick of slack
+        slack = self.poll_interval.total_seconds() / 2
+
+        return [PollTiers.Fast] + [
+            tier
+            for tier, interval in self.tier_intervals.items()
+            if tier not in self._last_polled
+            or now - self._last_polled[tier] >= interval.total_seconds() - slack
+        ]
+
+    @callback
+    def async_update_poll_set(self, entry_id: str) -> None:
+        """Poll the catalog registers whose entities are enabled in the entity registry."""
+        registry = er.async_get(self.hass)
+        enabled = set()
+        entity_ids = set()
+
+        for entity in er.async_entries_for_config_entry(registry, entry_id):
+            # unique ids are <device id>_<key> and catalog keys are reg_<address> / coil_<address>
+            key = "_".join(entity.unique_id.rsplit("_", 2)[-2:])
+            if key in self.catalog and entity.disabled_by is None:
+                enabled.add(key)
+                entity_ids.add(entity.entity_id)
+
+        self.catalog_entity_ids = entity_ids
+
+        if enabled == self._catalog_polled:
+            return
+
+        _LOGGER.debug("Polling %d catalog registers", len(enabled))
+        self._catalog_polled = enabled
+        self.api.set_extra_mapping({key: self.catalog[key] for key in sorted(enabled)})
 
     async def _async_update_data(self) -> EcoGeoDevice:
-        """Fetch all device and sensor data from api."""
+        """Fetch the device and sensor data of the tiers that are due from api."""
+        now = monotonic()
+        tiers = self._due_tiers(now)
+
         try:
-            data = await self.api.get()
+            data = await self.api.get(tiers)
         except EcoforestError as err:
+            self.api.telemetry.record_poll(monotonic() - now, False)
             raise UpdateFailed(f"Error communicating with API: {err}") from err
 
+        self.api.telemetry.record_poll(monotonic() - now, True)
+
+        for tier in tiers:
+            self._last_polled[tier] = now
+
+        self._adapt_poll_interval(data.state)
+
+        data.state.update(self.metrics.update(time(), data.state, data.stale))
+        self._read_time = time()
+        self._async_schedule_save()
+
         _LOGGER.debug("Ecoforest data: %s", data)
         return data
+
+    async def async_load_store(self, store: Store) -> bool:
+        """Restore the metrics and the device of the last run, return whether there was a device.
+
+        The restored values are stale since the snapshot was taken, or blank if
+        it is older than max_stale_age, until the next refresh confirms them.
+        """
+        self._store = store
+        if (stored := await store.async_load()) is None:
+            return False
+
+        self.metrics.restore(stored["metrics"])
+        if (snapshot := stored.get("snapshot")) is None:
+            return False
+
+        read_time = snapshot["time"]
+        state = snapshot["state"]
+        if time() - read_time > self.api.max_stale_age:
+            state = dict.fromkeys(state)
+        stale = {
+            key: snapshot["stale"].get(key, read_time)
+            for key, value in state.items()
+            if value is not None and key not in self.metrics.values
+        }
+        state.update(self.metrics.values)
+        # JSON has no int keys
+        alarms = {int(address): description for address, description in snapshot["alarms"].items()}
+
+        self.data = EcoGeoDevice.build(snapshot["model_name"], state, stale, alarms)
+        self._read_time = read_time
+        return True
+
+    @callback
+    def _async_schedule_save(self) -> None:
+        # Store postpones a pending delayed save on every call, polls come faster than the delay
+        if self._store is None or self._save_scheduled:
+            return
+        self._save_scheduled = True
+        self._store.async_delay_save(self._stored_data, STORE_SAVE_DELAY)
+
+    def _stored_data(self) -> dict[str, Any]:
+        self._save_scheduled = False
+        snapshot = None
+        if self.data is not None:
+            snapshot = {
+                "time": self._read_time,
+                "model_name": self.data.model_name,
+                "state": self.data.state,
+                "stale": self.data.stale,
+                "alarms": self.data.alarms,
+            }
+        return {"metrics": self.metrics.as_dict(), "snapshot": snapshot}
+
+    async def async_save_store(self) -> None:
+        if self._store is not None:
+            await self._store.async_save(self._stored_data())
+
+    @callback
+    def async_set_updated_data(self, data: EcoGeoDevice) -> None:
+        """Publish a device decoded after a write, it carries no metrics of its own."""
+        data.state.update(self.metrics.values)
+        self._read_time = time()
+        self._async_schedule_save()
+        super().async_set_updated_data(data)
+
+    @callback
+    def async_update_listeners(self) -> None:
+        """Call back only the entities whose state key changed since they were last updated."""
+        changed = self._changed_keys()
+
+        for update_callback, context in list(self._listeners.values()):
+            if changed is None or context is None or context in changed:
+                update_callback()
+
+    def _changed_keys(self) -> set[str] | None:
+        """Diff the state against what was last published, None means every listener is due."""
+        state = self.data.state if self.data is not None else None
+
+        if state is None or self._published is None or self.last_update_success != self._published_success:
+            # first data or availability changed, everybody has to write its state
+            self._published = dict(state) if state is not None else None
+            self._published_stale = dict(self.data.stale) if state is not None else {}
+            self._published_success = self.last_update_success
+            return None
+
+        changed = set()
+        for key, value in state.items():
+            if key in self._published and not self._differs(key, self._published[key], value):
+                continue
+            changed.add(key)
+            self._published[key] = value
+
+        # keys that went stale or fresh again have to update their attributes
+        changed |= self.data.stale.keys() ^ self._published_stale.keys()
+        # the first alarm may stay the same while others are raised or cleared
+        if self.data.alarms_changed:
+            changed.add("alarm")
+        self._published_stale = dict(self.data.stale)
+
+        return changed
+
+    def _differs(self, key: str, old: Any, new: Any) -> bool:
+        """Compare a value with the published one, ignoring changes within the key's deadband."""
+        deadband = self.deadbands.get(key)
+
+        if deadband is None or old is None or new is None:
+            return old != new
+
+        return abs(new - old) >= deadband
@@ -0,0 +1,42 @@
+"""Diagnostics support for Ecoforest."""
+
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_PASSWORD, CONF_USERNAME
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+from .coordinator import EcoforestCoordinator
+from .overrides.api import block_label
+
+# the username is the heat pump's serial number
+TO_REDACT = {CONF_PASSWORD, CONF_USERNAME}
+# latest raw history rows of every block in the download
+HISTORY_ROWS = 120
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    coordinator: EcoforestCoordinator = hass.data[DOMAIN][entry.entry_id]
+    data = coordinator.data
+
+    return {
+        "entry": async_redact_data(entry.as_dict(), TO_REDACT),
+        "polling": {
+            "last_update_success": coordinator.last_update_success,
+            "poll_interval": coordinator.poll_interval.total_seconds(),
+            "poll_lag": coordinator.poll_lag,
+            "requests": coordinator.api.request_plan,
+        },
+        "telemetry": coordinator.api.telemetry.as_dict(),
+        "history": coordinator.api.history.as_dict(block_label, HISTORY_ROWS),
+        "device": {
+            "model_name": data.model_name,
+            "state": data.state,
+            "stale": data.stale,
+        } if data is not None else None,
+    }
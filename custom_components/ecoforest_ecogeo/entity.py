@@ -6,11 +6,12 @@ from collections.abc import Callable
 from dataclasses import dataclass
 
 from homeassistant.components.sensor import SensorDeviceClass, SensorEntityDescription, SensorStateClass
-from homeassistant.const import UnitOfTemperature, UnitOfPower, UnitOfPressure
+from homeassistant.const import UnitOfEnergy, UnitOfTemperature, UnitOfPower, UnitOfPressure
 from homeassistant.helpers.device_registry import DeviceInfo
 from homeassistant.helpers.entity import EntityDescription, generate_entity_id
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 from homeassistant.helpers.typing import StateType
+from homeassistant.util import dt as dt_util
 
 from .const import DOMAIN, MANUFACTURER
 from .coordinator import EcoforestCoordinator
@@ -21,6 +22,7 @@ SENSOR_TYPES = {
     "temperature": {"class": SensorDeviceClass.TEMPERATURE, "unit": UnitOfTemperature.CELSIUS},
     "pressure": {"class": SensorDeviceClass.PRESSURE, "unit": UnitOfPressure.BAR},
     "power": {"class": SensorDeviceClass.POWER, "unit": UnitOfPower.WATT},
+    "energy": {"class": SensorDeviceClass.ENERGY, "unit": UnitOfEnergy.KILO_WATT_HOUR, "state_class": SensorStateClass.TOTAL_INCREASING},
     "measurement": {"state_class": SensorStateClass.MEASUREMENT},
     "enum": {"class": SensorDeviceClass.ENUM}
 }
@@ -36,6 +38,8 @@ class EcoforestEntity(CoordinatorEntity[EcoforestCoordinator]):
     """Common Ecoforest entity using CoordinatorEntity."""
 
     _attr_has_entity_name = True
+    # not backed by a state key, updated on every refresh
+    _update_always = False
 
     def __init__(
         self,
@@ -46,18 +50,24 @@ class EcoforestEntity(CoordinatorEntity[EcoforestCoordinator]):
     ) -> None:
         """Initialize device information."""
 
+        if "name" in definition:
+            # Registers.csv catalog entries have no translation and start disabled
+            naming = {"name": definition["name"], "entity_registry_enabled_default": False}
+        else:
+            naming = {"translation_key": key}
+
         if definition["entity_type"] in SENSOR_TYPES.keys():
             self.entity_description = EcoforestSensorEntityDescription(
                 key=key,
-                translation_key=key,
-                native_unit_of_measurement = SENSOR_TYPES[definition["entity_type"]]["unit"] if "unit" in SENSOR_TYPES[definition["entity_type"]].keys() else None,
+                native_unit_of_measurement = SENSOR_TYPES[definition["entity_type"]]["unit"] if "unit" in SENSOR_TYPES[definition["entity_type"]].keys() else definition.get("unit"),
                 device_class = SENSOR_TYPES[definition["entity_type"]]["class"] if "class" in SENSOR_TYPES[definition["entity_type"]].keys() else None,
-                state_class=SENSOR_TYPES[definition["entity_type"]]["state_class"] if "state_class" in SENSOR_TYPES[definition["entity_type"]].keys() else None
+                state_class=SENSOR_TYPES[definition["entity_type"]]["state_class"] if "state_class" in SENSOR_TYPES[definition["entity_type"]].keys() else None,
+                **naming
             )
         else:
             self.entity_description = EcoforestSensorEntityDescription(
                 key=key,
-                translation_key=key
+                **naming
             )
 
         device_id = coordinator.data.model_name if device_alias is None else device_alias
@@ -67,7 +77,8 @@ class EcoforestEntity(CoordinatorEntity[EcoforestCoordinator]):
         self._attr_unique_id = id
         self.entity_id = f"sensor.{id}"
 
-        super().__init__(coordinator)
+        # the coordinator only calls back entities whose key changed, or every time without a key
+        super().__init__(coordinator, context=None if self._update_always else key)
 
 
         self._attr_device_info = DeviceInfo(
@@ -77,6 +88,15 @@ class EcoforestEntity(CoordinatorEntity[EcoforestCoordinator]):
             manufacturer=MANUFACTURER,
         )
 
+    @property
+    def extra_state_attributes(self) -> dict[str, str] | None:
+        """Tell when the value was read if the device failed to report it since."""
+        stale = self.data.stale.get(self.entity_description.key)
+        if stale is None:
+            return None
+
+        return {"stale_since": dt_util.utc_from_timestamp(stale).isoformat()}
+
     @property
     def data(self) -> EcoGeoDevice:
         """Return ecoforest data."""
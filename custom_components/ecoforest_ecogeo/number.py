@@ -81,4 +81,3 @@ class EcoforestNumberEntity(EcoforestEntity, NumberEntity):
     async def async_set_native_value(self, value: float):
          """Set the value."""
          await self.coordinator.api.set_numeric_value(self.entity_description.key, value)
-         await self.coordinator.async_request_refresh()
@@ -0,0 +1,50 @@
+"""Evaluate every alarm coil with one AND per coil block."""
+
+from array import array
+from collections.abc import Iterable
+
+from custom_components.ecoforest_ecogeo.overrides.planner import plan_blocks
+
+
+class AlarmIndex:
+    """Bitmasks of the alarm coils, one per block of neighbouring alarm coils.
+
+    Coils are kept one byte per address, so a block of the coil array read as a
+    little endian integer has bit 8 * i set when the coil at start + i is on.
+    The mask of a block sets exactly those bits for its alarm coils, a single
+    AND tells whether any alarm of the block is raised and which ones.
+    """
+
+    def __init__(self, addresses: Iterable[int]) -> None:
+        addresses = sorted(set(addresses))
+        # (start, end, mask) of every block
+        self.blocks: list[tuple[int, int, int]] = []
+
+        for block in plan_blocks(addresses):
+            start = block["address"]
+            end = start + block["length"]
+            mask = 0
+            for address in addresses:
+                if start <= address < end:
+                    mask |= 1 << (8 * (address - start))
+            self.blocks.append((start, end, mask))
+
+    def active(self, coils: array) -> tuple[int, ...]:
+        """Addresses of the raised alarms, in ascending order."""
+        active = ()
+
+        for start, end, mask in self.blocks:
+            hits = int.from_bytes(coils[start:end], "little") & mask
+            if hits:
+                active += self._addresses(start, hits)
+
+        return active
+
+    @staticmethod
+    def _addresses(start: int, hits: int) -> tuple[int, ...]:
+        addresses = []
+        while hits:
+            lowest = hits & -hits
+            addresses.append(start + (lowest.bit_length() - 1) // 8)
+            hits ^= lowest
+        return tuple(addresses)
@@ -1,47 +1,124 @@
-import string, logging
+import asyncio, string, logging
+from collections import deque
+from contextlib import nullcontext
+from functools import partial
+from time import monotonic, time
+from array import array
+from collections.abc import Awaitable, Callable, Collection
 from dataclasses import dataclass
+from typing import Any, NamedTuple
 
-import httpx
 from pyecoforest.api import EcoforestApi
+from pyecoforest.exceptions import EcoforestAuthenticationRequired
 
+from custom_components.ecoforest_ecogeo.overrides.alarms import AlarmIndex
+from custom_components.ecoforest_ecogeo.overrides.codec import COIL_TYPECODE, REGISTER_TYPECODE, empty_space
 from custom_components.ecoforest_ecogeo.overrides.device import EcoGeoDevice
+from custom_components.ecoforest_ecogeo.overrides.dispatch import Preempted, Priority, RequestDispatcher
+from custom_components.ecoforest_ecogeo.overrides.exceptions import EcoforestBackoff
+from custom_components.ecoforest_ecogeo.overrides.history import RegisterHistory
+from custom_components.ecoforest_ecogeo.overrides.planner import coalesce_writes, mapping_addresses, plan_requests
+from custom_components.ecoforest_ecogeo.overrides.resilience import BlockBackoff, CircuitBreaker
+from custom_components.ecoforest_ecogeo.overrides.telemetry import Telemetry
+from custom_components.ecoforest_ecogeo.overrides.transport import (
+    OP_TYPE_GET_REGISTER,
+    OP_TYPE_GET_SWITCH,
+    OP_TYPE_SET_REGISTER,
+    OP_TYPE_SET_SWITCH,
+    EasynetTransport,
+    Reply,
+    Transport,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
 MODEL_ADDRESS = 5323
 MODEL_LENGTH = 6
 
-OP_TYPE_GET_SWITCH = 2001
-OP_TYPE_SET_SWITCH = 2011
-OP_TYPE_GET_REGISTER = 2002
-OP_TYPE_SET_REGISTER = 2012
+# reported by temperature registers without a probe connected
+SENSOR_NOT_CONNECTED = -999.9
+
+# number of REQUESTS blocks allowed in flight at once, 1 means serial polling
+MAX_CONCURRENT_REQUESTS = 4
+# polling falls back to serial after this many polls within SERIAL_FALLBACK_WINDOW seconds
+# only got through by retrying their failed blocks one at a time
+SERIAL_FALLBACK_RECOVERIES = 3
+SERIAL_FALLBACK_WINDOW = 600
+# seconds of serial polling before parallel polling is tried again
+SERIAL_FALLBACK_COOLDOWN = 3600
+# writes queued within this many seconds are sent together and read back together
+WRITE_BATCH_WINDOW = 0.25
+# seconds the last good values of a failing block are served before they turn unknown
+MAX_STALE_AGE = 600
 
 class DataTypes:
     Register = 1
     Coil = 2
 
+# highest address + 1 of each data type, raw values are kept in arrays indexed by address
+ADDRESS_SPACE = {DataTypes.Coil: 512, DataTypes.Register: 6000}
+
+class PollTiers:
+    # polled on every coordinator tick, the default for MAPPING entries
+    Fast = "fast"
+    # setpoints and switches, they only change when somebody writes them
+    Slow = "slow"
+    # read once, the first time the api polls the device
+    Static = "static"
+
 class Operations:
-    Get = {DataTypes.Coil: 2001, DataTypes.Register: 2002}
-    Set = {DataTypes.Coil: 2011, DataTypes.Register: 2012}
-
-REQUESTS = {
-    DataTypes.Coil : [
-        {"address": 1, "length": 41},
-        {"address": 57, "length": 27},
-        {"address": 105, "length": 3},
-        {"address": 212, "length": 15},
-    ],
-
-    DataTypes.Register: [
-        {"address": 1, "length": 31},
-        {"address": 59, "length": 1},
-        {"address": 194, "length": 8},
-        {"address": 5066, "length": 18},
-        {"address": 5185, "length": 1},
-
-        {"address": MODEL_ADDRESS, "length": MODEL_LENGTH, "op": OP_TYPE_GET_REGISTER},
-    ]
-}
+    Get = {DataTypes.Coil: OP_TYPE_GET_SWITCH, DataTypes.Register: OP_TYPE_GET_REGISTER}
+    Set = {DataTypes.Coil: OP_TYPE_SET_SWITCH, DataTypes.Register: OP_TYPE_SET_REGISTER}
+
+ALARM_ADDRESSES = [
+    1,	#Clock Board fault or not connected
+    2,	#Extended memory fault
+    3,	#Low outdoor temp. & Low ground temp.
+    7,	#AI3 Probe failure. Compressor discharge pressure
+    8,	#AI4 Probe failure. Brine outlet temperature
+    9,	#AI5 Probe failure. Brine return temperature
+    10,	#AI6 Probe failure. Brine circuit pressure
+    11,	#AI7 Probe failure. Heating outlet temperature
+    12,	#AI8 Probe failure. Heating inlet temperature
+    13,	#AI9 Probe failure. Heating circuit pressure
+    14,	#AI10 Probe failure. Tank temperature 1 (DHW)
+    15,	#AI11 Probe failure. Outdoor temperature probe
+    16,	#AI12 Probe fault
+    17,	#Low brine inlet temperature
+    18,	#High discharge pressure
+    19,	#High discharge temperature
+    20,	#Inverter temperature
+    21,	#Low brine outlet temperature
+    24,	#Ecogeo internal probes fault
+    25,	#Low pressure brine circuit
+    26,	#Low pressure Heating circuit
+    33,	#Evaporation temperature
+    34,	#Low suction pressure
+    36,	#AI2 Probe failure Compressor suction Pressure
+    37,	#AI1 Probe failure. Compressor suction temperature
+    38,	#Low superheat (lowSH)
+    39,	#Low evaporation temperature (LOP)
+    40,	#High evaporation temperature (MOP)
+    41,	#Low suction temperature
+    212,	#Inverter comms fault
+    213,	#High brine temperature
+    214,	#pCOe number:AI13 Analog input probe on channel 1 disconnected or broken
+    215,	#pCOe number:AI14 Analog input probe on channel 2 disconnected or broken
+    216,	#pCOe number:AI15 Analog input probe on channel 3 disconnected or broken
+    217,	#pCOe number:AI16 Analog input probe on channel 4 disconnected or broken
+    218,	#pCOe number: pCOe offline
+    219,	#th-T 1 Error (thermostat for DG1) **
+    220,	#th-T 1 offline (thermostat for DG1) **
+    221,	#th-T 2 Error (thermostat for SG2) **
+    222,	#th-T 2 offline (thermostat for SG2) **
+    223,	#th-T 3 Error (thermostat for SG3) **
+    224,	#th-T 3 offline (thermostat for SG3) **
+    225,	#th-T 4 Error (thermostat for SG4) **
+    226,	#th-T 4 offline (thermostat for SG4) **
+]
+
+# precomputed once, every poll evaluates the alarms with one AND per coil block
+ALARM_INDEX = AlarmIndex(ALARM_ADDRESSES)
 
 MAPPING = {
     "t_heating": {
@@ -120,6 +197,7 @@ MAPPING = {
         "data_type": DataTypes.Register,
         "type": "custom",
         "entity_type": "power",
+        "depends_on": ["power_cooling", "power_heating"],
         "value_fn": lambda data, raw: data["power_cooling"] + data["power_heating"]
     },
     "t_brine_in": {
@@ -138,13 +216,17 @@ MAPPING = {
         "data_type": DataTypes.Register,
         "type": "float",
         "address": 13,
-        "entity_type": "pressure"
+        "entity_type": "pressure",
+        # changes smaller than this are not published, hides the 0.1 bar jitter of the sensor
+        "deadband": 0.15
     },
     "p_output": {
         "data_type": DataTypes.Register,
         "type": "float",
         "address": 14,
-        "entity_type": "pressure"
+        "entity_type": "pressure",
+        # changes smaller than this are not published, hides the 0.1 bar jitter of the sensor
+        "deadband": 0.15
     },
     "cop": {
         "data_type": DataTypes.Register,
@@ -162,49 +244,57 @@ MAPPING = {
         "data_type": DataTypes.Coil,
         "type": "boolean",
         "address": 105,
-        "entity_type": "switch"
+        "entity_type": "switch",
+        "poll_tier": PollTiers.Slow
     },
     "switch_cooling": {
         "data_type": DataTypes.Coil,
         "type": "boolean",
         "address": 107,
-        "entity_type": "switch"
+        "entity_type": "switch",
+        "poll_tier": PollTiers.Slow
     },
     "switch_dhw": {
         "data_type": DataTypes.Coil,
         "type": "boolean",
         "address": 106,
-        "entity_type": "switch"
+        "entity_type": "switch",
+        "poll_tier": PollTiers.Slow
     },
     "switch_dg1_output": {
         "data_type": DataTypes.Coil,
         "type": "boolean",
         "address": 60,
-        "entity_type": "switch"
+        "entity_type": "switch",
+        "poll_tier": PollTiers.Slow
     },
     "switch_sg2_output": {
         "data_type": DataTypes.Coil,
         "type": "boolean",
         "address": 57,
-        "entity_type": "switch"
+        "entity_type": "switch",
+        "poll_tier": PollTiers.Slow
     },
     "switch_pool_output": {
         "data_type": DataTypes.Coil,
         "type": "boolean",
         "address": 65,
-        "entity_type": "switch"
+        "entity_type": "switch",
+        "poll_tier": PollTiers.Slow
     },
     "switch_pool_device_output": {
         "data_type": DataTypes.Coil,
         "type": "boolean",
         "address": 61,
-        "entity_type": "switch"
+        "entity_type": "switch",
+        "poll_tier": PollTiers.Slow
     },
     "button_reset_alarms": {
         "data_type": DataTypes.Coil,
         "type": "boolean",
         "address": 83,
-        "entity_type": "button"
+        "entity_type": "button",
+        "poll_tier": PollTiers.Slow
     },
     "number_dhw_setpoint": {
         "data_type": DataTypes.Register,
@@ -214,7 +304,8 @@ MAPPING = {
         "is_number": True,
         "min": 0,
         "max": 65,
-        "step": 0.1
+        "step": 0.1,
+        "poll_tier": PollTiers.Slow
     },
     "number_dhw_dt_start": {
         "data_type": DataTypes.Register,
@@ -224,7 +315,8 @@ MAPPING = {
         "is_number": True,
         "min": 2,
         "max": 25,
-        "step": 0.1
+        "step": 0.1,
+        "poll_tier": PollTiers.Slow
     },
     "number_dhw_htr_set": {
         "data_type": DataTypes.Register,
@@ -234,187 +326,636 @@ MAPPING = {
         "is_number": True,
         "min": 0,
         "max": 70,
-        "step": 0.1
+        "step": 0.1,
+        "poll_tier": PollTiers.Slow
     },
     "alarm": {
         "data_type": DataTypes.Coil,
-        "type": "custom",
+        "type": "alarm",
         "entity_type": "enum",
-        "value_fn": lambda data, raw_data: EcoGeoApi.get_alarm(raw_data)
+        "addresses": ALARM_ADDRESSES
     }
 }
 
 
+def parse_ecoforest_int(value):
+    result = int(value, 16)
+    return result if result <= 32768 else result - 65536
+
+
+def parse_ecoforest_bool(value):
+    return bool(int(value))
+
+
+# raw values are already sign converted by decode_registers / decode_coils
+DECODERS = {
+    "int": int,
+    "float": lambda value: value / 10,
+    "boolean": bool,
+}
+
+
+class DecodeRow(NamedTuple):
+    name: str
+    data_type: int
+    address: int
+    decode: Callable[[int], Any]
+    # temperatures report SENSOR_NOT_CONNECTED instead of a value when the probe is missing
+    nullable: bool
+
+
+class DerivedRow(NamedTuple):
+    name: str
+    value_fn: Callable[[dict[str, Any], dict[int, array]], Any]
+    # (data type, address) of the raw values it is computed from, straight from "addresses" or through
+    # the rows named in "depends_on", it is as stale as the stalest of them
+    sources: tuple[tuple[int, int], ...]
+
+
+class DecodePlan(NamedTuple):
+    rows: list[DecodeRow]
+    # the "custom" entries, evaluated in MAPPING order once the rows are decoded
+    derived: list[DerivedRow]
+    # name and (data type, address) sources of the "alarm" entry, the address of the first raised alarm
+    alarm: tuple[str, tuple[tuple[int, int], ...]] | None = None
+
+
+def compile_decode_plan(mapping: dict[str, dict]) -> DecodePlan:
+    """Flatten a MAPPING like dict into the rows decoded on every poll."""
+    rows = []
+    custom = []
+    alarm = None
+
+    for name, definition in mapping.items():
+        if definition["type"] == "custom":
+            custom.append((name, definition))
+            continue
+
+        if definition["type"] == "alarm":
+            alarm = (name, tuple((definition["data_type"], address) for address in definition["addresses"]))
+            continue
+
+        if definition["type"] not in DECODERS:
+            _LOGGER.error("unknown entity type for %s", name)
+            continue
+
+        rows.append(DecodeRow(
+            name,
+            definition["data_type"],
+            definition["address"],
+            DECODERS[definition["type"]],
+            definition["entity_type"] == "temperature",
+        ))
+
+    cells = {row.name: (row.data_type, row.address) for row in rows}
+    derived = [
+        DerivedRow(name, definition["value_fn"], (
+            *((definition["data_type"], address) for address in definition.get("addresses", ())),
+            *(cells[source] for source in definition.get("depends_on", ()) if source in cells),
+        ))
+        for name, definition in custom
+    ]
+
+    return DecodePlan(rows, derived, alarm)
+
+
+def decode_rows(plan: DecodePlan, state: dict[int, array]) -> dict[str, Any]:
+    """Decode the raw values of the rows, the derived entries are left to decode_derived."""
+    device_info = {}
+
+    for name, data_type, address, decoder, nullable in plan.rows:
+        value = decoder(state[data_type][address])
+        device_info[name] = None if nullable and value == SENSOR_NOT_CONNECTED else value
+
+    return device_info
+
+
+def decode_derived(
+    plan: DecodePlan,
+    device_info: dict[str, Any],
+    state: dict[int, array],
+    alarms: tuple[int, ...] | None = None,
+    blanked: Collection[str] = (),
+) -> None:
+    """Compute the derived entries from the decoded rows, the blanked ones are None.
+
+    alarms are the raised alarm addresses when already known, they are looked up otherwise.
+    """
+    if plan.alarm is not None:
+        name = plan.alarm[0]
+        if name in blanked:
+            device_info[name] = None
+        else:
+            if alarms is None:
+                alarms = ALARM_INDEX.active(state[DataTypes.Coil])
+            device_info[name] = alarms[0] if alarms else 0
+
+    for name, value_fn, _ in plan.derived:
+        device_info[name] = None if name in blanked else value_fn(device_info, state)
+
+
+def decode(plan: DecodePlan, state: dict[int, array]) -> dict[str, Any]:
+    """Decode the raw values into the device state in a single pass over the plan."""
+    device_info = decode_rows(plan, state)
+    decode_derived(plan, device_info, state)
+
+    return device_info
+
+
+DECODE_PLAN = compile_decode_plan(MAPPING)
+
+
+def block_label(data_type: int, address: int, length: int) -> str:
+    """Name of a block in logs, telemetry and diagnostics, e.g. "reg 1+31"."""
+    return "{} {}+{}".format("coil" if data_type == DataTypes.Coil else "reg", address, length)
+
+
+def plan_tier_requests(mapping: dict[str, dict]) -> dict[str, dict[int, list[dict[str, int]]]]:
+    """Plan the read blocks of every poll tier for a MAPPING like dict."""
+    fast = plan_requests(mapping_addresses(
+        {name: definition for name, definition in mapping.items() if definition.get("poll_tier", PollTiers.Fast) == PollTiers.Fast}
+    ))
+
+    # the fast blocks may read through slow addresses already, no need to ask for them twice
+    covered = {
+        dt: {address for block in blocks for address in range(block["address"], block["address"] + block["length"])}
+        for dt, blocks in fast.items()
+    }
+    slow = mapping_addresses({name: definition for name, definition in mapping.items() if definition.get("poll_tier") == PollTiers.Slow})
+
+    return {
+        PollTiers.Fast: fast,
+        PollTiers.Slow: plan_requests({dt: used - covered.get(dt, set()) for dt, used in slow.items()}),
+        PollTiers.Static: plan_requests({DataTypes.Register: range(MODEL_ADDRESS, MODEL_ADDRESS + MODEL_LENGTH)}),
+    }
+
+
+REQUESTS = plan_tier_requests(MAPPING)
+
+
 class EcoGeoApi(EcoforestApi):
     def __init__(
         self,
         host: str,
-        user: str,
-        password: str
+        user: str = "",
+        password: str = "",
+        max_concurrent_requests: int = MAX_CONCURRENT_REQUESTS,
+        limiter: asyncio.Semaphore | None = None,
+        max_stale_age: float = MAX_STALE_AGE,
+        transport: Transport | None = None
     ) -> None:
-        super().__init__(host, httpx.BasicAuth(user, password))
-
-    async def get(self) -> EcoGeoDevice:
-        state = {DataTypes.Coil: {}, DataTypes.Register: {}}
-
-        for dt in [DataTypes.Coil, DataTypes.Register]:
-            for request in REQUESTS[dt]:
-                state[dt].update(await self._load_data(request["address"], request["length"], Operations.Get[dt]))
-
-        device_info = {}
-        for name, definition in MAPPING.items():
-            match definition["type"]:
-                case "int":
-                    value = self.parse_ecoforest_int(state[definition["data_type"]][definition["address"]])
-                case "float":
-                    value = self.parse_ecoforest_float(state[definition["data_type"]][definition["address"]])
-                case "boolean":
-                    value = self.parse_ecoforest_bool(state[definition["data_type"]][definition["address"]])
-                case "custom":
-                    continue
-                case _:
-                    _LOGGER.error("unknown entity type for %s", name)
-                    continue
-
-            device_info[name] = value
-
-        for name, definition in MAPPING.items():
-            if definition["entity_type"] == "temperature":
-                if device_info[name] == -999.9:
-                    device_info[name] = None
-
-            if definition["type"] != "custom":
+        self._max_concurrent_requests = max(1, max_concurrent_requests)
+        self._parallel_requests = self._max_concurrent_requests
+        # monotonic times of the polls recovered by serial retries, and until when polling stays serial
+        self._recoveries: deque[float] = deque()
+        self._serial_until: float | None = None
+        self.max_stale_age = max_stale_age
+        self._backoff = BlockBackoff()
+        self._breaker = CircuitBreaker()
+        # the Easynet web interface unless given another wire protocol, all requests go through it
+        self.transport = transport or EasynetTransport(host, user, password, self._max_concurrent_requests)
+        self.telemetry: Telemetry = self.transport.telemetry
+        # {alarm address: description}, from Registers.csv
+        self.alarm_descriptions: dict[int, str] = {}
+        self._alarms: tuple[int, ...] = ()
+        # shared with the other devices to cap the requests in flight across all of them
+        self._limiter = limiter
+        # orders this device's own requests, writes first
+        self._dispatcher = RequestDispatcher(self._max_concurrent_requests, preempt=self.transport.preempt)
+        # every request goes through the transport, which owns the connections, so the
+        # base class isn't initialised and doesn't open an http client of its own
+        self._host = host
+        # raw values of every block read so far, tiers that are not due keep their last values
+        self._state = {
+            DataTypes.Coil: empty_space(COIL_TYPECODE, ADDRESS_SPACE[DataTypes.Coil]),
+            DataTypes.Register: empty_space(REGISTER_TYPECODE, ADDRESS_SPACE[DataTypes.Register]),
+        }
+        self._loaded_tiers = set()
+        # MAPPING plus the catalog registers currently polled, see set_extra_mapping
+        self._requests = REQUESTS
+        self._decode_plan = DECODE_PLAN
+        # {name: (data type, address)} of the rows added since their block was last read, they decode as None
+        self._unread: dict[str, tuple[int, int]] = {}
+        # raw values of the last polls, the static tier is read once and has no history
+        self.history = RegisterHistory({DataTypes.Coil: COIL_TYPECODE, DataTypes.Register: REGISTER_TYPECODE})
+        self.history.set_blocks(self._planned_blocks(exclude=PollTiers.Static))
+        # {(data_type, address): word} waiting for the next write batch
+        self._pending_writes: dict[tuple[int, int], int] = {}
+        self._write_waiters: list[asyncio.Future] = []
+        self._write_batch: asyncio.Task | None = None
+        # called once with the device read back after every write batch, however many writes it held
+        self.on_written: Callable[[EcoGeoDevice], None] | None = None
+        # bumped after every write, {(data_type, address): generation} of the last write to each address
+        self._write_generation = 0
+        self._written: dict[tuple[int, int], int] = {}
+
+    async def close(self) -> None:
+        """Close the connections to the device."""
+        await self.transport.close()
+
+    def set_extra_mapping(self, extra: dict[str, dict]) -> None:
+        """Poll and decode these MAPPING like definitions on top of MAPPING, replaces the previous ones."""
+        mapping = {**MAPPING, **extra}
+
+        decoded = {row.name for row in self._decode_plan.rows}
+        self._requests = plan_tier_requests(mapping)
+        self._decode_plan = compile_decode_plan(mapping)
+        # the state arrays hold zeros or old values at the addresses of the new rows until the next poll reads them
+        self._unread = {
+            row.name: (row.data_type, row.address)
+            for row in self._decode_plan.rows
+            if row.name in self._unread or row.name not in decoded
+        }
+        self._backoff.prune(self._planned_blocks())
+        self.history.set_blocks(self._planned_blocks(exclude=PollTiers.Static))
+
+    def _planned_blocks(self, exclude: str | None = None) -> set[tuple[int, int, int]]:
+        return {
+            (dt, request["address"], request["length"])
+            for tier, requests in self._requests.items()
+            if tier != exclude
+            for dt, planned in requests.items()
+            for request in planned
+        }
+
+    def raw_values(self) -> list[tuple[str, int, int]]:
+        """(type, address, value) of every polled address, as last read."""
+        addresses = {
+            (dt, address)
+            for dt, first, length in self._planned_blocks()
+            for address in range(first, first + length)
+        }
+        return [
+            ("coil" if dt == DataTypes.Coil else "reg", address, self._state[dt][address])
+            for dt, address in sorted(addresses)
+        ]
+
+    @property
+    def max_concurrent_requests(self) -> int:
+        """Blocks a poll reads at once, 1 while polling serially."""
+        return self._max_concurrent_requests
+
+    @property
+    def request_plan(self) -> dict[str, dict[int, list[dict[str, int]]]]:
+        """{tier: {data type: [{"address", "length"}]}} of the blocks polled."""
+        return self._requests
+
+    async def read_blocks(self, blocks) -> list[array | Exception]:
+        """Read (data type, address, length) blocks without decoding them, a failing block returns its exception."""
+        return await self._load_blocks(blocks)
+
+    async def read_block(self, data_type, address, length) -> array:
+        """Read one block left out of the per block telemetry, such as the probes of a scan."""
+        return await self._load_data(address, length, Operations.Get[data_type], track_block=False)
+
+    async def get(self, tiers: list[str] | None = None) -> EcoGeoDevice:
+        """Poll the blocks of the given tiers (all of them by default) and decode the device.
+
+        A failing block doesn't fail the poll, its last good values are served
+        until they are max_stale_age old and it is retried with a backoff.
+        """
+        tiers = set(self._requests.keys() if tiers is None else tiers)
+        # decoding needs every tier at least once, static ones are never read again
+        unloaded = self._requests.keys() - self._loaded_tiers
+        tiers |= unloaded
+        now = monotonic()
+
+        if not self._breaker.allow(now):
+            if unloaded:
+                raise EcoforestBackoff("device is backed off")
+            _LOGGER.debug("device is backed off, serving the last values")
+            return self._build_device()
+
+        planned = [
+            (tier, dt, request["address"], request["length"])
+            for tier in tiers
+            for dt, requests in self._requests[tier].items()
+            for request in requests
+        ]
+        blocks = [block for block in planned if block[0] in unloaded or self._backoff.due(block[1:], now)]
+        self.telemetry.skipped += len(planned) - len(blocks)
+
+        generation = self._write_generation
+        results = await self._load_blocks([block[1:] for block in blocks])
+        read_time = time()
+        failed_tiers = set()
+        first_error = None
+
+        for (tier, dt, address, length), result in zip(blocks, results):
+            if isinstance(result, Exception):
+                delay = self._backoff.record_failure((dt, address, length), now)
+                _LOGGER.warning("reading %d values at %d failed, retrying in %.0f s: %s", length, address, delay, result)
+                failed_tiers.add(tier)
+                first_error = first_error or result
                 continue
-            device_info[name] = definition["value_fn"](device_info, state)
 
-        _LOGGER.debug(device_info)
-        _LOGGER.debug(state)
-        return EcoGeoDevice.build(self.parse_model_name(state), device_info)
-
-    async def _load_data(self, address, length, op_type) -> dict[int, str]:
-        response = await self._request(
-            data={
-                "idOperacion": op_type,
-                "dir": address,
-                "num": length
+            self._backoff.record_success((dt, address, length), read_time)
+            if generation != self._write_generation and self._written_since(generation, dt, address, length):
+                # read before a write to these addresses landed, the read back has the newer values
+                continue
+            self._store(dt, address, result)
+            self.history.append((dt, address, length), read_time, result)
+
+        was_open = self._breaker.is_open
+        self._breaker.record(len(blocks), sum(isinstance(result, Exception) for result in results), now)
+        if self._breaker.is_open and not was_open:
+            self.telemetry.breaker_trips += 1
+        if self._breaker.is_open:
+            _LOGGER.warning("device keeps failing, backing off until the next probe")
+
+        # there is nothing to serve of a tier that was never read
+        if failed_tiers & unloaded:
+            raise first_error
+
+        self._loaded_tiers |= tiers
+        return self._build_device()
+
+    def _store(self, data_type: int, address: int, block: array) -> None:
+        self._state[data_type][address:address + len(block)] = block
+        if self._unread:
+            self._unread = {
+                name: (dt, cell)
+                for name, (dt, cell) in self._unread.items()
+                if dt != data_type or not address <= cell < address + len(block)
             }
+
+    def _written_since(self, generation: int, data_type: int, address: int, length: int) -> bool:
+        return any(
+            self._written.get((data_type, written), 0) > generation
+            for written in range(address, address + length)
         )
 
-        result = {}
-        index = 0
-        for i in range(address, address+length):
-            result[i] = response[index]
-            index += 1
+    def _build_device(self) -> EcoGeoDevice:
+        """Decode the device from the raw values read so far."""
+        plan = self._decode_plan
+        device_info = decode_rows(plan, self._state)
+        stale, blanked = self._mark_stale(device_info)
+        if self._unread:
+            for name in self._unread:
+                device_info[name] = None
+                stale.pop(name, None)
+            blanked = blanked | self._unread.keys()
+
+        if plan.alarm is not None and plan.alarm[0] in blanked:
+            # the alarm coils are too old to tell, the last known alarms count again once they are read
+            alarms, alarms_changed = (), False
+        else:
+            alarms = ALARM_INDEX.active(self._state[DataTypes.Coil])
+            alarms_changed = alarms != self._alarms
+            self._alarms = alarms
+
+        # derived values are computed once their sources are blanked, they don't outlive them
+        decode_derived(plan, device_info, self._state, alarms, blanked)
 
-        return result
+        _LOGGER.debug(device_info)
+        return EcoGeoDevice.build(
+            self.parse_model_name(self._state),
+            device_info,
+            stale,
+            {address: self.alarm_descriptions.get(address, "") for address in alarms},
+            alarms_changed,
+        )
+
+    def _mark_stale(self, device_info: dict[str, Any]) -> tuple[dict[str, float], set[str]]:
+        """Return when the values of failing blocks were read and the names of those older than max_stale_age.
+
+        The rows among them are blanked in device_info, the derived entries are
+        left to decode_derived.
+        """
+        stale_blocks = self._backoff.stale()
+        if not stale_blocks:
+            return {}, set()
+
+        now = time()
+        stale = {}
+        blanked = set()
+        entries = [
+            *((row.name, ((row.data_type, row.address),)) for row in self._decode_plan.rows),
+            *((row.name, row.sources) for row in self._decode_plan.derived),
+            *((self._decode_plan.alarm,) if self._decode_plan.alarm is not None else ()),
+        ]
+
+        for name, cells in entries:
+            read = [
+                since
+                for data_type, cell in cells
+                for (dt, address, length), since in stale_blocks.items()
+                if dt == data_type and address <= cell < address + length
+            ]
+            if not read:
+                continue
+            if None in read or now - min(read) > self.max_stale_age:
+                blanked.add(name)
+            else:
+                stale[name] = min(read)
+
+        for row in self._decode_plan.rows:
+            if row.name in blanked:
+                device_info[row.name] = None
+
+        # the static blocks are read once and never fail afterwards, the device is dead once all the others are
+        if stale_blocks.keys() >= self._planned_blocks(exclude=PollTiers.Static) and not stale:
+            raise EcoforestBackoff("no value read within {} s".format(self.max_stale_age))
+
+        return stale, blanked
+
+    async def _load_blocks(self, blocks) -> list[array | Exception]:
+        """Read the blocks, a failing block returns its exception instead of failing the others."""
+        now = monotonic()
+        if self._serial_until is not None and now >= self._serial_until:
+            _LOGGER.info("trying parallel polling again")
+            self._set_concurrency(self._parallel_requests)
+            self._serial_until = None
+
+        if self._max_concurrent_requests == 1:
+            results = []
+            for dt, address, length in blocks:
+                try:
+                    results.append(await self._load_data(address, length, Operations.Get[dt]))
+                except EcoforestAuthenticationRequired:
+                    raise
+                except Exception as err:
+                    results.append(err)
+            return results
+
+        semaphore = asyncio.Semaphore(self._max_concurrent_requests)
+
+        async def load(dt, address, length):
+            async with semaphore:
+                return await self._load_data(address, length, Operations.Get[dt])
+
+        results = await asyncio.gather(*(load(*block) for block in blocks), return_exceptions=True)
+
+        for result in results:
+            if isinstance(result, EcoforestAuthenticationRequired):
+                raise result
+
+        failed = [index for index, result in enumerate(results) if isinstance(result, Exception)]
+        if len(failed) == len(blocks):
+            # not a matter of overlapping requests, the device is not answering at all
+            return results
+
+        recovered = False
+        for index in failed:
+            dt, address, length = blocks[index]
+            self.telemetry.retries += 1
+            try:
+                results[index] = await self._load_data(address, length, Operations.Get[dt])
+            except EcoforestAuthenticationRequired:
+                raise
+            except Exception as err:
+                results[index] = err
+            else:
+                recovered = True
+
+        if recovered:
+            self._record_recovery(now)
+
+        return results
+
+    def _record_recovery(self, now: float) -> None:
+        """Fall back to serial polling once the retries keep rescuing polls, a single hiccup doesn't count."""
+        self._recoveries.append(now)
+        while self._recoveries[0] < now - SERIAL_FALLBACK_WINDOW:
+            self._recoveries.popleft()
+        if len(self._recoveries) < SERIAL_FALLBACK_RECOVERIES:
+            return
+
+        # the blocks keep going through only when sent one at a time, so the
+        # controller can't cope with overlapping requests, poll serially for a while
+        _LOGGER.warning("device keeps rejecting parallel requests, falling back to serial polling")
+        self._recoveries.clear()
+        self._set_concurrency(1)
+        self._serial_until = now + SERIAL_FALLBACK_COOLDOWN
+
+    def _set_concurrency(self, requests: int) -> None:
+        self._max_concurrent_requests = requests
+        self._dispatcher.max_in_flight = requests
+
+    async def _load_data(self, address, length, op_type, track_block: bool = True, priority: int = Priority.Poll) -> array:
+        """Read length values at address, track_block keeps per block telemetry of the read."""
+        data_type = DataTypes.Coil if op_type == Operations.Get[DataTypes.Coil] else DataTypes.Register
+        read = self.transport.read_coils if data_type == DataTypes.Coil else self.transport.read_registers
+
+        return await self._request(
+            partial(read, address, length),
+            label=block_label(data_type, address, length) if track_block else None,
+            priority=priority
+        )
+
+    async def get_model_name(self) -> str:
+        """Read just the model block, enough to identify the device."""
+        block = await self._load_data(MODEL_ADDRESS, MODEL_LENGTH, Operations.Get[DataTypes.Register])
+        self._store(DataTypes.Register, MODEL_ADDRESS, block)
+
+        return self.parse_model_name(self._state)
 
     async def turn_switch(self, name, on: bool | None = False) -> EcoGeoDevice:
         if name not in MAPPING.keys():
             raise Exception("unknown switch")
 
-        await self._request(
-            data={"idOperacion": OP_TYPE_SET_SWITCH, "dir": MAPPING[name]["address"], "num": 1, int(on): int(on)}
-        )
-        return await self.get()
+        return await self._queue_write(MAPPING[name]["data_type"], MAPPING[name]["address"], int(bool(on)))
 
     async def set_numeric_value(self, name, value: float) -> EcoGeoDevice:
         if name not in MAPPING.keys():
             raise Exception("unknown register")
 
-        converted_value = self.convert_to_ecoforest_int(value)
-
-        await self._request(
-            data={"idOperacion": OP_TYPE_SET_REGISTER, "dir": MAPPING[name]["address"], "num": 1, converted_value: converted_value}
-        )
-        return await self.get()
-
-    def _parse(self, response: str) -> list[str]:
-        lines = response.split('\n')
-
-        a, b = lines[0].split('=')
-        if a not in ["error_geo_get_reg", "error_geo_get_bit", "error_geo_set_reg", "error_geo_set_bit"] or b != "0":
-            raise Exception("bad response: {}".format(response))
-
-        return lines[1].split('&')[2:]
+        # unsigned register word with one decimal
+        word = int(value * 10) & 0xFFFF
+
+        return await self._queue_write(MAPPING[name]["data_type"], MAPPING[name]["address"], word)
+
+    async def _queue_write(self, data_type, address, word: int) -> EcoGeoDevice:
+        """Queue a write for the next batch and wait for the device state after it."""
+        self._pending_writes[(data_type, address)] = word
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._write_waiters.append(waiter)
+
+        if self._write_batch is None:
+            self._write_batch = asyncio.create_task(self._write_pending())
+
+        return await waiter
+
+    async def _write_pending(self) -> None:
+        await asyncio.sleep(WRITE_BATCH_WINDOW)
+
+        # writes queued from here on go to the next batch
+        writes, self._pending_writes = self._pending_writes, {}
+        waiters, self._write_waiters = self._write_waiters, []
+        self._write_batch = None
+
+        try:
+            runs = coalesce_writes(writes)
+            for data_type, address, words in runs:
+                write = self.transport.write_coils if data_type == DataTypes.Coil else self.transport.write_registers
+                await self._request(partial(write, address, words), priority=Priority.Write)
+                self._write_generation += 1
+                for offset in range(len(words)):
+                    self._written[(data_type, address + offset)] = self._write_generation
+
+            if self._requests.keys() - self._loaded_tiers:
+                device = await self.get()
+            else:
+                # only read back what was written, everything else is refreshed by the next poll
+                for data_type, address, words in runs:
+                    block = await self._load_data(address, len(words), Operations.Get[data_type], priority=Priority.Readback)
+                    self._store(data_type, address, block)
+                device = self._build_device()
+        except Exception as err:
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_exception(err)
+        else:
+            if self.on_written is not None:
+                self.on_written(device)
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_result(device)
+
+    async def _request(
+        self,
+        send: Callable[[], Awaitable[Reply]],
+        label: str | None = None,
+        priority: int = Priority.Poll
+    ) -> array:
+        """Run a read or write of the transport and return the values read.
+
+        label names the read block in the telemetry, priority orders the request
+        against the other requests to the device.
+        """
+        reply, elapsed = await self._dispatch(send, priority)
+        self.telemetry.record_request(elapsed, reply.sent, reply.received)
+
+        if label is not None:
+            self.telemetry.record_block(label, elapsed, reply.received)
+
+        return reply.values
+
+    async def _dispatch(self, send: Callable[[], Awaitable[Reply]], priority: int) -> tuple[Reply, float]:
+        """Send once the dispatcher hands out a slot, a preempted poll request is sent again."""
+        started = 0.0
+
+        async def request() -> Reply:
+            nonlocal started
+            async with self._limiter or nullcontext():
+                # time spent waiting for a slot or the limiter is not the device's latency
+                started = monotonic()
+                return await send()
+
+        while True:
+            try:
+                reply = await self._dispatcher.run(priority, request)
+            except Preempted:
+                self.telemetry.preempted += 1
+                continue
+            return reply, monotonic() - started
 
     def parse_model_name(self, data):
         model_dictionary = ["--"] + [*string.digits] + [*string.ascii_uppercase]
 
         result = ''
         for address in range(MODEL_ADDRESS, MODEL_ADDRESS + MODEL_LENGTH):
-            result += model_dictionary[self.parse_ecoforest_int(data[DataTypes.Register][address])]
+            result += model_dictionary[data[DataTypes.Register][address]]
 
         return result
-
-    def convert_to_ecoforest_int(self, value):
-        value = int(value * 10)
-
-        if value < 0:
-            value += 65536
-
-        return ("0000" + hex(value)[2:])[-4:]
-
-    def parse_ecoforest_int(self, value):
-        result = int(value, 16)
-        return result if result <= 32768 else result - 65536
-
-    def parse_ecoforest_bool(self, value):
-        return bool(int(value))
-
-    def parse_ecoforest_float(self, value):
-        return self.parse_ecoforest_int(value) / 10
-
-    def get_alarm(data):
-        alarm_registers = [
-            1,	#Clock Board fault or not connected
-            2,	#Extended memory fault
-            3,	#Low outdoor temp. & Low ground temp.
-            7,	#AI3 Probe failure. Compressor discharge pressure
-            8,	#AI4 Probe failure. Brine outlet temperature
-            9,	#AI5 Probe failure. Brine return temperature
-            10,	#AI6 Probe failure. Brine circuit pressure
-            11,	#AI7 Probe failure. Heating outlet temperature
-            12,	#AI8 Probe failure. Heating inlet temperature
-            13,	#AI9 Probe failure. Heating circuit pressure
-            14,	#AI10 Probe failure. Tank temperature 1 (DHW)
-            15,	#AI11 Probe failure. Outdoor temperature probe
-            16,	#AI12 Probe fault
-            17,	#Low brine inlet temperature
-            18,	#High discharge pressure
-            19,	#High discharge temperature
-            20,	#Inverter temperature
-            21,	#Low brine outlet temperature
-            24,	#Ecogeo internal probes fault
-            25,	#Low pressure brine circuit
-            26,	#Low pressure Heating circuit
-            33,	#Evaporation temperature
-            34,	#Low suction pressure
-            36,	#AI2 Probe failure Compressor suction Pressure
-            37,	#AI1 Probe failure. Compressor suction temperature
-            38,	#Low superheat (lowSH)
-            39,	#Low evaporation temperature (LOP)
-            40,	#High evaporation temperature (MOP)
-            41,	#Low suction temperature
-            212,	#Inverter comms fault
-            213,	#High brine temperature
-            214,	#pCOe number:AI13 Analog input probe on channel 1 disconnected or broken
-            215,	#pCOe number:AI14 Analog input probe on channel 2 disconnected or broken
-            216,	#pCOe number:AI15 Analog input probe on channel 3 disconnected or broken
-            217,	#pCOe number:AI16 Analog input probe on channel 4 disconnected or broken
-            218,	#pCOe number: pCOe offline
-            219,	#th-T 1 Error (thermostat for DG1) **
-            220,	#th-T 1 offline (thermostat for DG1) **
-            221,	#th-T 2 Error (thermostat for SG2) **
-            222,	#th-T 2 offline (thermostat for SG2) **
-            223,	#th-T 3 Error (thermostat for SG3) **
-            224,	#th-T 3 offline (thermostat for SG3) **
-            225,	#th-T 4 Error (thermostat for SG4) **
-            226,	#th-T 4 offline (thermostat for SG4) **
-        ]
-
-        for address in alarm_registers:
-            if data[DataTypes.Coil][address] == "0":
-                continue
-            return address
-
-        return 0
@@ -0,0 +1,160 @@
+"""Sample a few registers at a high rate straight to a CSV file."""
+
+import asyncio, csv, logging
+from collections.abc import Iterable, Mapping
+from pathlib import Path
+from time import monotonic, time
+from typing import Any, TextIO
+
+from custom_components.ecoforest_ecogeo.overrides.api import (
+    ADDRESS_SPACE,
+    DataTypes,
+    EcoGeoApi,
+    compile_decode_plan,
+    decode,
+)
+from custom_components.ecoforest_ecogeo.overrides.codec import COIL_TYPECODE, REGISTER_TYPECODE, empty_space
+from custom_components.ecoforest_ecogeo.overrides.planner import mapping_addresses, plan_requests
+
+_LOGGER = logging.getLogger(__name__)
+
+MIN_CAPTURE_INTERVAL = 0.5
+MAX_CAPTURE_DURATION = 3600
+# rows buffered in memory before they are handed to the executor for writing
+FLUSH_ROWS = 20
+
+
+class BurstCapture:
+    """Read the blocks holding the given keys and addresses every interval for duration seconds.
+
+    The rows go to a CSV file with the wall clock time in the first column, the
+    decoded value of every key and the raw value of every address after it. A
+    block that fails in a sample leaves its cells empty, the capture goes on.
+    """
+
+    def __init__(
+        self,
+        api: EcoGeoApi,
+        path: Path,
+        mapping: Mapping[str, dict],
+        keys: Iterable[str] = (),
+        registers: Iterable[int] = (),
+        coils: Iterable[int] = (),
+        interval: float = 1.0,
+        duration: float = 300.0,
+    ) -> None:
+        self.api = api
+        self.path = path
+        self.interval = max(interval, MIN_CAPTURE_INTERVAL)
+        self.duration = min(duration, MAX_CAPTURE_DURATION)
+        self.keys = list(dict.fromkeys(keys))
+        self.raw = [(DataTypes.Register, address) for address in dict.fromkeys(registers)]
+        self.raw += [(DataTypes.Coil, address) for address in dict.fromkeys(coils)]
+
+        unknown = [key for key in self.keys if key not in mapping]
+        if unknown:
+            raise ValueError("unknown keys: {}".format(", ".join(unknown)))
+        for data_type, address in self.raw:
+            if not 0 <= address < ADDRESS_SPACE[data_type]:
+                raise ValueError("address {} is out of range".format(address))
+        if not self.keys and not self.raw:
+            raise ValueError("nothing to capture")
+
+        selected = {key: mapping[key] for key in self.keys}
+        if any(definition["type"] == "custom" and "addresses" not in definition for definition in selected.values()):
+            # derived values are computed from the other decoded values
+            selected = {**{key: definition for key, definition in mapping.items() if definition["type"] != "custom"}, **selected}
+        self._decode_plan = compile_decode_plan(selected)
+        # (data type, address) a decoded key is read from, derived keys need every block
+        self._key_cells = {row.name: (row.data_type, row.address) for row in self._decode_plan.rows}
+
+        extra: dict[int, set[int]] = {}
+        for data_type, address in self.raw:
+            extra.setdefault(data_type, set()).add(address)
+        self.blocks = [
+            (data_type, block["address"], block["length"])
+            for data_type, blocks in plan_requests(mapping_addresses(selected, extra)).items()
+            for block in blocks
+        ]
+
+        # raw values of the last sample, only the cells read in a sample are written out
+        self._state = {
+            DataTypes.Coil: empty_space(COIL_TYPECODE, ADDRESS_SPACE[DataTypes.Coil]),
+            DataTypes.Register: empty_space(REGISTER_TYPECODE, ADDRESS_SPACE[DataTypes.Register]),
+        }
+        self.samples = 0
+        self.failed_blocks = 0
+        self.started: float | None = None
+        self._stop = asyncio.Event()
+
+    @property
+    def header(self) -> list[str]:
+        return [
+            "time",
+            *self.keys,
+            *("{} {}".format("coil" if data_type == DataTypes.Coil else "reg", address) for data_type, address in self.raw),
+        ]
+
+    def stop(self) -> None:
+        """End the capture after the sample in progress."""
+        self._stop.set()
+
+    async def run(self) -> None:
+        """Sample until the duration elapsed or stop() is called, the file is complete either way."""
+        loop = asyncio.get_running_loop()
+        file = await loop.run_in_executor(None, self._open)
+        rows: list[list[Any]] = []
+        self.started = time()
+        start = monotonic()
+
+        try:
+            while not self._stop.is_set() and monotonic() - start < self.duration:
+                rows.append(await self._sample())
+                if len(rows) >= FLUSH_ROWS:
+                    await loop.run_in_executor(None, self._write, file, rows)
+                    rows = []
+
+                # keep the cadence, a slow sample shortens the wait for the next one
+                delay = self.interval - (monotonic() - start) % self.interval
+                try:
+                    await asyncio.wait_for(self._stop.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            await asyncio.shield(loop.run_in_executor(None, self._close, file, rows))
+            _LOGGER.info("captured %d samples to %s", self.samples, self.path)
+
+    async def _sample(self) -> list[Any]:
+        sample_time = time()
+        # (data type, address) of the cells read in this sample
+        read = set()
+
+        for (data_type, address, length), result in zip(self.blocks, await self.api.read_blocks(self.blocks)):
+            if isinstance(result, Exception):
+                self.failed_blocks += 1
+                continue
+            self._state[data_type][address:address + length] = result
+            read.update((data_type, cell) for cell in range(address, address + length))
+
+        complete = len(read) == sum(length for _, _, length in self.blocks)
+        values = decode(self._decode_plan, self._state)
+        keys = [values[key] if self._key_cells.get(key) in read or complete else None for key in self.keys]
+        raw = [self._state[data_type][address] if (data_type, address) in read else None for data_type, address in self.raw]
+
+        self.samples += 1
+        return [round(sample_time, 3), *keys, *raw]
+
+    def _open(self) -> TextIO:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        file = self.path.open("w", newline="")
+        csv.writer(file).writerow(self.header)
+        return file
+
+    @staticmethod
+    def _write(file: TextIO, rows: list[list[Any]]) -> None:
+        csv.writer(file).writerows(rows)
+        file.flush()
+
+    def _close(self, file: TextIO, rows: list[list[Any]]) -> None:
+        with file:
+            self._write(file, rows)
@@ -0,0 +1,119 @@
+"""Register catalog generated from Registers.csv."""
+
+import csv
+from collections.abc import Iterator
+from pathlib import Path
+from typing import NamedTuple
+
+from custom_components.ecoforest_ecogeo.overrides.api import MAPPING, DataTypes
+
+REGISTERS_CSV = Path(__file__).resolve().parents[1] / "Registers.csv"
+
+# Registers.csv units that map onto a MAPPING entity type, the others are plain measurements
+UNIT_ENTITY_TYPES = {
+    "°C": "temperature",
+    "bar": "pressure",
+    "W": "power",
+}
+# Registers.csv units that are no unit at all
+NO_UNITS = {"-", "int", ""}
+
+
+class CatalogEntry(NamedTuple):
+    key: str
+    data_type: int
+    address: int
+    # Analog, Integer or Coil
+    kind: str
+    description: str
+    units: str
+    minimum: str
+    maximum: str
+    # R, W or R/W
+    access: str
+    remarks: str
+
+
+def catalog_key(data_type: int, address: int) -> str:
+    return "{}_{}".format("coil" if data_type == DataTypes.Coil else "reg", address)
+
+
+def read_registers_csv(path: Path = REGISTERS_CSV) -> Iterator[CatalogEntry]:
+    """Every row of Registers.csv, blocking."""
+    with open(path, encoding="utf-8", newline="") as fh:
+        for row in csv.DictReader(fh):
+            data_type = DataTypes.Coil if row["Type"] == "Coil" else DataTypes.Register
+            address = int(row["BMS Address"])
+
+            yield CatalogEntry(
+                catalog_key(data_type, address),
+                data_type,
+                address,
+                row["Type"],
+                row["Description"].strip(),
+                row["Units"].strip(),
+                row["Range - min"].strip(),
+                row["Range - max"].strip(),
+                row["R / W"].strip(),
+                row["Remarks"].strip(),
+            )
+
+
+def load_catalog(path: Path = REGISTERS_CSV) -> dict[str, CatalogEntry]:
+    """Read every readable address of Registers.csv that MAPPING doesn't expose already.
+
+    Blocking, run it in the executor.
+    """
+    mapped = {
+        (definition["data_type"], definition["address"])
+        for definition in MAPPING.values()
+        if "address" in definition
+    }
+    catalog = {}
+
+    for entry in read_registers_csv(path):
+        # write only registers can't be polled, a few addresses are listed twice
+        if "R" not in entry.access or (entry.data_type, entry.address) in mapped or entry.key in catalog:
+            continue
+        catalog[entry.key] = entry
+
+    return catalog
+
+
+def alarm_descriptions(catalog: dict[str, CatalogEntry]) -> dict[int, str]:
+    """{address: description} of the read only alarm coils, described in the remarks as "0=- |  1=<alarm>"."""
+    return {
+        entry.address: entry.remarks.split("1=", 1)[1].strip()
+        for entry in catalog.values()
+        if entry.data_type == DataTypes.Coil and entry.description == "Alarm" and entry.access == "R" and "1=" in entry.remarks
+    }
+
+
+def catalog_definition(entry: CatalogEntry) -> dict:
+    """MAPPING like definition of a catalog entry."""
+    description = entry.description
+    if description == "Alarm" and "1=" in entry.remarks:
+        # alarm coils are described in the remarks, "0=- |  1=<alarm>"
+        description = "Alarm: {}".format(entry.remarks.split("1=", 1)[1].strip())
+
+    definition = {
+        "data_type": entry.data_type,
+        "address": entry.address,
+        # catalog entries are named after Registers.csv, the address tells apart the repeated descriptions
+        "name": "{} [{}]".format(description, entry.address),
+    }
+
+    if entry.data_type == DataTypes.Coil:
+        definition.update({"type": "boolean", "entity_type": "binary"})
+        return definition
+
+    definition["type"] = "float" if entry.kind == "Analog" else "int"
+    definition["entity_type"] = UNIT_ENTITY_TYPES.get(entry.units, "measurement")
+    if definition["entity_type"] == "measurement" and entry.units not in NO_UNITS:
+        definition["unit"] = entry.units
+
+    return definition
+
+
+def catalog_mapping(catalog: dict[str, CatalogEntry]) -> dict[str, dict]:
+    return {key: catalog_definition(entry) for key, entry in catalog.items()}
@@ -0,0 +1,42 @@
+"""Bulk conversion between Easynet hex words and typed arrays."""
+
+import sys
+from array import array
+
+# signed 16 bit registers and one byte per coil
+REGISTER_TYPECODE = "h"
+COIL_TYPECODE = "B"
+
+_LITTLE_ENDIAN = sys.byteorder == "little"
+# ascii "0".."9" to 0..9
+_DIGITS = bytes.maketrans(b"0123456789", bytes(range(10)))
+
+
+def decode_registers(words: list[str]) -> array:
+    """Convert a block of 4 digit hex words into signed 16 bit values in one step."""
+    joined = "".join(words)
+
+    if len(joined) != 4 * len(words):
+        # not zero padded, fall back to converting word by word
+        return array(REGISTER_TYPECODE, ((int(word, 16) ^ 0x8000) - 0x8000 for word in words))
+
+    block = array(REGISTER_TYPECODE, bytes.fromhex(joined))
+    if _LITTLE_ENDIAN:
+        block.byteswap()
+
+    return block
+
+
+def decode_coils(words: list[str]) -> array:
+    """Convert a block of "0"/"1" words into one byte per coil."""
+    joined = "".join(words)
+
+    if len(joined) != len(words) or not (joined.isascii() and joined.isdigit()):
+        return array(COIL_TYPECODE, map(int, words))
+
+    return array(COIL_TYPECODE, joined.encode().translate(_DIGITS))
+
+
+def empty_space(typecode: str, size: int) -> array:
+    """Zero filled array indexed directly by address."""
+    return array(typecode, bytes(size * array(typecode).itemsize))
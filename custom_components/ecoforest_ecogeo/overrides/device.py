@@ -1,4 +1,4 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 
 @dataclass
@@ -7,12 +7,28 @@ class EcoGeoDevice:
     model_name: str
 
     state: dict[str, any] | None = None
+    # {state key: wall clock time of the last good read} for the values of failing blocks
+    stale: dict[str, float] = field(default_factory=dict)
+    # {address: description} of every raised alarm, state["alarm"] only holds the first one
+    alarms: dict[int, str] = field(default_factory=dict)
+    # whether the set of raised alarms differs from the previous device
+    alarms_changed: bool = False
 
     @classmethod
-    def build(cls, model_name: str, data: dict[str, any]):  # -> EcoGeoDevice:
+    def build(
+        cls,
+        model_name: str,
+        data: dict[str, any],
+        stale: dict[str, float] | None = None,
+        alarms: dict[int, str] | None = None,
+        alarms_changed: bool = False
+    ):  # -> EcoGeoDevice:
 
         return EcoGeoDevice(
             is_supported=True,
             model_name=model_name,
-            state=data
+            state=data,
+            stale=stale or {},
+            alarms=alarms or {},
+            alarms_changed=alarms_changed
         )
@@ -0,0 +1,119 @@
+"""Hand out the request slots of a device by priority."""
+
+import asyncio, heapq
+from collections.abc import Awaitable, Callable
+from itertools import count
+from typing import TypeVar
+
+T = TypeVar("T")
+
+
+class Priority:
+    # the lower the sooner
+    Write = 0
+    Readback = 1
+    Poll = 2
+
+
+class Preempted(Exception):
+    """A poll request was cancelled to make room for a write or read back."""
+
+
+class RequestDispatcher:
+    """At most max_in_flight requests to a device at once, queued requests go out by priority.
+
+    Within a priority the order is first come first served. A write or read
+    back that finds every slot busy cancels a poll request in flight rather
+    than waiting for it, the poll request gets Preempted and is queued again
+    by the caller.
+    """
+
+    def __init__(self, max_in_flight: int, preempt: bool = True) -> None:
+        self.max_in_flight = max(1, max_in_flight)
+        self.preempt = preempt
+        self.in_flight = 0
+        self.preempted = 0
+        # (priority, sequence, future) of the requests waiting for a slot
+        self._waiting: list[tuple[int, int, asyncio.Future]] = []
+        self._sequence = count()
+        # {task: priority} of the requests holding a slot
+        self._running: dict[asyncio.Task, int] = {}
+        # waiters of poll requests handed a slot they haven't taken yet, and those of them to give it back
+        self._granted: set[asyncio.Future] = set()
+        self._revoked: set[asyncio.Future] = set()
+
+    async def run(self, priority: int, request: Callable[[], Awaitable[T]]) -> T:
+        """Send the request once a slot is free, raises Preempted if a write took its slot."""
+        await self._acquire(priority)
+        task = asyncio.ensure_future(request())
+        self._running[task] = priority
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if task.cancelled() and not _cancelling():
+                raise Preempted() from None
+            task.cancel()
+            raise
+        finally:
+            del self._running[task]
+            self._release()
+
+    async def _acquire(self, priority: int) -> None:
+        if self.in_flight < self.max_in_flight and not self._waiting:
+            self.in_flight += 1
+            return
+
+        if self.preempt and priority < Priority.Poll:
+            self._preempt()
+
+        sequence = next(self._sequence)
+        while True:
+            waiter = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._waiting, (priority, sequence, waiter))
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    # the slot was handed over just before the cancellation, pass it on
+                    self._granted.discard(waiter)
+                    self._revoked.discard(waiter)
+                    self._release()
+                raise
+
+            self._granted.discard(waiter)
+            if waiter not in self._revoked:
+                return
+            # a write came in before this poll request got going, it keeps its place in the queue
+            self._revoked.discard(waiter)
+            self._release()
+
+    def _release(self) -> None:
+        # a slot above a lowered max_in_flight is dropped instead of handed over
+        while self._waiting and self.in_flight <= self.max_in_flight:
+            priority, _, waiter = heapq.heappop(self._waiting)
+            if not waiter.done():
+                # the slot goes straight to the waiter, in_flight stays the same
+                waiter.set_result(None)
+                if priority == Priority.Poll:
+                    self._granted.add(waiter)
+                return
+        self.in_flight -= 1
+
+    def _preempt(self) -> None:
+        """Cancel a poll request in flight, its slot goes to the best waiter, this request or an earlier one."""
+        for waiter in self._granted - self._revoked:
+            # not sent yet, nothing to cancel
+            self._revoked.add(waiter)
+            return
+
+        for task, priority in self._running.items():
+            if priority == Priority.Poll and not task.done() and not task.cancelling():
+                task.cancel()
+                self.preempted += 1
+                return
+
+
+def _cancelling() -> bool:
+    """Whether the current task itself is being cancelled."""
+    task = asyncio.current_task()
+    return task is not None and task.cancelling() > 0
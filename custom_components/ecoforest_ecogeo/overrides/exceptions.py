@@ -0,0 +1,9 @@
+from pyecoforest.exceptions import EcoforestConnectionError, EcoforestError
+
+
+class EcoforestBadResponse(EcoforestError):
+    """The device answered, but not with the values asked for."""
+
+
+class EcoforestBackoff(EcoforestConnectionError):
+    """The device is backed off after failing too many polls and there is nothing fresh enough to serve."""
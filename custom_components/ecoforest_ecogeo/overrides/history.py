@@ -0,0 +1,112 @@
+"""Raw values of the last polls of every block, in a fixed amount of memory."""
+
+from array import array
+from collections.abc import Callable, Iterable, Mapping
+from typing import Any
+
+# bytes shared by the ring buffers of a device
+HISTORY_BUDGET = 512 * 1024
+
+# (data type, address, length)
+Block = tuple[int, int, int]
+
+
+class BlockHistory:
+    """Ring buffer of the last capacity reads of one block, one row of length values per read."""
+
+    def __init__(self, typecode: str, length: int, capacity: int) -> None:
+        self.length = length
+        self.capacity = capacity
+        self.times = array("d", bytes(8 * capacity))
+        self.values = array(typecode, bytes(array(typecode).itemsize * length * capacity))
+        # row the next read goes to
+        self._head = 0
+        self.count = 0
+
+    @property
+    def nbytes(self) -> int:
+        return self.times.itemsize * len(self.times) + self.values.itemsize * len(self.values)
+
+    def append(self, time: float, values: array) -> None:
+        """Overwrite the oldest row, O(length) whatever the capacity."""
+        start = self._head * self.length
+        self.values[start:start + self.length] = values[:self.length]
+        self.times[self._head] = time
+        self._head = (self._head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def rows(self, since: float = 0.0) -> Iterable[tuple[float, array]]:
+        """(time, values) of the rows read at or after since, oldest first."""
+        first = (self._head - self.count) % self.capacity
+        for offset in range(self.count):
+            row = (first + offset) % self.capacity
+            if self.times[row] >= since:
+                start = row * self.length
+                yield self.times[row], self.values[start:start + self.length]
+
+    def column(self, offset: int, since: float = 0.0) -> list[tuple[float, int]]:
+        """(time, value) of one address of the block."""
+        return [(time, values[offset]) for time, values in self.rows(since)]
+
+
+class RegisterHistory:
+    """Ring buffers of the polled blocks splitting the budget evenly between polls.
+
+    Every block gets the same number of rows, so the history covers the same
+    span of polls for all of them.
+    """
+
+    def __init__(self, typecodes: Mapping[int, str], budget: int = HISTORY_BUDGET) -> None:
+        # array typecode of the raw values of every data type
+        self.typecodes = typecodes
+        self.budget = budget
+        self.blocks: dict[Block, BlockHistory] = {}
+
+    @property
+    def capacity(self) -> int:
+        return next(iter(self.blocks.values())).capacity if self.blocks else 0
+
+    @property
+    def nbytes(self) -> int:
+        return sum(history.nbytes for history in self.blocks.values())
+
+    def set_blocks(self, blocks: Iterable[Block]) -> None:
+        """Keep the history of these blocks only, resized to fit the budget together."""
+        blocks = sorted(set(blocks))
+        row_bytes = sum(8 + array(self.typecodes[dt]).itemsize * length for dt, _, length in blocks)
+        capacity = max(1, self.budget // row_bytes) if row_bytes else 0
+
+        resized = {}
+        for block in blocks:
+            resized[block] = BlockHistory(self.typecodes[block[0]], block[2], capacity)
+            if block in self.blocks:
+                # carry over the newest rows
+                rows = list(self.blocks[block].rows())
+                for time, values in rows[-capacity:]:
+                    resized[block].append(time, values)
+        self.blocks = resized
+
+    def append(self, block: Block, time: float, values: array) -> None:
+        if block in self.blocks:
+            self.blocks[block].append(time, values)
+
+    def query(self, data_type: int, address: int, since: float = 0.0) -> list[tuple[float, int]]:
+        """(time, raw value) of every read of the address since the given time, oldest first."""
+        series = []
+        for (dt, start, length), history in self.blocks.items():
+            if dt == data_type and start <= address < start + length:
+                series += history.column(address - start, since)
+        # overlapping blocks of different tiers both hold the address
+        return sorted(series)
+
+    def as_dict(self, label: Callable[[int, int, int], str], rows: int | None = None) -> dict[str, Any]:
+        """Sizes and the latest rows of every block, keyed by label(data type, address, length)."""
+        return {
+            "budget": self.budget,
+            "bytes": self.nbytes,
+            "capacity": self.capacity,
+            "blocks": {
+                label(*block): [[time, values.tolist()] for time, values in list(history.rows())[-rows if rows else 0:]]
+                for block, history in self.blocks.items()
+            },
+        }
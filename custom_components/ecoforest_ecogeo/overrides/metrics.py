@@ -0,0 +1,129 @@
+"""Energy totals, COP and rolling means kept up to date poll by poll."""
+
+from collections import deque
+from typing import Any
+
+# seconds covered by the windowed COP and the rolling means
+METRIC_WINDOW = 3600
+# samples further apart than this are not integrated, the device was unreachable or HA was down
+MAX_INTEGRATION_GAP = 900
+# W of electric power below which the pump is considered off and has no COP
+COP_MIN_POWER = 50
+
+POWER_KEYS = ("power_electric", "power_heating", "power_cooling")
+
+# metric keys published in the device state, with the entity type of their sensor
+METRICS = {
+    "energy_electric": {"entity_type": "energy"},
+    "energy_heating": {"entity_type": "energy"},
+    "energy_cooling": {"entity_type": "energy"},
+    "cop_instant": {"entity_type": "measurement"},
+    "cop_window": {"entity_type": "measurement"},
+    "power_electric_mean": {"entity_type": "power"},
+    "power_output_mean": {"entity_type": "power"},
+}
+
+
+class _Window:
+    """Running sums of the increments of the last span seconds, amortized O(1) per increment."""
+
+    def __init__(self, span: float, width: int) -> None:
+        self.span = span
+        self.sums = [0.0] * width
+        self._increments: deque[tuple[float, tuple[float, ...]]] = deque()
+
+    def add(self, time: float, values: tuple[float, ...]) -> None:
+        self._increments.append((time, values))
+        for index, value in enumerate(values):
+            self.sums[index] += value
+
+        while self._increments and time - self._increments[0][0] > self.span:
+            _, expired = self._increments.popleft()
+            for index, value in enumerate(expired):
+                self.sums[index] -= value
+
+    def clear(self) -> None:
+        self._increments.clear()
+        self.sums = [0.0] * len(self.sums)
+
+
+class MetricsEngine:
+    """Integrate the power readings into kWh with the trapezoidal rule and derive COP and means.
+
+    Every update only looks at the previous sample and the window sums, the
+    cost per poll doesn't grow with the history.
+    """
+
+    def __init__(self, window: float = METRIC_WINDOW) -> None:
+        # kWh since the integration was set up
+        self.energy = {"electric": 0.0, "heating": 0.0, "cooling": 0.0}
+        # (time, power_electric, power_heating, power_cooling) of the last usable sample
+        self._last: tuple[float, float, float, float] | None = None
+        # (seconds, electric Wh, output Wh) of every integrated segment
+        self._window = _Window(window, 3)
+        self.values: dict[str, float | None] = dict.fromkeys(METRICS)
+
+    def update(self, time: float, state: dict[str, Any], stale: dict[str, float] | None = None) -> dict[str, float | None]:
+        """Take a poll's state, returns the metric values."""
+        powers = tuple(state.get(key) for key in POWER_KEYS)
+
+        if None in powers or any(key in (stale or {}) for key in POWER_KEYS):
+            # nothing trustworthy to integrate, start over with the next good sample
+            self._last = None
+        else:
+            self._integrate(time, *powers)
+            self._last = (time, *powers)
+
+        self.values = self._derive(powers)
+        return self.values
+
+    def _integrate(self, time: float, electric: float, heating: float, cooling: float) -> None:
+        if self._last is None:
+            return
+
+        last_time, last_electric, last_heating, last_cooling = self._last
+        seconds = time - last_time
+        if not 0 < seconds <= MAX_INTEGRATION_GAP:
+            self._window.clear()
+            return
+
+        # Wh of the segment, the mean of both ends times its duration
+        electric_wh = (last_electric + electric) / 2 * seconds / 3600
+        heating_wh = (last_heating + heating) / 2 * seconds / 3600
+        cooling_wh = (last_cooling + cooling) / 2 * seconds / 3600
+
+        self.energy["electric"] += electric_wh / 1000
+        self.energy["heating"] += heating_wh / 1000
+        self.energy["cooling"] += cooling_wh / 1000
+        self._window.add(time, (seconds, electric_wh, heating_wh + cooling_wh))
+
+    def _derive(self, powers: tuple[float | None, ...]) -> dict[str, float | None]:
+        electric, heating, cooling = powers
+        seconds, electric_wh, output_wh = self._window.sums
+
+        cop_instant = None
+        if electric is not None and heating is not None and cooling is not None and electric >= COP_MIN_POWER:
+            cop_instant = round((heating + cooling) / electric, 2)
+
+        # the window spans at least a second or has nothing in it, sums of removed increments leave float dust
+        has_window = seconds >= 1
+        electric_mean = electric_wh * 3600 / seconds if has_window else None
+
+        return {
+            "energy_electric": round(self.energy["electric"], 3),
+            "energy_heating": round(self.energy["heating"], 3),
+            "energy_cooling": round(self.energy["cooling"], 3),
+            "cop_instant": cop_instant,
+            "cop_window": round(output_wh / electric_wh, 2) if has_window and electric_mean >= COP_MIN_POWER else None,
+            "power_electric_mean": round(electric_mean) if has_window else None,
+            "power_output_mean": round(output_wh * 3600 / seconds) if has_window else None,
+        }
+
+    def as_dict(self) -> dict[str, Any]:
+        """State to persist, the window is rebuilt after a restart."""
+        return {"energy": dict(self.energy), "last": list(self._last) if self._last else None}
+
+    def restore(self, data: dict[str, Any]) -> None:
+        self.energy.update(data.get("energy", {}))
+        self._last = tuple(data["last"]) if data.get("last") else None
+        self.values = self._derive((None, None, None))
@@ -0,0 +1,107 @@
+"""Render the decoded state, raw registers and polling statistics as OpenMetrics text."""
+
+from collections.abc import Iterable
+from typing import NamedTuple
+
+from custom_components.ecoforest_ecogeo.overrides.device import EcoGeoDevice
+from custom_components.ecoforest_ecogeo.overrides.telemetry import Histogram, Telemetry
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+PREFIX = "ecoforest"
+
+
+class DeviceMetrics(NamedTuple):
+    # device label, the alias or the model name
+    device: str
+    up: bool
+    data: EcoGeoDevice | None
+    # (type, address, raw value) of every polled address
+    raw: list[tuple[str, int, int]]
+    telemetry: Telemetry
+    poll_interval: float
+    poll_lag: float
+
+
+class _Families:
+    """Samples grouped by metric family, every family is written once with all devices' samples."""
+
+    def __init__(self) -> None:
+        # {name: (type, help, lines)}, in order of first use
+        self._families: dict[str, tuple[str, str, list[str]]] = {}
+
+    def add(self, name: str, kind: str, labels: dict[str, str | int], value: float, suffix: str = "", help: str = "") -> None:
+        if name not in self._families:
+            self._families[name] = (kind, help, [])
+        self._families[name][2].append("{}{}{{{}}} {}".format(name, suffix, _labels(labels), _number(value)))
+
+    def histogram(self, name: str, labels: dict[str, str], histogram: Histogram, help: str) -> None:
+        """A histogram in ms as one in seconds, OpenMetrics buckets are cumulative."""
+        seen = 0
+        for bound, count in zip([*histogram.bounds, None], histogram.counts):
+            seen += count
+            self.add(name, "histogram", {**labels, "le": "+Inf" if bound is None else _number(bound / 1000)}, seen, "_bucket", help)
+        self.add(name, "histogram", labels, histogram.count, "_count")
+        self.add(name, "histogram", labels, histogram.total / 1000, "_sum")
+
+    def text(self) -> str:
+        lines = []
+        for name, (kind, help, samples) in self._families.items():
+            lines.append("# TYPE {} {}".format(name, kind))
+            if help:
+                lines.append("# HELP {} {}".format(name, help))
+            lines += samples
+        lines.append("# EOF\n")
+        return "\n".join(lines)
+
+
+def render(devices: Iterable[DeviceMetrics]) -> str:
+    families = _Families()
+
+    for device in devices:
+        labels = {"device": device.device}
+        families.add(PREFIX + "_up", "gauge", labels, device.up, help="Whether the last poll succeeded.")
+
+        if device.data is not None:
+            for key, value in device.data.state.items():
+                # enums and blank values have no number
+                if isinstance(value, (bool, int, float)):
+                    families.add("{}_{}".format(PREFIX, key), "gauge", labels, value)
+
+            for address, description in device.data.alarms.items():
+                families.add(
+                    PREFIX + "_alarm_active", "gauge", {**labels, "address": address, "description": description}, 1,
+                    help="Raised alarms."
+                )
+
+        for data_type, address, value in device.raw:
+            families.add(PREFIX + "_raw", "gauge", {**labels, "type": data_type, "address": address}, value, help="Raw value of every polled address.")
+
+        telemetry = device.telemetry
+        families.add(PREFIX + "_poll_interval_seconds", "gauge", labels, device.poll_interval)
+        families.add(PREFIX + "_poll_lag_seconds", "gauge", labels, device.poll_lag, help="How late the last poll started.")
+        families.histogram(PREFIX + "_poll_duration_seconds", labels, telemetry.poll_duration, "Duration of the polls.")
+        families.histogram(PREFIX + "_request_latency_seconds", labels, telemetry.request_latency, "Latency of the requests.")
+        families.add(PREFIX + "_polls", "counter", labels, telemetry.polls, "_total")
+        families.add(PREFIX + "_failed_polls", "counter", labels, telemetry.failed_polls, "_total")
+        families.add(PREFIX + "_requests", "counter", labels, telemetry.requests, "_total")
+        for kind, count in telemetry.errors.items():
+            families.add(PREFIX + "_request_errors", "counter", {**labels, "kind": kind}, count, "_total")
+        families.add(PREFIX + "_retries", "counter", labels, telemetry.retries, "_total")
+        families.add(PREFIX + "_preempted_requests", "counter", labels, telemetry.preempted, "_total")
+        families.add(PREFIX + "_received_bytes", "counter", labels, telemetry.bytes_received, "_total")
+
+    return families.text()
+
+
+def _labels(labels: dict[str, str | int]) -> str:
+    return ",".join('{}="{}"'.format(name, _escape(str(value))) for name, value in labels.items())
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value: float) -> str:
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    return repr(value) if isinstance(value, float) else str(value)
@@ -0,0 +1,81 @@
+"""Derive the idOperacion 2001/2002 read blocks from the addresses in use."""
+
+from collections.abc import Iterable, Mapping
+
+# unused addresses read through before a new request is started, every extra
+# address costs a few bytes of response while every request costs a round trip
+MAX_GAP = 32
+# largest "num" sent in a single request
+MAX_LENGTH = 64
+
+
+def mapping_addresses(mapping: Mapping[str, dict], extra: Mapping[int, Iterable[int]] | None = None) -> dict[int, set[int]]:
+    """Collect the addresses each data type needs to decode the given mapping."""
+    addresses: dict[int, set[int]] = {}
+
+    for definition in mapping.values():
+        used = addresses.setdefault(definition["data_type"], set())
+        if "address" in definition:
+            used.add(definition["address"])
+        used.update(definition.get("addresses", ()))
+
+    for data_type, extra_addresses in (extra or {}).items():
+        addresses.setdefault(data_type, set()).update(extra_addresses)
+
+    return {data_type: used for data_type, used in addresses.items() if used}
+
+
+def plan_blocks(addresses: Iterable[int], max_gap: int = MAX_GAP, max_length: int = MAX_LENGTH) -> list[dict[str, int]]:
+    """Cover the addresses with the fewest blocks of at most max_length.
+
+    Addresses separated by no more than max_gap unused addresses are read in the
+    same block. Scanning the sorted addresses greedily gives the minimal number
+    of blocks for these two constraints.
+    """
+    if max_length < 1:
+        raise ValueError("max_length must be positive")
+
+    blocks = []
+    start = end = None
+
+    for address in sorted(set(addresses)):
+        if start is not None and address - end - 1 <= max_gap and address - start < max_length:
+            end = address
+            continue
+
+        if start is not None:
+            blocks.append({"address": start, "length": end - start + 1})
+        start = end = address
+
+    if start is not None:
+        blocks.append({"address": start, "length": end - start + 1})
+
+    return blocks
+
+
+def plan_requests(addresses: Mapping[int, Iterable[int]], max_gap: int = MAX_GAP, max_length: int = MAX_LENGTH) -> dict[int, list[dict[str, int]]]:
+    """Plan the read blocks for every data type."""
+    return {
+        data_type: plan_blocks(used, max_gap, max_length)
+        for data_type, used in addresses.items()
+    }
+
+
+def coalesce_writes(writes: Mapping[tuple[int, int], int], max_length: int = MAX_LENGTH) -> list[tuple[int, int, list[int]]]:
+    """Merge writes to consecutive addresses of a data type into multi value writes.
+
+    Takes {(data_type, address): word} and returns (data_type, address, words)
+    runs. Unlike reads, writes can't span gaps.
+    """
+    runs = []
+
+    for (data_type, address), word in sorted(writes.items()):
+        if runs:
+            run_type, run_address, words = runs[-1]
+            if run_type == data_type and run_address + len(words) == address and len(words) < max_length:
+                words.append(word)
+                continue
+
+        runs.append((data_type, address, [word]))
+
+    return runs
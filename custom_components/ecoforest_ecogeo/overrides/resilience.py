@@ -0,0 +1,111 @@
+"""Per block backoff and a device wide circuit breaker for the Easynet polls."""
+
+from dataclasses import dataclass
+
+# a failed block is skipped for BLOCK_BACKOFF_BASE * 2^(failures - 1) seconds, up to BLOCK_BACKOFF_MAX
+BLOCK_BACKOFF_BASE = 10
+BLOCK_BACKOFF_MAX = 300
+# the breaker opens after this many overloaded polls in a row
+BREAKER_THRESHOLD = 3
+# a poll counts as overloaded when at least this share of its blocks failed
+BREAKER_FAILURE_RATIO = 0.5
+# the device is left alone for BREAKER_COOLDOWN seconds, doubled every time it opens again, up to BREAKER_COOLDOWN_MAX
+BREAKER_COOLDOWN = 30
+BREAKER_COOLDOWN_MAX = 600
+
+
+@dataclass
+class BlockHealth:
+    failures: int = 0
+    # monotonic time before which the block is not read again
+    retry_at: float = 0.0
+    # wall clock time of the last good read, None until the block was read once
+    last_success: float | None = None
+
+
+class BlockBackoff:
+    """Track the failures of every read block and when each one may be retried."""
+
+    def __init__(self, base: float = BLOCK_BACKOFF_BASE, maximum: float = BLOCK_BACKOFF_MAX) -> None:
+        self._base = base
+        self._maximum = maximum
+        self._health: dict[tuple, BlockHealth] = {}
+
+    def due(self, block: tuple, now: float) -> bool:
+        health = self._health.get(block)
+        return health is None or now >= health.retry_at
+
+    def record_success(self, block: tuple, wall_time: float) -> None:
+        health = self._health.setdefault(block, BlockHealth())
+        health.failures = 0
+        health.retry_at = 0.0
+        health.last_success = wall_time
+
+    def record_failure(self, block: tuple, now: float) -> float:
+        """Count a failure, returns the seconds until the block is tried again."""
+        health = self._health.setdefault(block, BlockHealth())
+        health.failures += 1
+        delay = min(self._maximum, self._base * 2 ** (health.failures - 1))
+        health.retry_at = now + delay
+        return delay
+
+    def stale(self) -> dict[tuple, float | None]:
+        """Blocks whose last read failed, with the wall clock time of their last good read."""
+        return {block: health.last_success for block, health in self._health.items() if health.failures}
+
+    def prune(self, blocks: set[tuple]) -> None:
+        """Forget the blocks that are not read anymore."""
+        for block in self._health.keys() - blocks:
+            del self._health[block]
+
+
+class CircuitBreaker:
+    """Back off the whole device while it keeps failing most of its blocks.
+
+    Closed: every poll goes out. After BREAKER_THRESHOLD overloaded polls in a
+    row it opens and no poll goes out until the cooldown passed. The next poll
+    is a probe: if it goes well the breaker closes, otherwise it opens again
+    with twice the cooldown.
+    """
+
+    def __init__(
+        self,
+        threshold: int = BREAKER_THRESHOLD,
+        cooldown: float = BREAKER_COOLDOWN,
+        max_cooldown: float = BREAKER_COOLDOWN_MAX,
+    ) -> None:
+        self._threshold = threshold
+        self._base_cooldown = cooldown
+        self._max_cooldown = max_cooldown
+        self._cooldown = cooldown
+        self._overloaded = 0
+        # monotonic time the breaker opened until, None while closed
+        self.open_until: float | None = None
+
+    @property
+    def is_open(self) -> bool:
+        return self.open_until is not None
+
+    def allow(self, now: float) -> bool:
+        return self.open_until is None or now >= self.open_until
+
+    def record(self, blocks: int, failures: int, now: float) -> None:
+        """Count a poll, opens or closes the breaker."""
+        if not blocks:
+            # every block was backed off, nothing was sent that could tell how the device is doing
+            return
+
+        if failures < blocks * BREAKER_FAILURE_RATIO:
+            self._overloaded = 0
+            self._cooldown = self._base_cooldown
+            self.open_until = None
+            return
+
+        self._overloaded += 1
+        if self.open_until is not None:
+            # the probe failed as well
+            self._cooldown = min(self._max_cooldown, self._cooldown * 2)
+        elif self._overloaded < self._threshold:
+            return
+
+        self.open_until = now + self._cooldown
@@ -0,0 +1,206 @@
+"""Dump the whole coil and register address space of a device to a CSV file."""
+
+import asyncio, csv, logging
+from collections import deque
+from collections.abc import Iterable, Mapping
+from pathlib import Path
+from time import monotonic
+from typing import Any, NamedTuple, TextIO
+
+from pyecoforest.exceptions import EcoforestConnectionError
+
+from custom_components.ecoforest_ecogeo.overrides.api import ADDRESS_SPACE, DataTypes, EcoGeoApi
+from custom_components.ecoforest_ecogeo.overrides.catalog import CatalogEntry
+from custom_components.ecoforest_ecogeo.overrides.exceptions import EcoforestBadResponse
+from custom_components.ecoforest_ecogeo.overrides.planner import MAX_LENGTH
+
+_LOGGER = logging.getLogger(__name__)
+
+SCAN_CONCURRENCY = 4
+# rejected chunks without a documented address are split down to this many addresses and then reported unsupported as a whole
+MIN_SCAN_LENGTH = 8
+# a chunk failing with a connection error is tried this many more times before the scan gives up
+SCAN_RETRIES = 2
+
+SCAN_HEADER = ["type", "address", "raw", "value", "status", "kind", "description", "units"]
+
+
+class ScanResult(NamedTuple):
+    # addresses read of every data type
+    read: dict[str, int]
+    # (type, first, last) address runs the device rejected
+    unsupported: list[tuple[str, int, int]]
+    requests: int
+    seconds: float
+
+
+def _type_name(data_type: int) -> str:
+    return "coil" if data_type == DataTypes.Coil else "reg"
+
+
+class _Cursor:
+    """Next address to scan of a data type and the chunk length to read it with."""
+
+    def __init__(self, data_type: int, end: int, length: int) -> None:
+        self.data_type = data_type
+        self.address = 0
+        self.end = end
+        self.length = length
+
+
+class RegisterScan:
+    """Read every address in chunks that grow while the device serves them.
+
+    The controller answers a read touching an address it doesn't serve with an
+    error header, which _parse turns into EcoforestBadResponse. Such a chunk is
+    split in halves down to min_length addresses, a rejected chunk of that
+    size is reported unsupported as a whole rather than probed address by
+    address, unless it holds an address documented in Registers.csv, those
+    are isolated down to the single address. The chunk length halves on every rejection and doubles on every
+    success up to max_length, so supported ranges cost one request per
+    max_length addresses and unsupported runs one per min_length. Rows are
+    written as the chunks come in, annotated with the Registers.csv
+    description of the address when there is one.
+
+    Only the first address_space[data type] addresses are read, by default
+    the ADDRESS_SPACE of the api, 512 coils and 6000 registers. Addresses
+    past that are never probed, a model serving more needs a larger
+    address_space.
+    """
+
+    def __init__(
+        self,
+        api: EcoGeoApi,
+        path: Path,
+        documented: Iterable[CatalogEntry] = (),
+        data_types: Iterable[int] = (DataTypes.Register, DataTypes.Coil),
+        max_length: int = MAX_LENGTH,
+        concurrency: int = SCAN_CONCURRENCY,
+        min_length: int = MIN_SCAN_LENGTH,
+        address_space: Mapping[int, int] = ADDRESS_SPACE,
+    ) -> None:
+        self.api = api
+        self.path = path
+        self.documented = {(entry.data_type, entry.address): entry for entry in documented}
+        self.data_types = list(data_types)
+        self.max_length = max_length
+        self.min_length = max(1, min(min_length, max_length))
+        # addresses scanned of every data type, starting at 0
+        self.address_space = {data_type: address_space[data_type] for data_type in self.data_types}
+        # a controller that needs serial polling needs a serial scan as well
+        self.concurrency = max(1, min(concurrency, api.max_concurrent_requests))
+        self.requests = 0
+        self._read = dict.fromkeys(self.data_types, 0)
+        self._unsupported: list[tuple[int, int]] = []
+        # the workers' rows go out one batch at a time, concurrent writes from executor threads interleave
+        self._write_lock = asyncio.Lock()
+
+    async def run(self) -> ScanResult:
+        loop = asyncio.get_running_loop()
+        started = monotonic()
+        cursors = deque(_Cursor(data_type, end, self.max_length) for data_type, end in self.address_space.items() if end > 0)
+        # (cursor, address, length, attempt) of split or failed chunks, read before the cursors move on
+        chunks: deque[tuple[_Cursor, int, int, int]] = deque()
+
+        file = await loop.run_in_executor(None, self._open)
+        try:
+            workers = [asyncio.create_task(self._worker(cursors, chunks, file)) for _ in range(self.concurrency)]
+            try:
+                # a worker raising ends the scan, the others are cancelled
+                await asyncio.gather(*workers)
+            finally:
+                for worker in workers:
+                    worker.cancel()
+        finally:
+            await asyncio.shield(loop.run_in_executor(None, file.close))
+
+        result = ScanResult(
+            {_type_name(data_type): count for data_type, count in self._read.items()},
+            self._merged_unsupported(),
+            self.requests,
+            round(monotonic() - started, 2),
+        )
+        _LOGGER.info("scanned %s in %d requests and %.1f s to %s", result.read, result.requests, result.seconds, self.path)
+        return result
+
+    async def _worker(self, cursors: deque[_Cursor], chunks: deque, file: TextIO) -> None:
+        while chunks or cursors:
+            if chunks:
+                cursor, address, length, attempt = chunks.popleft()
+            else:
+                cursor = cursors[0]
+                address, length, attempt = cursor.address, min(cursor.length, cursor.end - cursor.address), 0
+                cursor.address += length
+                if cursor.address >= cursor.end:
+                    cursors.popleft()
+
+            data_type = cursor.data_type
+            self.requests += 1
+            try:
+                values = await self.api.read_block(data_type, address, length)
+            except EcoforestBadResponse:
+                cursor.length = max(self.min_length, cursor.length // 2)
+                if length == 1 or (length <= self.min_length and not self._documented_in(data_type, address, length)):
+                    self._unsupported += [(data_type, unsupported) for unsupported in range(address, address + length)]
+                    rows = [self._row(data_type, unsupported, None) for unsupported in range(address, address + length)]
+                    await self._write_rows(file, rows)
+                    continue
+                # the halves go first, the rejected addresses are isolated before the scan moves on
+                half = length // 2
+                chunks.appendleft((cursor, address + half, length - half, 0))
+                chunks.appendleft((cursor, address, half, 0))
+                continue
+            except EcoforestConnectionError:
+                if attempt >= SCAN_RETRIES:
+                    raise
+                chunks.appendleft((cursor, address, length, attempt + 1))
+                continue
+
+            cursor.length = min(self.max_length, cursor.length * 2)
+            self._read[data_type] += length
+            rows = [self._row(data_type, address + offset, value) for offset, value in enumerate(values)]
+            await self._write_rows(file, rows)
+
+    def _documented_in(self, data_type: int, address: int, length: int) -> bool:
+        return any((data_type, documented) in self.documented for documented in range(address, address + length))
+
+    def _row(self, data_type: int, address: int, raw: int | None) -> list[Any]:
+        entry = self.documented.get((data_type, address))
+        value = raw
+        if raw is not None and entry is not None and entry.kind == "Analog":
+            # analog registers carry one decimal
+            value = raw / 10
+
+        return [
+            _type_name(data_type),
+            address,
+            raw,
+            value,
+            "ok" if raw is not None else "unsupported",
+            entry.kind if entry else "",
+            entry.description if entry else "",
+            entry.units if entry else "",
+        ]
+
+    def _merged_unsupported(self) -> list[tuple[str, int, int]]:
+        runs = []
+        for data_type, address in sorted(self._unsupported):
+            if runs and runs[-1][0] == data_type and runs[-1][2] == address - 1:
+                runs[-1][2] = address
+            else:
+                runs.append([data_type, address, address])
+        return [(_type_name(data_type), first, last) for data_type, first, last in runs]
+
+    def _open(self) -> TextIO:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        file = self.path.open("w", newline="")
+        csv.writer(file).writerow(SCAN_HEADER)
+        return file
+
+    async def _write_rows(self, file: TextIO, rows: list[list[Any]]) -> None:
+        async with self._write_lock:
+            await asyncio.get_running_loop().run_in_executor(None, self._write, file, rows)
+
+    @staticmethod
+    def _write(file: TextIO, rows: list[list[Any]]) -> None:
+        csv.writer(file).writerows(rows)
@@ -0,0 +1,129 @@
+"""Request, block and poll statistics of an EcoGeoApi."""
+
+from bisect import bisect_left
+from typing import Any
+
+# upper bounds in ms of the latency histogram buckets, the last bucket takes everything above
+LATENCY_BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+ERROR_KINDS = ("timeout", "http", "auth", "connection", "bad_response")
+
+
+class Histogram:
+    """Fixed bucket histogram, cheap enough to observe every request."""
+
+    def __init__(self, bounds: tuple[float, ...] = LATENCY_BUCKETS_MS) -> None:
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+        self.last: float | None = None
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        self.maximum = max(self.maximum, value)
+        self.last = value
+
+    def percentile(self, share: float) -> float | None:
+        """Upper bound of the bucket holding the given share of the observations, at most the largest one."""
+        if not self.count:
+            return None
+
+        rank = share * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.maximum)
+
+        return self.maximum
+
+    @property
+    def mean(self) -> float | None:
+        return self.total / self.count if self.count else None
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "p50": self.percentile(0.5),
+            "p90": self.percentile(0.9),
+            "p99": self.percentile(0.99),
+            "max": self.maximum,
+            "last": self.last,
+            "buckets": dict(zip([*map(str, self.bounds), "inf"], self.counts)),
+        }
+
+
+class Telemetry:
+    """Counters and histograms filled in by the api and the coordinator."""
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.errors = dict.fromkeys(ERROR_KINDS, 0)
+        # failed blocks tried again within the same poll
+        self.retries = 0
+        # blocks left out of a poll because they are backed off
+        self.skipped = 0
+        self.breaker_trips = 0
+        # poll requests cancelled to let a write through, they are sent again
+        self.preempted = 0
+        self.polls = 0
+        self.failed_polls = 0
+        # all latencies are in ms
+        self.request_latency = Histogram()
+        self.poll_duration = Histogram()
+        # {"reg 1+31": Histogram} of the successful block reads
+        self.blocks: dict[str, Histogram] = {}
+        # {"reg 1+31": bytes} of the last response of every block
+        self.block_bytes: dict[str, int] = {}
+
+    @property
+    def error_count(self) -> int:
+        return sum(self.errors.values())
+
+    def record_request(self, seconds: float, sent: int, received: int) -> None:
+        self.requests += 1
+        self.bytes_sent += sent
+        self.bytes_received += received
+        self.request_latency.observe(seconds * 1000)
+
+    def record_error(self, kind: str) -> None:
+        self.errors[kind] += 1
+
+    def record_block(self, label: str, seconds: float, received: int) -> None:
+        if label not in self.blocks:
+            self.blocks[label] = Histogram()
+        self.blocks[label].observe(seconds * 1000)
+        self.block_bytes[label] = received
+
+    def record_poll(self, seconds: float, ok: bool) -> None:
+        self.polls += 1
+        if not ok:
+            self.failed_polls += 1
+        self.poll_duration.observe(seconds * 1000)
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received,
+            "errors": dict(self.errors),
+            "retries": self.retries,
+            "skipped_blocks": self.skipped,
+            "breaker_trips": self.breaker_trips,
+            "preempted": self.preempted,
+            "polls": self.polls,
+            "failed_polls": self.failed_polls,
+            "request_latency_ms": self.request_latency.as_dict(),
+            "poll_duration_ms": self.poll_duration.as_dict(),
+            "blocks": {
+                label: {**histogram.as_dict(), "bytes": self.block_bytes.get(label)}
+                for label, histogram in self.blocks.items()
+            },
+        }
@@ -0,0 +1,335 @@
+"""Wire protocols EcoGeoApi reads and writes coils and registers over.
+
+Both address the device by the BMS addresses of Registers.csv and hand back
+the same typed arrays, the decode path above them doesn't know which one is
+in use.
+"""
+
+import asyncio, logging, struct, sys
+from abc import ABC, abstractmethod
+from array import array
+from http import HTTPStatus
+from itertools import count
+from typing import Any, NamedTuple
+from urllib.parse import urlencode
+
+import httpx
+from pyecoforest.const import LOCAL_TIMEOUT, URL_CGI
+from pyecoforest.exceptions import EcoforestAuthenticationRequired, EcoforestConnectionError
+from pyecoforest.ssl import NO_VERIFY_SSL_CONTEXT
+
+from custom_components.ecoforest_ecogeo.overrides.codec import COIL_TYPECODE, REGISTER_TYPECODE, decode_coils, decode_registers
+from custom_components.ecoforest_ecogeo.overrides.exceptions import EcoforestBadResponse
+from custom_components.ecoforest_ecogeo.overrides.telemetry import Telemetry
+
+_LOGGER = logging.getLogger(__name__)
+
+OP_TYPE_GET_SWITCH = 2001
+OP_TYPE_SET_SWITCH = 2011
+OP_TYPE_GET_REGISTER = 2002
+OP_TYPE_SET_REGISTER = 2012
+
+# idle keep-alive connections are kept across polls rather than reconnecting every time
+KEEPALIVE_EXPIRY = 60
+
+MODBUS_PORT = 502
+MODBUS_UNIT_ID = 1
+# seconds to connect and to answer a request
+MODBUS_TIMEOUT = 5.0
+
+FC_READ_COILS = 1
+FC_READ_HOLDING_REGISTERS = 3
+FC_WRITE_MULTIPLE_COILS = 15
+FC_WRITE_MULTIPLE_REGISTERS = 16
+
+_LITTLE_ENDIAN = sys.byteorder == "little"
+
+
+class Reply(NamedTuple):
+    # values read, empty for a write
+    values: array
+    sent: int
+    received: int
+
+
+class Transport(ABC):
+    """Reads and writes runs of coils or registers.
+
+    Coil values are 0 or 1, register values signed 16 bit when read and
+    unsigned 16 bit words when written. Failures are raised as the pyecoforest
+    exceptions, EcoforestBadResponse when the device rejects the addresses,
+    and counted in telemetry.
+    """
+
+    # whether a poll request in flight may be cancelled to let a write through
+    preempt = True
+
+    def __init__(self) -> None:
+        self.telemetry = Telemetry()
+
+    @abstractmethod
+    async def read_coils(self, address: int, length: int) -> Reply:
+        """Read length coils from address."""
+
+    @abstractmethod
+    async def read_registers(self, address: int, length: int) -> Reply:
+        """Read length registers from address."""
+
+    @abstractmethod
+    async def write_coils(self, address: int, values: list[int]) -> Reply:
+        """Write the coils from address on."""
+
+    @abstractmethod
+    async def write_registers(self, address: int, values: list[int]) -> Reply:
+        """Write the registers from address on."""
+
+    @abstractmethod
+    async def close(self) -> None:
+        """Close the connections to the device."""
+
+
+class EasynetTransport(Transport):
+    """The Easynet web interface, form posts to its CGI answered with hex text.
+
+    client replaces the http client made for host, such as one on the in
+    process transport of the Easynet simulator. Either way it is closed with
+    the transport.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        user: str,
+        password: str,
+        max_connections: int,
+        client: httpx.AsyncClient | None = None,
+    ) -> None:
+        super().__init__()
+        self._auth = httpx.BasicAuth(user, password)
+        self._timeout = LOCAL_TIMEOUT
+        # one long lived client per device, sized so that a concurrent poll never opens more sockets than it needs
+        self._client = client or httpx.AsyncClient(
+            base_url=host,
+            verify=NO_VERIFY_SSL_CONTEXT,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+                keepalive_expiry=KEEPALIVE_EXPIRY,
+            ),
+        )  # nosec
+
+    async def read_coils(self, address: int, length: int) -> Reply:
+        words, sent, received = await self._read(OP_TYPE_GET_SWITCH, address, length)
+        return Reply(decode_coils(words), sent, received)
+
+    async def read_registers(self, address: int, length: int) -> Reply:
+        words, sent, received = await self._read(OP_TYPE_GET_REGISTER, address, length)
+        return Reply(decode_registers(words), sent, received)
+
+    async def write_coils(self, address: int, values: list[int]) -> Reply:
+        return await self._write(OP_TYPE_SET_SWITCH, address, [str(value) for value in values])
+
+    async def write_registers(self, address: int, values: list[int]) -> Reply:
+        return await self._write(OP_TYPE_SET_REGISTER, address, ["{:04x}".format(value & 0xFFFF) for value in values])
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+    async def _read(self, op_type: int, address: int, length: int) -> tuple[list[str], int, int]:
+        words, sent, received = await self._request({"idOperacion": op_type, "dir": address, "num": length})
+
+        if len(words) < length:
+            self.telemetry.record_error("bad_response")
+            raise EcoforestBadResponse("short response: {} of {} values".format(len(words), length))
+
+        return words[:length], sent, received
+
+    async def _write(self, op_type: int, address: int, words: list[str]) -> Reply:
+        # a list of pairs keeps the order and repeats of the write values
+        _, sent, received = await self._request([
+            ("idOperacion", op_type),
+            ("dir", address),
+            ("num", len(words)),
+            *((word, word) for word in words),
+        ])
+        return Reply(array(REGISTER_TYPECODE), sent, received)
+
+    async def _request(self, data: dict[str, Any] | list[tuple[Any, Any]]) -> tuple[list[str], int, int]:
+        if _LOGGER.isEnabledFor(logging.DEBUG):
+            _LOGGER.debug("Sending POST to %s with data %s", URL_CGI, data)
+
+        try:
+            response = await self._post(data)
+            response.raise_for_status()
+        except httpx.TimeoutException as error:
+            self.telemetry.record_error("timeout")
+            raise EcoforestConnectionError("Timeout occurred while connecting to the device.") from error
+        except httpx.HTTPStatusError as error:
+            if error.response.status_code in (HTTPStatus.UNAUTHORIZED, HTTPStatus.FORBIDDEN):
+                self.telemetry.record_error("auth")
+                raise EcoforestAuthenticationRequired(error.response.status_code) from error
+            self.telemetry.record_error("http")
+            raise EcoforestConnectionError("Error occurred while communicating with device.") from error
+        except httpx.HTTPError as error:
+            self.telemetry.record_error("connection")
+            raise EcoforestConnectionError("Error occurred while communicating with device.") from error
+
+        try:
+            parsed = self._parse(response.text)
+        except EcoforestBadResponse:
+            self.telemetry.record_error("bad_response")
+            raise
+
+        if _LOGGER.isEnabledFor(logging.DEBUG):
+            _LOGGER.debug("Received from POST with data %s", parsed)
+
+        return parsed, len(response.request.content), len(response.content)
+
+    async def _post(self, data: dict[str, Any] | list[tuple[Any, Any]]) -> httpx.Response:
+        return await self._client.post(
+            URL_CGI,
+            auth=self._auth,
+            timeout=self._timeout,
+            content=urlencode(list(data.items()) if isinstance(data, dict) else data),
+            headers={"Content-Type": "application/x-www-form-urlencoded"},
+        )
+
+    def _parse(self, response: str) -> list[str]:
+        lines = response.split('\n')
+
+        a, _, b = lines[0].partition('=')
+        if a not in ["error_geo_get_reg", "error_geo_get_bit", "error_geo_set_reg", "error_geo_set_bit"] or b != "0" or len(lines) < 2:
+            raise EcoforestBadResponse("bad response: {}".format(response.strip()))
+
+        return lines[1].split('&')[2:]
+
+
+class ModbusTransport(Transport):
+    """Modbus TCP straight to the controller's BMS port, binary bulk reads and writes.
+
+    One connection, one request at a time, which is what small Modbus servers
+    cope with. A request that fails or is cancelled midway drops the
+    connection, the next one reconnects.
+    """
+
+    # a read takes milliseconds, cancelling one costs a reconnect
+    preempt = False
+
+    def __init__(
+        self,
+        host: str,
+        port: int = MODBUS_PORT,
+        unit_id: int = MODBUS_UNIT_ID,
+        timeout: float = MODBUS_TIMEOUT,
+    ) -> None:
+        super().__init__()
+        self.host = host
+        self.port = port
+        self.unit_id = unit_id
+        self.timeout = timeout
+        self._lock = asyncio.Lock()
+        self._transactions = count(1)
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+
+    async def read_coils(self, address: int, length: int) -> Reply:
+        data, sent, received = await self._request(FC_READ_COILS, struct.pack(">HH", address, length))
+
+        if len(data) != 1 + (length + 7) // 8 or data[0] != len(data) - 1:
+            self.telemetry.record_error("bad_response")
+            raise EcoforestBadResponse("bad coil response: {} bytes for {} coils".format(len(data), length))
+
+        bits = data[1:]
+        return Reply(array(COIL_TYPECODE, ((bits[i >> 3] >> (i & 7)) & 1 for i in range(length))), sent, received)
+
+    async def read_registers(self, address: int, length: int) -> Reply:
+        data, sent, received = await self._request(FC_READ_HOLDING_REGISTERS, struct.pack(">HH", address, length))
+
+        if len(data) != 1 + 2 * length or data[0] != 2 * length:
+            self.telemetry.record_error("bad_response")
+            raise EcoforestBadResponse("bad register response: {} bytes for {} registers".format(len(data), length))
+
+        block = array(REGISTER_TYPECODE, data[1:])
+        if _LITTLE_ENDIAN:
+            block.byteswap()
+
+        return Reply(block, sent, received)
+
+    async def write_coils(self, address: int, values: list[int]) -> Reply:
+        bits = bytearray((len(values) + 7) // 8)
+        for index, value in enumerate(values):
+            if value:
+                bits[index >> 3] |= 1 << (index & 7)
+
+        _, sent, received = await self._request(
+            FC_WRITE_MULTIPLE_COILS, struct.pack(">HHB", address, len(values), len(bits)) + bits
+        )
+        return Reply(array(COIL_TYPECODE), sent, received)
+
+    async def write_registers(self, address: int, values: list[int]) -> Reply:
+        words = array("H", (value & 0xFFFF for value in values))
+        if _LITTLE_ENDIAN:
+            words.byteswap()
+
+        _, sent, received = await self._request(
+            FC_WRITE_MULTIPLE_REGISTERS, struct.pack(">HHB", address, len(values), 2 * len(values)) + words.tobytes()
+        )
+        return Reply(array(REGISTER_TYPECODE), sent, received)
+
+    async def close(self) -> None:
+        writer = self._writer
+        self._drop()
+        if writer is not None:
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+
+    async def _request(self, function: int, payload: bytes) -> tuple[bytes, int, int]:
+        """Send one PDU and return the data of the answer, without the function code."""
+        async with self._lock:
+            transaction = next(self._transactions) & 0xFFFF
+            frame = struct.pack(">HHHBB", transaction, 0, len(payload) + 2, self.unit_id, function) + payload
+
+            try:
+                async with asyncio.timeout(self.timeout):
+                    if self._writer is None:
+                        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+                    self._writer.write(frame)
+                    await self._writer.drain()
+
+                    header = await self._reader.readexactly(7)
+                    answer_transaction, protocol, length, _ = struct.unpack(">HHHB", header)
+                    pdu = await self._reader.readexactly(length - 1)
+            except TimeoutError as error:
+                self._drop()
+                self.telemetry.record_error("timeout")
+                raise EcoforestConnectionError("Timeout occurred while connecting to the device.") from error
+            except (OSError, asyncio.IncompleteReadError) as error:
+                self._drop()
+                self.telemetry.record_error("connection")
+                raise EcoforestConnectionError("Error occurred while communicating with device.") from error
+            except BaseException:
+                # cancelled halfway, the answer would be read by the next request
+                self._drop()
+                raise
+
+            if answer_transaction != transaction or protocol != 0 or not pdu:
+                self._drop()
+                self.telemetry.record_error("bad_response")
+                raise EcoforestBadResponse("bad frame: transaction {} of {}".format(answer_transaction, transaction))
+
+        if pdu[0] == function | 0x80:
+            # illegal function, address or value
+            self.telemetry.record_error("bad_response")
+            raise EcoforestBadResponse("modbus exception {} to function {}".format(pdu[1] if len(pdu) > 1 else "?", function))
+        if pdu[0] != function:
+            self.telemetry.record_error("bad_response")
+            raise EcoforestBadResponse("modbus function {} answered with {}".format(function, pdu[0]))
+
+        return pdu[1:], len(frame), len(header) + len(pdu)
+
+    def _drop(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = self._writer = None
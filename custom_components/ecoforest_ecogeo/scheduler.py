@@ -0,0 +1,123 @@
+"""Poll scheduler shared by every Ecoforest config entry."""
+
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass, field
+import logging
+import random
+from datetime import datetime
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+
+from .const import MAX_IN_FLIGHT_REQUESTS, POLL_JITTER
+from .coordinator import EcoforestCoordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass
+class _Slot:
+    entry_id: str
+    coordinator: EcoforestCoordinator
+    # loop time the next poll is planned for
+    planned: float = 0.0
+    cancel: CALLBACK_TYPE | None = None
+    task: asyncio.Task | None = field(default=None, repr=False)
+
+
+class PollScheduler:
+    """Spread the polls of all devices evenly over their interval.
+
+    Without it every coordinator runs its own timer and a dozen heat pumps set
+    up together keep polling in the same burst. Device i of n is polled at
+    i/n of its interval plus a little jitter, and every request of every device
+    goes through the shared limiter so that no more than max_in_flight are
+    outstanding at once.
+    """
+
+    def __init__(self, hass: HomeAssistant, max_in_flight: int = MAX_IN_FLIGHT_REQUESTS) -> None:
+        self.hass = hass
+        self.limiter = asyncio.Semaphore(max_in_flight)
+        self._slots: dict[str, _Slot] = {}
+
+    @property
+    def devices(self) -> int:
+        return len(self._slots)
+
+    @callback
+    def async_register(self, entry_id: str, coordinator: EcoforestCoordinator) -> None:
+        """Start polling a device."""
+        self._slots[entry_id] = _Slot(entry_id, coordinator)
+        self._async_spread()
+
+    @callback
+    def async_unregister(self, entry_id: str) -> None:
+        """Stop polling a device and spread the remaining ones again."""
+        slot = self._slots.pop(entry_id, None)
+        if slot is not None:
+            self._async_cancel(slot)
+            self._async_spread()
+
+    @callback
+    def _async_spread(self) -> None:
+        """Give every device its own phase within its interval."""
+        now = self.hass.loop.time()
+        count = len(self._slots)
+
+        for index, slot in enumerate(sorted(self._slots.values(), key=lambda slot: slot.entry_id)):
+            interval = slot.coordinator.poll_interval.total_seconds()
+            phase = interval * index / count
+            slot.planned = now + (phase - now) % interval
+            self._async_schedule(slot)
+
+    @callback
+    def _async_schedule(self, slot: _Slot) -> None:
+        if slot.cancel is not None:
+            slot.cancel()
+
+        spacing = slot.coordinator.poll_interval.total_seconds() / max(1, len(self._slots))
+        delay = max(0.0, slot.planned - self.hass.loop.time()) + random.uniform(0, spacing * POLL_JITTER)
+
+        @callback
+        def fire(_now: datetime) -> None:
+            slot.cancel = None
+            slot.task = self.hass.async_create_background_task(
+                self._async_poll(slot), f"ecoforest_ecogeo poll {slot.entry_id}"
+            )
+
+        slot.cancel = async_call_later(self.hass, delay, fire)
+
+    @callback
+    def _async_cancel(self, slot: _Slot) -> None:
+        if slot.cancel is not None:
+            slot.cancel()
+            slot.cancel = None
+        if slot.task is not None and not slot.task.done():
+            slot.task.cancel()
+
+    async def _async_poll(self, slot: _Slot) -> None:
+        coordinator = slot.coordinator
+        coordinator.poll_lag = max(0.0, self.hass.loop.time() - slot.planned)
+
+        if coordinator.poll_lag > coordinator.poll_interval.total_seconds():
+            _LOGGER.warning("%s poll is running %.1f s late", coordinator.name, coordinator.poll_lag)
+
+        if coordinator.capture is None:
+            await coordinator.async_refresh()
+        else:
+            # the capture keeps the device busy, the entities keep their values until it ends
+            _LOGGER.debug("%s poll skipped during a burst capture", coordinator.name)
+
+        if self._slots.get(slot.entry_id) is not slot:
+            return
+
+        # keep the phase, skipping the slots a slow poll overran
+        interval = coordinator.poll_interval.total_seconds()
+        now = self.hass.loop.time()
+        slot.planned += interval
+        if slot.planned < now:
+            slot.planned += ((now - slot.planned) // interval + 1) * interval
+
+        self._async_schedule(slot)
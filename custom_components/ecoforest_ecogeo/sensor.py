@@ -3,15 +3,19 @@
 from __future__ import annotations
 
 import logging
+from collections.abc import Callable
+from dataclasses import dataclass
 from functools import cached_property
+from typing import Any
 
 from homeassistant.components.sensor import (
     SensorDeviceClass,
     SensorEntity,
     SensorEntityDescription,
+    SensorStateClass,
 )
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import CONF_ALIAS
+from homeassistant.const import CONF_ALIAS, EntityCategory, UnitOfInformation, UnitOfTime
 from homeassistant.helpers.typing import StateType
 
 from homeassistant.core import HomeAssistant
@@ -22,11 +26,86 @@ from .coordinator import EcoforestCoordinator
 from .entity import EcoforestEntity, EcoforestSensorEntityDescription
 from .overrides.device import EcoGeoDevice
 from .overrides.api import MAPPING
+from .overrides.metrics import METRICS
 from .entity import SENSOR_TYPES
 
 _LOGGER = logging.getLogger(__name__)
 
 
+@dataclass(frozen=True, kw_only=True)
+class EcoforestTelemetrySensorEntityDescription(SensorEntityDescription):
+    """Describes a sensor of the polling telemetry."""
+
+    telemetry_fn: Callable[[EcoforestCoordinator], StateType]
+    entity_category: EntityCategory | None = EntityCategory.DIAGNOSTIC
+    entity_registry_enabled_default: bool = False
+
+
+TELEMETRY_SENSORS = (
+    EcoforestTelemetrySensorEntityDescription(
+        key="telemetry_poll_duration",
+        translation_key="telemetry_poll_duration",
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        suggested_display_precision=0,
+        telemetry_fn=lambda coordinator: coordinator.api.telemetry.poll_duration.last,
+    ),
+    EcoforestTelemetrySensorEntityDescription(
+        key="telemetry_request_latency_p90",
+        translation_key="telemetry_request_latency_p90",
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        telemetry_fn=lambda coordinator: coordinator.api.telemetry.request_latency.percentile(0.9),
+    ),
+    EcoforestTelemetrySensorEntityDescription(
+        key="telemetry_poll_lag",
+        translation_key="telemetry_poll_lag",
+        native_unit_of_measurement=UnitOfTime.SECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        suggested_display_precision=1,
+        telemetry_fn=lambda coordinator: coordinator.poll_lag,
+    ),
+    EcoforestTelemetrySensorEntityDescription(
+        key="telemetry_poll_interval",
+        translation_key="telemetry_poll_interval",
+        native_unit_of_measurement=UnitOfTime.SECONDS,
+        telemetry_fn=lambda coordinator: coordinator.poll_interval.total_seconds(),
+    ),
+    EcoforestTelemetrySensorEntityDescription(
+        key="telemetry_requests",
+        translation_key="telemetry_requests",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        telemetry_fn=lambda coordinator: coordinator.api.telemetry.requests,
+    ),
+    EcoforestTelemetrySensorEntityDescription(
+        key="telemetry_errors",
+        translation_key="telemetry_errors",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        telemetry_fn=lambda coordinator: coordinator.api.telemetry.error_count,
+    ),
+    EcoforestTelemetrySensorEntityDescription(
+        key="telemetry_bad_responses",
+        translation_key="telemetry_bad_responses",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        telemetry_fn=lambda coordinator: coordinator.api.telemetry.errors["bad_response"],
+    ),
+    EcoforestTelemetrySensorEntityDescription(
+        key="telemetry_retries",
+        translation_key="telemetry_retries",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        telemetry_fn=lambda coordinator: coordinator.api.telemetry.retries,
+    ),
+    EcoforestTelemetrySensorEntityDescription(
+        key="telemetry_bytes_received",
+        translation_key="telemetry_bytes_received",
+        device_class=SensorDeviceClass.DATA_SIZE,
+        native_unit_of_measurement=UnitOfInformation.BYTES,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        telemetry_fn=lambda coordinator: coordinator.api.telemetry.bytes_received,
+    ),
+)
+
+
 async def async_setup_entry(
     hass: HomeAssistant, config_entry: ConfigEntry, async_add_entities: AddEntitiesCallback
 ) -> None:
@@ -37,6 +116,17 @@ async def async_setup_entry(
     entities = [
         EcoforestSensor(coordinator, key, definition, device_alias) for key, definition in MAPPING.items() if definition["entity_type"] in SENSOR_TYPES.keys()
     ]
+    # the Registers.csv registers, disabled until somebody enables them
+    entities += [
+        EcoforestSensor(coordinator, key, definition, device_alias) for key, definition in coordinator.catalog.items() if definition["entity_type"] in SENSOR_TYPES.keys()
+    ]
+    # energy, COP and means derived from the power readings
+    entities += [
+        EcoforestSensor(coordinator, key, definition, device_alias) for key, definition in METRICS.items()
+    ]
+    entities += [
+        EcoforestTelemetrySensor(coordinator, description, device_alias) for description in TELEMETRY_SENSORS
+    ]
 
     async_add_entities(entities)
 
@@ -51,4 +141,45 @@ class EcoforestSensor(SensorEntity, EcoforestEntity):
         if self.entity_description.value_fn is not None:
             return self.entity_description.value_fn(self.data)
 
-        return self.data.state[self.entity_description.key]
+        # catalog registers are only decoded once the poll set picked them up
+        return self.data.state.get(self.entity_description.key)
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any] | None:
+        """List every raised alarm on the alarm sensor, its state only holds the first one."""
+        attributes = super().extra_state_attributes
+        if self.entity_description.key != "alarm":
+            return attributes
+
+        return {
+            **(attributes or {}),
+            "active_alarms": [
+                {"code": address, "description": description} for address, description in self.data.alarms.items()
+            ],
+        }
+
+
+class EcoforestTelemetrySensor(SensorEntity, EcoforestEntity):
+    """Diagnostic sensor of the polling pipeline."""
+    entity_description: EcoforestTelemetrySensorEntityDescription
+    _update_always = True
+
+    def __init__(
+        self,
+        coordinator: EcoforestCoordinator,
+        description: EcoforestTelemetrySensorEntityDescription,
+        device_alias: str
+    ) -> None:
+        """Initialize the telemetry sensor."""
+        super().__init__(coordinator, description.key, {"entity_type": "telemetry"}, device_alias)
+        self.entity_description = description
+
+    @property
+    def available(self) -> bool:
+        """Stay available while polls fail, that is when the telemetry matters."""
+        return self.coordinator.data is not None
+
+    @property
+    def native_value(self) -> StateType:
+        """Return the state of the sensor."""
+        return self.entity_description.telemetry_fn(self.coordinator)
@@ -0,0 +1,195 @@
+"""Services of the Ecoforest integration."""
+
+from __future__ import annotations
+
+import logging
+from pathlib import Path
+from time import time
+
+import voluptuous as vol
+from pyecoforest.exceptions import EcoforestError
+
+from homeassistant.core import HomeAssistant, ServiceCall, ServiceResponse, SupportsResponse
+from homeassistant.exceptions import HomeAssistantError, ServiceValidationError
+from homeassistant.helpers import config_validation as cv
+from homeassistant.util import dt as dt_util, slugify
+
+from .const import CAPTURE_DIRECTORY, DOMAIN
+from .coordinator import EcoforestCoordinator
+from .overrides.api import MAPPING, DataTypes
+from .overrides.capture import MAX_CAPTURE_DURATION, MIN_CAPTURE_INTERVAL, BurstCapture
+from .overrides.catalog import read_registers_csv
+from .overrides.scan import RegisterScan
+
+_LOGGER = logging.getLogger(__name__)
+
+SERVICE_GET_REGISTER_HISTORY = "get_register_history"
+SERVICE_START_BURST_CAPTURE = "start_burst_capture"
+SERVICE_STOP_BURST_CAPTURE = "stop_burst_capture"
+SERVICE_SCAN_REGISTERS = "scan_registers"
+
+ATTR_CONFIG_ENTRY = "config_entry"
+ATTR_DATA_TYPE = "data_type"
+ATTR_ADDRESS = "address"
+ATTR_MINUTES = "minutes"
+ATTR_KEYS = "keys"
+ATTR_REGISTERS = "registers"
+ATTR_COILS = "coils"
+ATTR_INTERVAL = "interval"
+ATTR_DURATION = "duration"
+
+DATA_TYPES = {"register": DataTypes.Register, "coil": DataTypes.Coil}
+
+GET_REGISTER_HISTORY_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_CONFIG_ENTRY): cv.string,
+        vol.Optional(ATTR_DATA_TYPE, default="register"): vol.In(DATA_TYPES),
+        vol.Required(ATTR_ADDRESS): vol.All(vol.Coerce(int), vol.Range(min=0)),
+        vol.Optional(ATTR_MINUTES, default=60): vol.All(vol.Coerce(float), vol.Range(min=0)),
+    }
+)
+
+START_BURST_CAPTURE_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_CONFIG_ENTRY): cv.string,
+        vol.Optional(ATTR_KEYS, default=list): vol.All(cv.ensure_list, [cv.string]),
+        vol.Optional(ATTR_REGISTERS, default=list): vol.All(cv.ensure_list, [vol.Coerce(int)]),
+        vol.Optional(ATTR_COILS, default=list): vol.All(cv.ensure_list, [vol.Coerce(int)]),
+        vol.Optional(ATTR_INTERVAL, default=1.0): vol.All(vol.Coerce(float), vol.Range(min=MIN_CAPTURE_INTERVAL)),
+        vol.Optional(ATTR_DURATION, default=300.0): vol.All(vol.Coerce(float), vol.Range(min=1, max=MAX_CAPTURE_DURATION)),
+    }
+)
+
+STOP_BURST_CAPTURE_SCHEMA = vol.Schema({vol.Required(ATTR_CONFIG_ENTRY): cv.string})
+
+SCAN_REGISTERS_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_CONFIG_ENTRY): cv.string,
+        vol.Optional(ATTR_DATA_TYPE, default=list(DATA_TYPES)): vol.All(cv.ensure_list, [vol.In(DATA_TYPES)]),
+    }
+)
+
+
+def _output_path(hass: HomeAssistant, call: ServiceCall, suffix: str = "") -> Path:
+    """<config>/ecoforest_captures/<entry title><suffix>_<local time>.csv"""
+    entry = hass.config_entries.async_get_entry(call.data[ATTR_CONFIG_ENTRY])
+    name = "{}{}_{}.csv".format(slugify(entry.title), suffix, dt_util.now().strftime("%Y%m%d_%H%M%S"))
+    return Path(hass.config.path(CAPTURE_DIRECTORY, name))
+
+
+def _coordinator(hass: HomeAssistant, call: ServiceCall) -> EcoforestCoordinator:
+    entry_id = call.data[ATTR_CONFIG_ENTRY]
+    coordinator = hass.data.get(DOMAIN, {}).get(entry_id)
+    if not isinstance(coordinator, EcoforestCoordinator):
+        raise ServiceValidationError(f"{entry_id} is not a loaded Ecoforest entry")
+    return coordinator
+
+
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the services of the integration."""
+
+    async def async_get_register_history(call: ServiceCall) -> ServiceResponse:
+        """Return the raw values a register or coil had in the polls of the last minutes."""
+        coordinator = _coordinator(hass, call)
+        data_type = DATA_TYPES[call.data[ATTR_DATA_TYPE]]
+        address = call.data[ATTR_ADDRESS]
+
+        if not any(dt == data_type and start <= address < start + length for dt, start, length in coordinator.api.history.blocks):
+            raise ServiceValidationError(
+                f"{call.data[ATTR_DATA_TYPE]} {address} is not polled, enable an entity reading it first"
+            )
+
+        since = time() - call.data[ATTR_MINUTES] * 60
+        return {
+            "values": [
+                {"time": dt_util.utc_from_timestamp(read_time).isoformat(), "value": value}
+                for read_time, value in coordinator.api.history.query(data_type, address, since)
+            ]
+        }
+
+    async def async_start_burst_capture(call: ServiceCall) -> ServiceResponse:
+        """Sample keys and addresses at a high rate to a CSV file, the regular polls pause meanwhile."""
+        coordinator = _coordinator(hass, call)
+        if coordinator.capture is not None:
+            raise ServiceValidationError(f"a capture to {coordinator.capture.path} is already running")
+
+        try:
+            capture = BurstCapture(
+                coordinator.api,
+                _output_path(hass, call),
+                {**MAPPING, **coordinator.catalog},
+                call.data[ATTR_KEYS],
+                call.data[ATTR_REGISTERS],
+                call.data[ATTR_COILS],
+                call.data[ATTR_INTERVAL],
+                call.data[ATTR_DURATION],
+            )
+        except ValueError as err:
+            raise ServiceValidationError(str(err)) from err
+
+        coordinator.capture = capture
+        entry = hass.config_entries.async_get_entry(call.data[ATTR_CONFIG_ENTRY])
+        entry.async_create_background_task(hass, _async_run_capture(coordinator, capture), f"{DOMAIN} capture {capture.path.name}")
+
+        return {"path": str(capture.path), "blocks": len(capture.blocks)}
+
+    async def async_stop_burst_capture(call: ServiceCall) -> None:
+        """End the running capture."""
+        coordinator = _coordinator(hass, call)
+        if coordinator.capture is not None:
+            coordinator.capture.stop()
+
+    async def async_scan_registers(call: ServiceCall) -> ServiceResponse:
+        """Read every address of the device into a CSV file and report the unsupported ranges."""
+        coordinator = _coordinator(hass, call)
+        documented = await hass.async_add_executor_job(lambda: list(read_registers_csv()))
+        scan = RegisterScan(
+            coordinator.api,
+            _output_path(hass, call, "_scan"),
+            documented,
+            [DATA_TYPES[data_type] for data_type in call.data[ATTR_DATA_TYPE]],
+        )
+
+        try:
+            result = await scan.run()
+        except EcoforestError as err:
+            raise HomeAssistantError(f"Scan to {scan.path} failed: {err}") from err
+
+        return {"path": str(scan.path), **result._asdict()}
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_GET_REGISTER_HISTORY,
+        async_get_register_history,
+        schema=GET_REGISTER_HISTORY_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_START_BURST_CAPTURE,
+        async_start_burst_capture,
+        schema=START_BURST_CAPTURE_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_STOP_BURST_CAPTURE,
+        async_stop_burst_capture,
+        schema=STOP_BURST_CAPTURE_SCHEMA,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_SCAN_REGISTERS,
+        async_scan_registers,
+        schema=SCAN_REGISTERS_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+
+
+async def _async_run_capture(coordinator: EcoforestCoordinator, capture: BurstCapture) -> None:
+    try:
+        await capture.run()
+    except EcoforestError as err:
+        _LOGGER.error("Capture to %s stopped: %s", capture.path, err)
+    finally:
+        coordinator.capture = None
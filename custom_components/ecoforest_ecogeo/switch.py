@@ -57,9 +57,7 @@ class EcoforestSwitchEntity(EcoforestEntity, SwitchEntity):
     async def async_turn_on(self):
         """Turn on the ecoforest device."""
         await self.coordinator.api.turn_switch(self.entity_description.key, True)
-        await self.coordinator.async_request_refresh()
 
     async def async_turn_off(self):
         """Turn off the ecoforest device."""
         await self.coordinator.api.turn_switch(self.entity_description.key, False)
-        await self.coordinator.async_request_refresh()
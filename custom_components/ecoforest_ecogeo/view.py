@@ -0,0 +1,68 @@
+"""OpenMetrics endpoint serving the decoded state of the devices."""
+
+from __future__ import annotations
+
+from http import HTTPStatus
+
+from aiohttp import web
+
+from homeassistant.components.http import HomeAssistantView
+from homeassistant.const import CONF_ALIAS
+from homeassistant.core import HomeAssistant, callback
+
+from .const import CONF_OPENMETRICS, DATA_OPENMETRICS_VIEW, DOMAIN
+from .coordinator import EcoforestCoordinator
+from .overrides.openmetrics import CONTENT_TYPE, DeviceMetrics, render
+
+
+@callback
+def async_register_view(hass: HomeAssistant) -> None:
+    """Register the view once, entries with the option turned off are left out of it."""
+    if not hass.data[DOMAIN].get(DATA_OPENMETRICS_VIEW):
+        hass.http.register_view(EcoforestMetricsView())
+        hass.data[DOMAIN][DATA_OPENMETRICS_VIEW] = True
+
+
+class EcoforestMetricsView(HomeAssistantView):
+    """Render the devices with the openmetrics option as OpenMetrics text, cached until one of them polls."""
+
+    url = f"/api/{DOMAIN}/metrics"
+    name = f"api:{DOMAIN}:metrics"
+
+    def __init__(self) -> None:
+        self._key: tuple | None = None
+        self._text = ""
+
+    async def get(self, request: web.Request) -> web.Response:
+        hass: HomeAssistant = request.app["hass"]
+        coordinators = [
+            (entry, hass.data[DOMAIN][entry.entry_id])
+            for entry in hass.config_entries.async_entries(DOMAIN)
+            if entry.options.get(CONF_OPENMETRICS) and entry.entry_id in hass.data.get(DOMAIN, {})
+        ]
+        if not coordinators:
+            return self.json_message("No device serves OpenMetrics", HTTPStatus.NOT_FOUND)
+
+        # a poll or a write replaces the data, a failed poll counts in the telemetry
+        key = tuple(
+            (entry.entry_id, id(coordinator.data), coordinator.last_update_success, coordinator.api.telemetry.polls)
+            for entry, coordinator in coordinators
+        )
+        if key != self._key:
+            self._text = render(_device_metrics(entry.data.get(CONF_ALIAS), coordinator) for entry, coordinator in coordinators)
+            self._key = key
+
+        return web.Response(body=self._text.encode(), headers={"Content-Type": CONTENT_TYPE})
+
+
+def _device_metrics(alias: str | None, coordinator: EcoforestCoordinator) -> DeviceMetrics:
+    data = coordinator.data
+    return DeviceMetrics(
+        alias or (data.model_name if data else coordinator.name),
+        coordinator.last_update_success,
+        data,
+        coordinator.api.raw_values() if data else [],
+        coordinator.api.telemetry,
+        coordinator.poll_interval.total_seconds(),
+        coordinator.poll_lag,
+    )
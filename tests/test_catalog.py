@@ -0,0 +1,51 @@
+import asyncio
+
+import httpx
+
+from custom_components.ecoforest_ecogeo.overrides.api import REQUESTS, DataTypes, EcoGeoApi
+from custom_components.ecoforest_ecogeo.overrides.catalog import catalog_mapping, load_catalog
+from custom_components.ecoforest_ecogeo.overrides.transport import EasynetTransport
+from tools.easynet_simulator import EasynetSimulator
+
+
+def _polled(data_type: int) -> set[int]:
+    return {
+        address
+        for requests in REQUESTS.values()
+        for block in requests.get(data_type, [])
+        for address in range(block["address"], block["address"] + block["length"])
+    }
+
+
+def test_enabled_catalog_rows_are_unknown_until_read():
+    catalog = catalog_mapping(load_catalog())
+    polled = _polled(DataTypes.Register)
+    key, definition = next(
+        (key, definition)
+        for key, definition in catalog.items()
+        if definition["data_type"] == DataTypes.Register and definition["type"] == "int" and definition["address"] not in polled
+    )
+
+    async def run():
+        simulator = EasynetSimulator()
+        simulator.bank.registers[definition["address"]] = 123
+        client = httpx.AsyncClient(base_url="http://simulator", transport=simulator.transport())
+        api = EcoGeoApi("http://simulator", transport=EasynetTransport("http://simulator", "user", "password", 4, client=client))
+        try:
+            await api.get()
+            api.set_extra_mapping({key: definition})
+            # a write decodes the device before the new row was polled
+            written = await api.turn_switch("switch_heating", True)
+            polled = await api.get()
+            api.set_extra_mapping({})
+            api.set_extra_mapping({key: definition})
+            reenabled = await api.turn_switch("switch_heating", False)
+            return written, polled, reenabled
+        finally:
+            await api.close()
+
+    written, polled, reenabled = asyncio.run(run())
+
+    assert written.state[key] is None
+    assert polled.state[key] == 123
+    assert reenabled.state[key] is None
@@ -0,0 +1,44 @@
+from array import array
+
+from custom_components.ecoforest_ecogeo.overrides.codec import (
+    COIL_TYPECODE,
+    REGISTER_TYPECODE,
+    decode_coils,
+    decode_registers,
+    empty_space,
+)
+
+
+def test_decode_registers_is_signed():
+    assert decode_registers(["0000", "0001", "7fff", "8000", "ffff", "00FA"]).tolist() == [0, 1, 32767, -32768, -1, 250]
+
+
+def test_decode_registers_without_zero_padding():
+    assert decode_registers(["1", "ff", "fffe"]).tolist() == [1, 255, -2]
+
+
+def test_decode_registers_matches_the_word_by_word_conversion():
+    words = ["{:04x}".format(value & 0xFFFF) for value in range(-1000, 1000, 7)]
+
+    assert decode_registers(words).tolist() == [(int(word, 16) ^ 0x8000) - 0x8000 for word in words]
+
+
+def test_decode_registers_typecode():
+    assert decode_registers(["0001"]).typecode == REGISTER_TYPECODE
+    assert decode_registers([]).tolist() == []
+
+
+def test_decode_coils():
+    block = decode_coils(["0", "1", "1", "0"])
+
+    assert block.typecode == COIL_TYPECODE
+    assert block.tolist() == [0, 1, 1, 0]
+
+
+def test_decode_coils_falls_back_on_unexpected_words():
+    assert decode_coils(["1", "01", "0"]).tolist() == [1, 1, 0]
+
+
+def test_empty_space():
+    assert empty_space(REGISTER_TYPECODE, 3) == array(REGISTER_TYPECODE, [0, 0, 0])
+    assert empty_space(COIL_TYPECODE, 2) == array(COIL_TYPECODE, [0, 0])
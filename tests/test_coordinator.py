@@ -0,0 +1,149 @@
+import asyncio
+from datetime import timedelta
+
+import httpx
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.ecoforest_ecogeo import coordinator as coordinator_module
+from custom_components.ecoforest_ecogeo.const import ACTIVE_POLLING_INTERVAL, IDLE_POLLING_INTERVAL, POLLING_INTERVAL
+from custom_components.ecoforest_ecogeo.coordinator import EcoforestCoordinator
+from custom_components.ecoforest_ecogeo.overrides.api import MAPPING, EcoGeoApi, PollTiers
+from custom_components.ecoforest_ecogeo.overrides.transport import EasynetTransport
+from tools.easynet_simulator import EasynetSimulator
+
+P_BRINE = MAPPING["p_brine"]["address"]
+
+
+def _api(simulator: EasynetSimulator) -> EcoGeoApi:
+    client = httpx.AsyncClient(base_url="http://simulator", transport=simulator.transport())
+    return EcoGeoApi("http://simulator", transport=EasynetTransport("http://simulator", "user", "password", 4, client=client))
+
+
+def _run(test, tmp_path):
+    """Run test(hass, simulator, coordinator) on a coordinator polling the simulator."""
+
+    async def run():
+        hass = HomeAssistant(str(tmp_path))
+        simulator = EasynetSimulator()
+        api = _api(simulator)
+        try:
+            return await test(hass, simulator, EcoforestCoordinator(hass, api))
+        finally:
+            await api.close()
+
+    return asyncio.run(run())
+
+
+def test_changes_within_the_deadband_are_not_published(tmp_path):
+    async def test(hass, simulator, coordinator):
+        calls = []
+        coordinator.async_add_listener(lambda: calls.append("p_brine"), "p_brine")
+        coordinator.async_add_listener(lambda: calls.append("t_brine_in"), "t_brine_in")
+
+        simulator.bank.registers[P_BRINE] = 15
+        await coordinator.async_refresh()
+        first = list(calls)
+
+        # 1.5 to 1.6 bar, within the 0.15 bar deadband
+        calls.clear()
+        simulator.bank.registers[P_BRINE] = 16
+        await coordinator.async_refresh()
+        within = list(calls)
+
+        # 1.5 to 1.7 bar, compared with the last published value
+        calls.clear()
+        simulator.bank.registers[P_BRINE] = 17
+        await coordinator.async_refresh()
+        outside = list(calls)
+
+        return first, within, outside, coordinator.data.state["p_brine"]
+
+    first, within, outside, value = _run(test, tmp_path)
+
+    assert sorted(first) == ["p_brine", "t_brine_in"]
+    assert within == []
+    assert outside == ["p_brine"]
+    assert value == 1.7
+
+
+def test_only_due_tiers_are_polled(tmp_path, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(coordinator_module, "monotonic", lambda: clock[0])
+
+    async def test(hass, simulator, coordinator):
+        polled = []
+        get = coordinator.api.get
+
+        async def recording(tiers=None):
+            polled.append(sorted(tiers))
+            return await get(tiers)
+
+        coordinator.api.get = recording
+        coordinator.tier_intervals = {PollTiers.Slow: timedelta(minutes=5)}
+
+        for _ in range(12):
+            await coordinator.async_refresh()
+            clock[0] += 30
+
+        return polled
+
+    polled = _run(test, tmp_path)
+
+    slow = [index for index, tiers in enumerate(polled) if PollTiers.Slow in tiers]
+    # every 5 minutes at a 30 s poll interval
+    assert slow == [0, 10]
+    assert all(PollTiers.Fast in tiers for tiers in polled)
+    assert all(PollTiers.Static not in tiers for tiers in polled)
+
+
+def _adaptive(hass, **options) -> EcoforestCoordinator:
+    coordinator = EcoforestCoordinator(hass, EcoGeoApi("http://simulator", transport=EasynetTransport("http://simulator", "", "", 1)))
+    coordinator.apply_options(options)
+    return coordinator
+
+
+def test_poll_interval_slows_down_after_the_idle_cycles(tmp_path):
+    async def test():
+        coordinator = _adaptive(HomeAssistant(str(tmp_path)), idle_cycles=3, active_power=150)
+        intervals = []
+        for power in (200, 0, 0, 0, 0, 200):
+            coordinator._adapt_poll_interval({"power_electric": power, "alarm": 0})
+            intervals.append(coordinator.poll_interval)
+        await coordinator.api.close()
+        return intervals
+
+    assert asyncio.run(test()) == [
+        ACTIVE_POLLING_INTERVAL,
+        POLLING_INTERVAL,
+        POLLING_INTERVAL,
+        IDLE_POLLING_INTERVAL,
+        IDLE_POLLING_INTERVAL,
+        ACTIVE_POLLING_INTERVAL,
+    ]
+
+
+def test_poll_interval_does_not_flap_around_the_threshold(tmp_path):
+    async def test():
+        coordinator = _adaptive(HomeAssistant(str(tmp_path)), active_power=150, power_hysteresis=0.5, idle_cycles=1)
+        intervals = []
+        # starts at 150 W, only stops below 75 W
+        for power in (140, 150, 140, 100, 80, 74, 100, 140, 150):
+            coordinator._adapt_poll_interval({"power_electric": power, "alarm": 0})
+            intervals.append(coordinator.poll_interval)
+        await coordinator.api.close()
+        return intervals
+
+    active, idle = ACTIVE_POLLING_INTERVAL, IDLE_POLLING_INTERVAL
+    assert asyncio.run(test()) == [idle, active, active, active, active, idle, idle, idle, active]
+
+
+def test_alarm_keeps_the_poll_interval_fast(tmp_path):
+    async def test():
+        coordinator = _adaptive(HomeAssistant(str(tmp_path)), idle_cycles=1)
+        coordinator._adapt_poll_interval({"power_electric": 0, "alarm": 7})
+        interval = coordinator.poll_interval
+        await coordinator.api.close()
+        return interval
+
+    assert asyncio.run(test()) == ACTIVE_POLLING_INTERVAL
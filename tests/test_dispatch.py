@@ -0,0 +1,160 @@
+import asyncio
+
+import httpx
+import pytest
+
+from custom_components.ecoforest_ecogeo.overrides.api import MAPPING, EcoGeoApi
+from custom_components.ecoforest_ecogeo.overrides.dispatch import Preempted, Priority, RequestDispatcher
+from custom_components.ecoforest_ecogeo.overrides.transport import EasynetTransport, ModbusTransport
+from tools.easynet_simulator import EasynetSimulator
+from tools.modbus_simulator import ModbusSimulator
+
+
+async def _hold(dispatcher: RequestDispatcher, priority: int, log: list, name: str, release: asyncio.Event):
+    async def request():
+        log.append((name, "start"))
+        await release.wait()
+        log.append((name, "end"))
+        return name
+
+    return await dispatcher.run(priority, request)
+
+
+def test_dispatcher_caps_requests_in_flight():
+    async def run():
+        dispatcher = RequestDispatcher(2)
+        peak = 0
+
+        async def request():
+            nonlocal peak
+            peak = max(peak, dispatcher.in_flight)
+            await asyncio.sleep(0.01)
+
+        await asyncio.gather(*(dispatcher.run(Priority.Poll, request) for _ in range(6)))
+        return peak, dispatcher.in_flight
+
+    assert asyncio.run(run()) == (2, 0)
+
+
+def test_dispatcher_serves_writes_before_queued_polls():
+    async def run():
+        dispatcher = RequestDispatcher(1, preempt=False)
+        release = asyncio.Event()
+        log = []
+
+        first = asyncio.create_task(_hold(dispatcher, Priority.Poll, log, "poll 1", release))
+        await asyncio.sleep(0)
+        queued = [
+            asyncio.create_task(_hold(dispatcher, Priority.Poll, log, "poll 2", release)),
+            asyncio.create_task(_hold(dispatcher, Priority.Readback, log, "readback", release)),
+            asyncio.create_task(_hold(dispatcher, Priority.Write, log, "write", release)),
+        ]
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(first, *queued)
+        return [name for name, event in log if event == "start"]
+
+    assert asyncio.run(run()) == ["poll 1", "write", "readback", "poll 2"]
+
+
+def test_dispatcher_preempts_a_poll_for_a_write():
+    async def run():
+        dispatcher = RequestDispatcher(1)
+        release = asyncio.Event()
+        log = []
+
+        poll = asyncio.create_task(_hold(dispatcher, Priority.Poll, log, "poll", release))
+        await asyncio.sleep(0)
+        write = asyncio.create_task(_hold(dispatcher, Priority.Write, log, "write", release))
+        await asyncio.sleep(0)
+
+        with pytest.raises(Preempted):
+            await poll
+        release.set()
+        await write
+        return log, dispatcher.preempted, dispatcher.in_flight
+
+    log, preempted, in_flight = asyncio.run(run())
+
+    assert log == [("poll", "start"), ("write", "start"), ("write", "end")]
+    assert preempted == 1
+    assert in_flight == 0
+
+
+def test_dispatcher_cancelled_waiter_gives_its_slot_back():
+    async def run():
+        dispatcher = RequestDispatcher(1, preempt=False)
+        release = asyncio.Event()
+        log = []
+
+        first = asyncio.create_task(_hold(dispatcher, Priority.Poll, log, "first", release))
+        await asyncio.sleep(0)
+        cancelled = asyncio.create_task(_hold(dispatcher, Priority.Poll, log, "cancelled", release))
+        last = asyncio.create_task(_hold(dispatcher, Priority.Poll, log, "last", release))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        release.set()
+        await asyncio.gather(first, last)
+        return [name for name, event in log if event == "start"], dispatcher.in_flight
+
+    assert asyncio.run(run()) == (["first", "last"], 0)
+
+
+NUMBER = "number_dhw_setpoint"
+
+
+async def _write_during_poll(api: EcoGeoApi, value: float) -> tuple[float, float]:
+    """Write while a poll has the old value of the register on its way back, returns the polled and final values."""
+    await api.get()
+
+    address = MAPPING[NUMBER]["address"]
+    read = api.transport.read_registers
+    delayed = asyncio.Event()
+
+    async def slow_read(start, length):
+        reply = await read(start, length)
+        if start <= address < start + length and not delayed.is_set():
+            delayed.set()
+            await asyncio.sleep(0.5)
+        return reply
+
+    api.transport.read_registers = slow_read
+    poll = asyncio.create_task(api.get())
+    await delayed.wait()
+
+    written = await api.set_numeric_value(NUMBER, value)
+    polled = await poll
+    assert written.state[NUMBER] == value
+
+    return polled.state[NUMBER], (await api.get()).state[NUMBER]
+
+
+def test_write_during_poll_is_not_undone_easynet():
+    async def run():
+        simulator = EasynetSimulator(latency=0.05)
+        client = httpx.AsyncClient(base_url="http://simulator", transport=simulator.transport())
+        transport = EasynetTransport("http://simulator", "user", "password", 4, client=client)
+        # the poll is not cancelled by the write, its stale answer arrives after the read back
+        transport.preempt = False
+        api = EcoGeoApi("http://simulator", transport=transport)
+        try:
+            return await _write_during_poll(api, 40.0)
+        finally:
+            await api.close()
+
+    assert asyncio.run(run()) == (40.0, 40.0)
+
+
+def test_write_during_poll_is_not_undone_modbus():
+    async def run():
+        simulator = ModbusSimulator(latency=0.02)
+        server = await simulator.serve()
+        api = EcoGeoApi("127.0.0.1", transport=ModbusTransport("127.0.0.1", server.sockets[0].getsockname()[1]))
+        try:
+            return await _write_during_poll(api, 50.0)
+        finally:
+            await api.close()
+            server.close()
+            await server.wait_closed()
+
+    assert asyncio.run(run()) == (50.0, 50.0)
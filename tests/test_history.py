@@ -0,0 +1,83 @@
+from array import array
+
+from custom_components.ecoforest_ecogeo.overrides.api import REQUESTS, DataTypes
+from custom_components.ecoforest_ecogeo.overrides.codec import COIL_TYPECODE, REGISTER_TYPECODE
+from custom_components.ecoforest_ecogeo.overrides.history import HISTORY_BUDGET, BlockHistory, RegisterHistory
+
+TYPECODES = {DataTypes.Coil: COIL_TYPECODE, DataTypes.Register: REGISTER_TYPECODE}
+
+
+def _row(*values: int) -> array:
+    return array(REGISTER_TYPECODE, values)
+
+
+def test_block_history_wraps_around_oldest_first():
+    history = BlockHistory(REGISTER_TYPECODE, 2, 3)
+    for time in range(5):
+        history.append(float(time), _row(time, time * 10))
+
+    assert history.count == 3
+    assert [(time, values.tolist()) for time, values in history.rows()] == [
+        (2.0, [2, 20]),
+        (3.0, [3, 30]),
+        (4.0, [4, 40]),
+    ]
+    assert history.column(1, since=3.0) == [(3.0, 30), (4.0, 40)]
+
+
+def test_block_history_before_wrapping():
+    history = BlockHistory(REGISTER_TYPECODE, 1, 4)
+    history.append(1.0, _row(7))
+    history.append(2.0, _row(8))
+
+    assert history.column(0) == [(1.0, 7), (2.0, 8)]
+
+
+def test_history_evicts_the_oldest_reads():
+    history = RegisterHistory(TYPECODES, budget=10 * (8 + 2 * 2))
+    block = (DataTypes.Register, 100, 2)
+    history.set_blocks([block])
+    assert history.capacity == 10
+
+    for time in range(25):
+        history.append(block, float(time), _row(time, -time))
+
+    assert history.query(DataTypes.Register, 101) == [(float(time), -time) for time in range(15, 25)]
+    assert history.query(DataTypes.Register, 99) == []
+
+
+def test_set_blocks_keeps_the_newest_rows():
+    history = RegisterHistory(TYPECODES, budget=10 * (8 + 2))
+    first = (DataTypes.Register, 0, 1)
+    history.set_blocks([first])
+    for time in range(10):
+        history.append(first, float(time), _row(time))
+
+    # a second block halves the rows of each
+    history.set_blocks([first, (DataTypes.Register, 50, 1)])
+
+    assert history.capacity == 5
+    assert history.query(DataTypes.Register, 0) == [(float(time), time) for time in range(5, 10)]
+
+
+def test_budget_stays_bounded_as_blocks_are_added():
+    history = RegisterHistory(TYPECODES)
+    blocks = [
+        (data_type, block["address"], block["length"])
+        for requests in REQUESTS.values()
+        for data_type, data_type_blocks in requests.items()
+        for block in data_type_blocks
+    ]
+    blocks += [(DataTypes.Register, 5000 + 100 * index, 100) for index in range(20)]
+
+    for count in range(1, len(blocks) + 1):
+        history.set_blocks(blocks[:count])
+        for block in blocks[:count]:
+            history.append(block, float(count), array(TYPECODES[block[0]], bytes(array(TYPECODES[block[0]]).itemsize * block[2])))
+
+        assert history.nbytes <= HISTORY_BUDGET
+        assert len({block.capacity for block in history.blocks.values()}) == 1
+
+    history.set_blocks(blocks[:1])
+    assert history.nbytes <= HISTORY_BUDGET
+    assert list(history.blocks) == blocks[:1]
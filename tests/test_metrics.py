@@ -0,0 +1,98 @@
+import pytest
+
+from custom_components.ecoforest_ecogeo.overrides.metrics import MetricsEngine
+
+
+def _state(electric, heating, cooling=0):
+    return {"power_electric": electric, "power_heating": heating, "power_cooling": cooling}
+
+
+def test_energy_is_integrated_with_the_trapezoidal_rule():
+    engine = MetricsEngine()
+    engine.update(0, _state(1000, 3000))
+    values = engine.update(900, _state(2000, 5000, 1000))
+
+    # a quarter of an hour at a mean of 1500 W, 4000 W and 500 W
+    assert engine.energy["electric"] == pytest.approx(0.375)
+    assert engine.energy["heating"] == pytest.approx(1.0)
+    assert engine.energy["cooling"] == pytest.approx(0.125)
+    assert values["energy_electric"] == 0.375
+    assert values["energy_heating"] == 1.0
+    assert values["energy_cooling"] == 0.125
+
+
+def test_first_sample_has_no_window():
+    values = MetricsEngine().update(0, _state(1000, 3000))
+
+    assert values["energy_electric"] == 0
+    assert values["cop_instant"] == 3.0
+    assert values["cop_window"] is None
+    assert values["power_electric_mean"] is None
+
+
+def test_cop_instant_and_window():
+    engine = MetricsEngine()
+    engine.update(0, _state(1000, 3000))
+    values = engine.update(900, _state(2000, 5000))
+
+    assert values["cop_instant"] == 2.5
+    # 1000 Wh of heat for 375 Wh of electricity
+    assert values["cop_window"] == pytest.approx(2.67)
+    assert values["power_electric_mean"] == 1500
+    assert values["power_output_mean"] == 4000
+
+
+@pytest.mark.parametrize("electric", [0, 49])
+def test_no_cop_without_electric_power(electric):
+    engine = MetricsEngine()
+    engine.update(0, _state(electric, 0))
+    values = engine.update(600, _state(electric, 0))
+
+    assert values["cop_instant"] is None
+    assert values["cop_window"] is None
+    assert values["power_electric_mean"] == electric
+
+
+def test_gap_in_samples_is_not_integrated():
+    engine = MetricsEngine()
+    engine.update(0, _state(1000, 3000))
+    engine.update(600, _state(1000, 3000))
+    # the device was unreachable for 20 minutes
+    values = engine.update(1800, _state(3000, 9000))
+
+    assert engine.energy["electric"] == pytest.approx(1000 * 600 / 3600 / 1000)
+    assert values["cop_window"] is None
+    assert values["power_electric_mean"] is None
+
+    values = engine.update(2400, _state(3000, 9000))
+    assert engine.energy["electric"] == pytest.approx((1000 * 600 + 3000 * 600) / 3600 / 1000)
+    assert values["power_electric_mean"] == 3000
+
+
+def test_stale_or_missing_power_starts_the_integration_over():
+    engine = MetricsEngine()
+    engine.update(0, _state(1000, 3000))
+    engine.update(60, _state(1000, 3000), stale={"power_heating": 0})
+    engine.update(120, _state(None, 3000))
+    engine.update(180, _state(1000, 3000))
+
+    assert engine.energy["electric"] == 0
+
+
+def test_rolling_means_cover_the_window():
+    engine = MetricsEngine(window=3600)
+    now = 0
+    engine.update(now, _state(1000, 2000))
+    for _ in range(6):
+        now += 600
+        values = engine.update(now, _state(1000, 2000))
+    assert values["power_electric_mean"] == 1000
+    assert values["power_output_mean"] == 2000
+
+    # over an hour later only the new power is left in the window
+    for _ in range(8):
+        now += 600
+        values = engine.update(now, _state(2000, 6000))
+    assert values["power_electric_mean"] == 2000
+    assert values["power_output_mean"] == 6000
+    assert values["cop_window"] == 3.0
@@ -0,0 +1,96 @@
+import pytest
+
+from custom_components.ecoforest_ecogeo.overrides.api import MAPPING, REQUESTS, DataTypes
+from custom_components.ecoforest_ecogeo.overrides.planner import coalesce_writes, mapping_addresses, plan_blocks, plan_requests
+
+
+def _covered(blocks):
+    return {address for block in blocks for address in range(block["address"], block["address"] + block["length"])}
+
+
+def test_plan_blocks_merges_small_gaps():
+    assert plan_blocks([1, 2, 5, 10], max_gap=4) == [{"address": 1, "length": 10}]
+
+
+def test_plan_blocks_splits_large_gaps():
+    assert plan_blocks([1, 2, 10], max_gap=3) == [{"address": 1, "length": 2}, {"address": 10, "length": 1}]
+
+
+def test_plan_blocks_caps_the_length():
+    blocks = plan_blocks(range(100), max_gap=0, max_length=30)
+
+    assert [block["length"] for block in blocks] == [30, 30, 30, 10]
+    assert _covered(blocks) == set(range(100))
+
+
+def test_plan_blocks_ignores_duplicates_and_order():
+    assert plan_blocks([7, 3, 7, 5, 3], max_gap=1) == [{"address": 3, "length": 5}]
+
+
+def test_plan_blocks_without_addresses():
+    assert plan_blocks([]) == []
+
+
+def test_plan_blocks_rejects_empty_blocks():
+    with pytest.raises(ValueError):
+        plan_blocks([1], max_length=0)
+
+
+def test_mapping_addresses_collects_single_and_multi_address_entries():
+    mapping = {
+        "a": {"data_type": DataTypes.Register, "address": 5},
+        "b": {"data_type": DataTypes.Register, "addresses": [8, 9]},
+        "c": {"data_type": DataTypes.Coil, "address": 2},
+    }
+
+    assert mapping_addresses(mapping, {DataTypes.Coil: [3]}) == {
+        DataTypes.Register: {5, 8, 9},
+        DataTypes.Coil: {2, 3},
+    }
+
+
+def test_plan_requests_covers_every_mapped_address():
+    used = mapping_addresses(MAPPING)
+    planned = plan_requests(used)
+
+    for data_type, addresses in used.items():
+        assert addresses <= _covered(planned[data_type])
+
+
+def test_tiers_cover_the_mapping():
+    used = mapping_addresses(MAPPING)
+
+    for data_type, addresses in used.items():
+        covered = set()
+        for requests in REQUESTS.values():
+            covered |= _covered(requests.get(data_type, []))
+        assert addresses <= covered
+
+
+def test_coalesce_writes_merges_consecutive_addresses():
+    writes = {
+        (DataTypes.Register, 11): 3,
+        (DataTypes.Register, 10): 2,
+        (DataTypes.Register, 13): 4,
+        (DataTypes.Coil, 10): 1,
+    }
+
+    assert sorted(coalesce_writes(writes)) == sorted([
+        (DataTypes.Coil, 10, [1]),
+        (DataTypes.Register, 10, [2, 3]),
+        (DataTypes.Register, 13, [4]),
+    ])
+
+
+def test_coalesce_writes_caps_the_length():
+    writes = {(DataTypes.Register, address): address for address in range(10)}
+
+    assert coalesce_writes(writes, max_length=4) == [
+        (DataTypes.Register, 0, [0, 1, 2, 3]),
+        (DataTypes.Register, 4, [4, 5, 6, 7]),
+        (DataTypes.Register, 8, [8, 9]),
+    ]
+
+
+def test_coalesce_writes_without_writes():
+    assert coalesce_writes({}) == []
@@ -0,0 +1,194 @@
+import asyncio
+
+import httpx
+
+from custom_components.ecoforest_ecogeo.overrides import api as api_module
+from custom_components.ecoforest_ecogeo.overrides.api import ALARM_ADDRESSES, MAPPING, EcoGeoApi, PollTiers
+from custom_components.ecoforest_ecogeo.overrides.exceptions import EcoforestBackoff, EcoforestBadResponse
+from custom_components.ecoforest_ecogeo.overrides.resilience import BlockBackoff, CircuitBreaker
+from custom_components.ecoforest_ecogeo.overrides.transport import EasynetTransport
+from tools.easynet_simulator import EasynetSimulator
+
+BLOCK = (1, 0, 10)
+
+
+def test_backoff_doubles_up_to_the_maximum():
+    backoff = BlockBackoff(base=10, maximum=35)
+
+    assert [backoff.record_failure(BLOCK, 0) for _ in range(4)] == [10, 20, 35, 35]
+
+
+def test_backoff_skips_the_block_until_retry():
+    backoff = BlockBackoff(base=10, maximum=300)
+    backoff.record_failure(BLOCK, 100)
+
+    assert not backoff.due(BLOCK, 105)
+    assert backoff.due(BLOCK, 110)
+    assert backoff.due((1, 20, 10), 105)
+
+
+def test_backoff_success_resets_the_block():
+    backoff = BlockBackoff(base=10, maximum=300)
+    backoff.record_failure(BLOCK, 0)
+    backoff.record_failure(BLOCK, 10)
+    backoff.record_success(BLOCK, 1000.0)
+
+    assert backoff.due(BLOCK, 10)
+    assert backoff.stale() == {}
+    assert backoff.record_failure(BLOCK, 20) == 10
+    assert backoff.stale() == {BLOCK: 1000.0}
+
+
+def test_backoff_prune_forgets_blocks():
+    backoff = BlockBackoff()
+    backoff.record_failure(BLOCK, 0)
+    backoff.prune(set())
+
+    assert backoff.stale() == {}
+
+
+def test_breaker_opens_after_the_threshold():
+    breaker = CircuitBreaker(threshold=3, cooldown=30, max_cooldown=600)
+
+    for now in (0, 5):
+        breaker.record(4, 3, now)
+        assert not breaker.is_open
+
+    breaker.record(4, 4, 10)
+
+    assert breaker.is_open
+    assert not breaker.allow(39)
+    assert breaker.allow(40)
+
+
+def test_breaker_healthy_poll_resets_the_count():
+    breaker = CircuitBreaker(threshold=3, cooldown=30, max_cooldown=600)
+    breaker.record(4, 4, 0)
+    breaker.record(4, 4, 5)
+    breaker.record(4, 1, 10)
+    breaker.record(4, 4, 15)
+    breaker.record(4, 4, 20)
+
+    assert not breaker.is_open
+
+
+def test_breaker_failed_probe_doubles_the_cooldown():
+    breaker = CircuitBreaker(threshold=1, cooldown=30, max_cooldown=100)
+    breaker.record(2, 2, 0)
+    assert breaker.open_until == 30
+
+    breaker.record(2, 2, 30)
+    assert breaker.open_until == 90
+
+    breaker.record(2, 2, 90)
+    assert breaker.open_until == 190
+
+    breaker.record(2, 0, 190)
+    assert not breaker.is_open
+
+    breaker.record(2, 2, 200)
+    assert breaker.open_until == 230
+
+
+def test_breaker_ignores_polls_without_blocks():
+    breaker = CircuitBreaker(threshold=1, cooldown=30, max_cooldown=600)
+    breaker.record(2, 2, 0)
+
+    # every block was backed off, the breaker stays open rather than closing on nothing
+    breaker.record(0, 0, 30)
+
+    assert breaker.is_open
+    assert breaker.open_until == 30
+
+
+def test_dead_device_raises_after_max_stale_age(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(api_module, "monotonic", lambda: clock[0])
+    monkeypatch.setattr(api_module, "time", lambda: clock[0])
+
+    async def run():
+        simulator = EasynetSimulator()
+        client = httpx.AsyncClient(base_url="http://simulator", transport=simulator.transport())
+        api = EcoGeoApi(
+            "http://simulator",
+            max_stale_age=60,
+            transport=EasynetTransport("http://simulator", "user", "password", 4, client=client),
+        )
+        try:
+            await api.get()
+            simulator.error_rate = 1.0
+
+            served = []
+            for _ in range(240):
+                clock[0] += 5
+                try:
+                    # like the coordinator, the static tier is not polled again
+                    served.append((clock[0] - 1000, await api.get([PollTiers.Fast, PollTiers.Slow])))
+                except EcoforestBackoff:
+                    served.append((clock[0] - 1000, None))
+            return served
+        finally:
+            await api.close()
+
+    served = asyncio.run(run())
+
+    # the last good values are served while they are fresh enough, then every poll fails
+    assert all(device is not None and device.stale for elapsed, device in served if elapsed <= 60)
+    assert all(device is None for elapsed, device in served if elapsed > 60)
+
+
+def test_derived_values_go_stale_with_their_sources(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(api_module, "monotonic", lambda: clock[0])
+    monkeypatch.setattr(api_module, "time", lambda: clock[0])
+    power = MAPPING["power_heating"]["address"]
+    alarm = ALARM_ADDRESSES[0]
+
+    async def run():
+        simulator = EasynetSimulator()
+        simulator.bank.registers[power] = 2400
+        simulator.bank.coils[alarm] = 1
+        client = httpx.AsyncClient(base_url="http://simulator", transport=simulator.transport())
+        api = EcoGeoApi(
+            "http://simulator",
+            max_stale_age=60,
+            transport=EasynetTransport("http://simulator", "user", "password", 4, client=client),
+        )
+
+        def failing(read, address):
+            async def send(start, length):
+                if start <= address < start + length:
+                    raise EcoforestBadResponse("unreachable")
+                return await read(start, length)
+            return send
+
+        try:
+            first = await api.get()
+            api.transport.read_registers = failing(api.transport.read_registers, power)
+            api.transport.read_coils = failing(api.transport.read_coils, alarm)
+
+            clock[0] += 30
+            fresh = await api.get([PollTiers.Fast, PollTiers.Slow])
+            clock[0] += 60
+            expired = await api.get([PollTiers.Fast, PollTiers.Slow])
+            return first, fresh, expired
+        finally:
+            await api.close()
+
+    first, fresh, expired = asyncio.run(run())
+
+    assert first.state["power_output"] >= 2400
+    assert first.state["alarm"] == alarm
+    assert first.alarms_changed
+
+    assert fresh.state["power_output"] == first.state["power_output"]
+    assert fresh.stale["power_output"] == fresh.stale["power_heating"] == 1000.0
+    assert fresh.stale["alarm"] == 1000.0
+    assert alarm in fresh.alarms
+
+    assert expired.state["power_heating"] is None
+    assert expired.state["power_output"] is None
+    assert expired.state["alarm"] is None
+    assert expired.alarms == {}
+    assert not expired.alarms_changed
+    assert "power_output" not in expired.stale
@@ -0,0 +1,121 @@
+import asyncio
+import csv
+
+import httpx
+import pytest
+from pyecoforest.exceptions import EcoforestConnectionError
+
+from custom_components.ecoforest_ecogeo.overrides.api import ADDRESS_SPACE, DataTypes, EcoGeoApi
+from custom_components.ecoforest_ecogeo.overrides.exceptions import EcoforestBadResponse
+from custom_components.ecoforest_ecogeo.overrides.scan import MIN_SCAN_LENGTH, SCAN_RETRIES, RegisterScan
+from custom_components.ecoforest_ecogeo.overrides.transport import EasynetTransport
+from tools.easynet_simulator import EasynetSimulator
+
+# the device rejects reads touching these registers
+REJECTED = range(40, 48)
+
+
+def _scan(path, rejected=REJECTED, failures=None, **options):
+    """Scan the simulator through a transport rejecting the given registers.
+
+    failures maps a register to the connection errors reading it raises before it is served.
+    """
+    failures = dict(failures or {})
+
+    async def run():
+        simulator = EasynetSimulator()
+        client = httpx.AsyncClient(base_url="http://simulator", transport=simulator.transport())
+        api = EcoGeoApi(
+            "http://simulator",
+            max_concurrent_requests=1,
+            transport=EasynetTransport("http://simulator", "user", "password", 1, client=client),
+        )
+        requests = []
+        read = api.transport.read_registers
+
+        async def read_registers(address, length):
+            requests.append((address, length))
+            addresses = range(address, address + length)
+            if any(register in addresses for register in rejected):
+                raise EcoforestBadResponse("rejected")
+            for register in addresses:
+                if failures.get(register):
+                    failures[register] -= 1
+                    raise EcoforestConnectionError("timeout")
+            return await read(address, length)
+
+        api.transport.read_registers = read_registers
+        try:
+            scan = RegisterScan(api, path, data_types=[DataTypes.Register], concurrency=1, **options)
+            return await scan.run(), requests, simulator
+        finally:
+            await api.close()
+
+    return asyncio.run(run())
+
+
+def _rows(path):
+    with path.open(newline="") as file:
+        return list(csv.DictReader(file))
+
+
+def test_chunks_halve_on_rejections_and_double_on_success(tmp_path):
+    assert MIN_SCAN_LENGTH == 8, "the expected requests below assume the default minimum"
+    path = tmp_path / "scan.csv"
+    result, requests, simulator = _scan(path, max_length=32, min_length=MIN_SCAN_LENGTH, address_space={DataTypes.Register: 128})
+
+    assert requests == [
+        (0, 32),
+        # rejected, split in halves down to the minimum length
+        (32, 32),
+        (32, 16),
+        (32, 8),
+        (40, 8),
+        (48, 16),
+        # the cursor resumes after the split chunks and grows back to the maximum
+        (64, 16),
+        (80, 32),
+        (112, 16),
+    ]
+    assert result.read == {"reg": 120}
+    assert result.unsupported == [("reg", 40, 47)]
+    assert result.requests == len(requests)
+
+    rows = _rows(path)
+    assert sorted(int(row["address"]) for row in rows) == list(range(128))
+    assert {int(row["address"]) for row in rows if row["status"] == "unsupported"} == set(REJECTED)
+    assert all(int(row["raw"]) == simulator.bank.registers[int(row["address"])] for row in rows if row["status"] == "ok")
+
+
+def test_rejected_chunk_smaller_than_the_minimum_length(tmp_path):
+    result, requests, _ = _scan(tmp_path / "scan.csv", rejected=[5], max_length=16, min_length=4, address_space={DataTypes.Register: 16})
+
+    assert requests == [(0, 16), (0, 8), (0, 4), (4, 4), (8, 8)]
+    # the whole chunk of min_length is reported, not the single register
+    assert result.unsupported == [("reg", 4, 7)]
+
+
+def test_connection_errors_are_retried(tmp_path):
+    result, requests, _ = _scan(
+        tmp_path / "scan.csv",
+        rejected=[],
+        failures={20: SCAN_RETRIES},
+        max_length=16,
+        address_space={DataTypes.Register: 32},
+    )
+
+    assert requests == [(0, 16)] + [(16, 16)] * (SCAN_RETRIES + 1)
+    assert result.read == {"reg": 32}
+    assert result.unsupported == []
+
+
+def test_scan_gives_up_after_the_retries(tmp_path):
+    with pytest.raises(EcoforestConnectionError):
+        _scan(tmp_path / "scan.csv", rejected=[], failures={20: SCAN_RETRIES + 1}, max_length=16, address_space={DataTypes.Register: 32})
+
+
+def test_scan_covers_the_address_space(tmp_path):
+    result, requests, _ = _scan(tmp_path / "scan.csv", rejected=[])
+
+    assert result.read == {"reg": ADDRESS_SPACE[DataTypes.Register]}
+    assert max(address + length for address, length in requests) == ADDRESS_SPACE[DataTypes.Register]
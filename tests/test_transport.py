@@ -0,0 +1,96 @@
+import asyncio
+import struct
+
+import pytest
+
+from custom_components.ecoforest_ecogeo.overrides.exceptions import EcoforestBadResponse
+from custom_components.ecoforest_ecogeo.overrides.transport import MODBUS_UNIT_ID, ModbusTransport
+
+
+def _run(answers, requests):
+    """Run requests(transport) against a Modbus server answering with the given PDUs in turn.
+
+    Returns the result of requests and the (MBAP header, PDU) of every frame the server received.
+    """
+    answers = list(answers)
+    frames = []
+
+    async def serve(reader, writer):
+        try:
+            while True:
+                header = await reader.readexactly(7)
+                transaction, _, length, unit_id = struct.unpack(">HHHB", header)
+                frames.append((header, await reader.readexactly(length - 1)))
+                pdu = answers.pop(0)
+                writer.write(struct.pack(">HHHB", transaction, 0, len(pdu) + 1, unit_id) + pdu)
+                await writer.drain()
+        except asyncio.IncompleteReadError:
+            writer.close()
+
+    async def run():
+        server = await asyncio.start_server(serve, "127.0.0.1", 0)
+        transport = ModbusTransport("127.0.0.1", server.sockets[0].getsockname()[1])
+        try:
+            return await requests(transport)
+        finally:
+            await transport.close()
+            server.close()
+            await server.wait_closed()
+
+    return asyncio.run(run()), frames
+
+
+def test_read_coils():
+    reply, frames = _run([bytes([1, 2, 0b10100101, 0b011])], lambda transport: transport.read_coils(10, 11))
+
+    assert frames == [(struct.pack(">HHHB", 1, 0, 6, MODBUS_UNIT_ID), bytes.fromhex("01 000a 000b"))]
+    # least significant bit first
+    assert reply.values.tolist() == [1, 0, 1, 0, 0, 1, 0, 1, 1, 1, 0]
+    assert reply.sent == 12
+    assert reply.received == 7 + 4
+
+
+def test_read_registers():
+    reply, frames = _run([bytes.fromhex("03 06 0001 ffff 1234")], lambda transport: transport.read_registers(5, 3))
+
+    assert frames == [(struct.pack(">HHHB", 1, 0, 6, MODBUS_UNIT_ID), bytes.fromhex("03 0005 0003"))]
+    # big endian words, signed like the Easynet registers
+    assert reply.values.tolist() == [1, -1, 0x1234]
+
+
+def test_write_coils():
+    reply, frames = _run(
+        [bytes.fromhex("0f 0064 0009")],
+        lambda transport: transport.write_coils(100, [1, 0, 1, 1, 0, 0, 0, 0, 1]),
+    )
+
+    assert frames == [(struct.pack(">HHHB", 1, 0, 9, MODBUS_UNIT_ID), bytes.fromhex("0f 0064 0009 02 0d 01"))]
+    assert len(reply.values) == 0
+
+
+def test_write_registers():
+    _, frames = _run([bytes.fromhex("10 0011 0002")], lambda transport: transport.write_registers(17, [485, -1]))
+
+    assert frames == [(struct.pack(">HHHB", 1, 0, 11, MODBUS_UNIT_ID), bytes.fromhex("10 0011 0002 04 01e5 ffff"))]
+
+
+def test_transactions_share_the_connection():
+    async def requests(transport):
+        return [await transport.read_registers(0, 1) for _ in range(3)]
+
+    _, frames = _run([bytes.fromhex("03 02 0007")] * 3, requests)
+
+    assert [struct.unpack(">H", header[:2])[0] for header, _ in frames] == [1, 2, 3]
+
+
+def test_exception_reply_raises():
+    async def requests(transport):
+        with pytest.raises(EcoforestBadResponse, match="modbus exception 2 to function 3"):
+            await transport.read_registers(9000, 2)
+        # the connection is still usable after an exception reply
+        return await transport.read_registers(0, 1)
+
+    reply, frames = _run([bytes([0x83, 0x02]), bytes.fromhex("03 02 0007")], requests)
+
+    assert reply.values.tolist() == [7]
+    assert len(frames) == 2
@@ -0,0 +1,55 @@
+import asyncio
+
+import httpx
+
+from custom_components.ecoforest_ecogeo.overrides.api import MAPPING, EcoGeoApi
+from custom_components.ecoforest_ecogeo.overrides.transport import EasynetTransport
+from tools.easynet_simulator import EasynetSimulator
+
+
+def _api(simulator: EasynetSimulator) -> EcoGeoApi:
+    client = httpx.AsyncClient(base_url="http://simulator", transport=simulator.transport())
+    return EcoGeoApi("http://simulator", transport=EasynetTransport("http://simulator", "user", "password", 4, client=client))
+
+
+def test_writes_within_the_batch_window_share_requests():
+    async def run():
+        simulator = EasynetSimulator()
+        api = _api(simulator)
+        sent = []
+        published = []
+        api.on_written = published.append
+
+        def recording(write):
+            async def send(address, values):
+                sent.append((address, list(values)))
+                return await write(address, values)
+            return send
+
+        api.transport.write_coils = recording(api.transport.write_coils)
+        api.transport.write_registers = recording(api.transport.write_registers)
+
+        try:
+            await api.get()
+            devices = await asyncio.gather(
+                api.turn_switch("switch_heating", True),
+                api.turn_switch("switch_dhw", True),
+                api.turn_switch("switch_cooling", False),
+                api.set_numeric_value("number_dhw_setpoint", 48.5),
+            )
+        finally:
+            await api.close()
+
+        return simulator, sent, devices, published
+
+    simulator, sent, devices, published = asyncio.run(run())
+
+    # heating, dhw and cooling are coils 105 to 107
+    assert sorted(sent) == [(17, [485]), (105, [1, 1, 0])]
+    assert all(device is devices[0] for device in devices)
+    # the batch is published once, not once per write
+    assert published == [devices[0]]
+    assert devices[0].state["switch_heating"] is True
+    assert devices[0].state["switch_cooling"] is False
+    assert devices[0].state["number_dhw_setpoint"] == 48.5
+    assert simulator.bank.registers[MAPPING["number_dhw_setpoint"]["address"]] == 485
@@ -0,0 +1,132 @@
+"""Micro-benchmark of the per-poll decode.
+
+Compares what EcoGeoApi.get() used to do on every poll, a per-word dict of
+hex strings walked with a match on the MAPPING type, with the bulk block
+decoding into address indexed arrays followed by the decode plan compiled at
+import. Both start from the same list of hex words per polled block. Run from
+the repository root:
+
+    python -m tools.bench_decode [--polls 20000]
+"""
+
+import argparse
+import random
+import timeit
+
+from custom_components.ecoforest_ecogeo.overrides.api import (
+    ADDRESS_SPACE,
+    ALARM_ADDRESSES,
+    DECODE_PLAN,
+    MAPPING,
+    REQUESTS,
+    DataTypes,
+    decode,
+    parse_ecoforest_bool,
+    parse_ecoforest_int,
+)
+from custom_components.ecoforest_ecogeo.overrides.codec import (
+    COIL_TYPECODE,
+    REGISTER_TYPECODE,
+    decode_coils,
+    decode_registers,
+    empty_space,
+)
+
+
+def responses(seed: int = 0) -> list[tuple[int, int, list[str]]]:
+    """Plausible parsed responses for every polled block."""
+    rng = random.Random(seed)
+    result = []
+
+    for requests in REQUESTS.values():
+        for dt, blocks in requests.items():
+            for block in blocks:
+                if dt == DataTypes.Coil:
+                    words = ["1" if rng.random() < 0.05 else "0" for _ in range(block["length"])]
+                else:
+                    words = ["{:04x}".format(rng.randrange(-300, 600) & 0xFFFF) for _ in range(block["length"])]
+                result.append((dt, block["address"], words))
+
+    return result
+
+
+def legacy_alarm(state: dict[int, dict[int, str]]) -> int:
+    for address in ALARM_ADDRESSES:
+        if state[DataTypes.Coil][address] == "0":
+            continue
+        return address
+
+    return 0
+
+
+def legacy_decode(blocks: list[tuple[int, int, list[str]]]) -> dict:
+    """The per-word dicts and MAPPING walk EcoGeoApi.get() ran before."""
+    state = {DataTypes.Coil: {}, DataTypes.Register: {}}
+    for dt, address, words in blocks:
+        state[dt].update(zip(range(address, address + len(words)), words))
+
+    device_info = {}
+    for name, definition in MAPPING.items():
+        match definition["type"]:
+            case "int":
+                value = parse_ecoforest_int(state[definition["data_type"]][definition["address"]])
+            case "float":
+                value = parse_ecoforest_int(state[definition["data_type"]][definition["address"]]) / 10
+            case "boolean":
+                value = parse_ecoforest_bool(state[definition["data_type"]][definition["address"]])
+            case "custom":
+                continue
+            case _:
+                continue
+
+        device_info[name] = value
+
+    for name, definition in MAPPING.items():
+        if definition["entity_type"] == "temperature":
+            if device_info[name] == -999.9:
+                device_info[name] = None
+
+        if definition["type"] not in ("custom", "alarm"):
+            continue
+        if name == "alarm":
+            device_info[name] = legacy_alarm(state)
+        else:
+            device_info[name] = definition["value_fn"](device_info, state)
+
+    return device_info
+
+
+def bulk_decode(blocks: list[tuple[int, int, list[str]]], state: dict) -> dict:
+    """Bulk block decoding followed by the compiled decode plan."""
+    for dt, address, words in blocks:
+        block = decode_coils(words) if dt == DataTypes.Coil else decode_registers(words)
+        state[dt][address:address + len(block)] = block
+
+    return decode(DECODE_PLAN, state)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--polls", type=int, default=20000, help="decodes per measurement")
+    parser.add_argument("--repeat", type=int, default=5, help="measurements, the best one is reported")
+    args = parser.parse_args()
+
+    blocks = responses()
+    state = {
+        DataTypes.Coil: empty_space(COIL_TYPECODE, ADDRESS_SPACE[DataTypes.Coil]),
+        DataTypes.Register: empty_space(REGISTER_TYPECODE, ADDRESS_SPACE[DataTypes.Register]),
+    }
+    assert legacy_decode(blocks) == bulk_decode(blocks, state)
+
+    results = {
+        "MAPPING loop": min(timeit.repeat(lambda: legacy_decode(blocks), number=args.polls, repeat=args.repeat)),
+        "bulk + plan": min(timeit.repeat(lambda: bulk_decode(blocks, state), number=args.polls, repeat=args.repeat)),
+    }
+
+    for label, elapsed in results.items():
+        print("{:<14} {:8.2f} us/poll".format(label, elapsed / args.polls * 1e6))
+    print("speedup        {:8.2f}x".format(results["MAPPING loop"] / results["bulk + plan"]))
+
+
+if __name__ == "__main__":
+    main()
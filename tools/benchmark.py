@@ -0,0 +1,243 @@
+"""Benchmark suite for the poll, decode and publish cycle.
+
+Every stage is timed on its own and reports latency percentiles together with
+the peak memory allocated per iteration:
+
+    parse         EasynetTransport._parse of a full register block response
+    codec         decode_registers / decode_coils of every polled block
+    decode        decode(DECODE_PLAN, ...) of the raw arrays
+    alarm         ALARM_INDEX.active of the alarm coils
+    poll          EcoGeoApi.get() against the in process Easynet simulator
+    refresh       EcoforestCoordinator refresh plus every sensor native_value,
+                  needs Home Assistant to be installed
+
+Run from the repository root. Baselines are machine specific, save one on the
+target host and check against it afterwards, a regression exits non zero:
+
+    python -m tools.benchmark --save-baseline tools/benchmark_baseline.json
+    python -m tools.benchmark --check tools/benchmark_baseline.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from collections.abc import Awaitable, Callable
+from datetime import timedelta
+from pathlib import Path
+
+import httpx
+
+from custom_components.ecoforest_ecogeo.overrides.api import (
+    ADDRESS_SPACE,
+    ALARM_INDEX,
+    DECODE_PLAN,
+    MAPPING,
+    MAX_CONCURRENT_REQUESTS,
+    DataTypes,
+    EcoGeoApi,
+    decode,
+)
+from custom_components.ecoforest_ecogeo.overrides.codec import (
+    COIL_TYPECODE,
+    REGISTER_TYPECODE,
+    decode_coils,
+    decode_registers,
+    empty_space,
+)
+from custom_components.ecoforest_ecogeo.overrides.transport import EasynetTransport
+from tools.bench_decode import responses
+from tools.easynet_simulator import EasynetSimulator
+
+# a stage regresses when its p50 grows by more than this share of the baseline
+DEFAULT_TOLERANCE = 0.25
+# allocations are deterministic, a smaller margin is enough
+ALLOCATION_TOLERANCE = 0.10
+
+
+def _state(blocks: list[tuple[int, int, list[str]]]) -> dict:
+    state = {
+        DataTypes.Coil: empty_space(COIL_TYPECODE, ADDRESS_SPACE[DataTypes.Coil]),
+        DataTypes.Register: empty_space(REGISTER_TYPECODE, ADDRESS_SPACE[DataTypes.Register]),
+    }
+    for dt, address, words in blocks:
+        block = decode_coils(words) if dt == DataTypes.Coil else decode_registers(words)
+        state[dt][address:address + len(block)] = block
+    return state
+
+
+def _percentiles(samples: list[float]) -> dict[str, float]:
+    ordered = sorted(samples)
+
+    def pick(share: float) -> float:
+        return ordered[min(len(ordered) - 1, int(share * len(ordered)))]
+
+    return {"p50_us": pick(0.50) * 1e6, "p90_us": pick(0.90) * 1e6, "p99_us": pick(0.99) * 1e6}
+
+
+def _measure(fn: Callable[[], object], iterations: int) -> dict[str, float]:
+    fn()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    base = tracemalloc.get_traced_memory()[0]
+    fn()
+    peak = tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+
+    return {**_percentiles(samples), "alloc_bytes": peak}
+
+
+async def _measure_async(fn: Callable[[], Awaitable[object]], iterations: int) -> dict[str, float]:
+    await fn()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await fn()
+        samples.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    base = tracemalloc.get_traced_memory()[0]
+    await fn()
+    peak = tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+
+    return {**_percentiles(samples), "alloc_bytes": peak}
+
+
+def _transport(simulator: EasynetSimulator) -> EasynetTransport:
+    client = httpx.AsyncClient(base_url="http://simulator", transport=simulator.transport())
+    return EasynetTransport("http://simulator", "user", "password", MAX_CONCURRENT_REQUESTS, client=client)
+
+
+def _api(simulator: EasynetSimulator) -> EcoGeoApi:
+    return EcoGeoApi("http://simulator", transport=_transport(simulator))
+
+
+async def _poll_stage(iterations: int) -> dict[str, float]:
+    api = _api(EasynetSimulator(seed=0))
+    try:
+        return await _measure_async(api.get, iterations)
+    finally:
+        await api.close()
+
+
+async def _refresh_stage(iterations: int) -> dict[str, float] | None:
+    try:
+        from homeassistant.core import HomeAssistant
+
+        from custom_components.ecoforest_ecogeo.coordinator import EcoforestCoordinator
+        from custom_components.ecoforest_ecogeo.entity import SENSOR_TYPES
+        from custom_components.ecoforest_ecogeo.sensor import EcoforestSensor
+    except ImportError:
+        return None
+
+    hass = HomeAssistant("/tmp")
+    api = _api(EasynetSimulator(seed=0))
+    coordinator = EcoforestCoordinator(hass, api)
+    # every tier is due on every refresh
+    coordinator.tier_intervals = dict.fromkeys(coordinator.tier_intervals, timedelta(0))
+    await coordinator.async_refresh()
+    sensors = [
+        EcoforestSensor(coordinator, key, definition, None)
+        for key, definition in MAPPING.items()
+        if definition["entity_type"] in SENSOR_TYPES
+    ]
+
+    async def cycle() -> None:
+        await coordinator.async_refresh()
+        for sensor in sensors:
+            sensor.native_value
+
+    try:
+        return await _measure_async(cycle, iterations)
+    finally:
+        await api.close()
+
+
+def run(iterations: int) -> dict[str, dict[str, float]]:
+    blocks = responses()
+    state = _state(blocks)
+    register_block = next(words for dt, _, words in blocks if dt == DataTypes.Register)
+    response = "error_geo_get_reg=0\n1&{}&{}\n".format(len(register_block), "&".join(register_block))
+    parser = _transport(EasynetSimulator(seed=0))
+
+    results = {
+        "parse": _measure(lambda: parser._parse(response), iterations),
+        "codec": _measure(lambda: [
+            decode_coils(words) if dt == DataTypes.Coil else decode_registers(words) for dt, _, words in blocks
+        ], iterations),
+        "decode": _measure(lambda: decode(DECODE_PLAN, state), iterations),
+        "alarm": _measure(lambda: ALARM_INDEX.active(state[DataTypes.Coil]), iterations),
+        "poll": asyncio.run(_poll_stage(max(1, iterations // 10))),
+    }
+    asyncio.run(parser.close())
+
+    refresh = asyncio.run(_refresh_stage(max(1, iterations // 10)))
+    if refresh is not None:
+        results["refresh"] = refresh
+
+    return results
+
+
+def check(results: dict[str, dict[str, float]], baseline: dict, tolerance: float) -> list[str]:
+    """Compare with a saved baseline, returns the regressions."""
+    regressions = []
+    for stage, reference in baseline["stages"].items():
+        if stage not in results:
+            continue
+        current = results[stage]
+        if current["p50_us"] > reference["p50_us"] * (1 + tolerance):
+            regressions.append("{}: p50 {:.1f} us, baseline {:.1f} us".format(stage, current["p50_us"], reference["p50_us"]))
+        if current["alloc_bytes"] > reference["alloc_bytes"] * (1 + ALLOCATION_TOLERANCE) + 1024:
+            regressions.append("{}: {} bytes allocated, baseline {}".format(stage, current["alloc_bytes"], reference["alloc_bytes"]))
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="poll/decode/publish benchmark suite")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--save-baseline", type=Path, help="write the results as a baseline")
+    parser.add_argument("--check", type=Path, help="fail when a stage regressed against this baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--json", action="store_true", help="print the results as json")
+    args = parser.parse_args()
+
+    results = run(args.iterations)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print("{:<10} {:>10} {:>10} {:>10} {:>12}".format("stage", "p50 us", "p90 us", "p99 us", "alloc bytes"))
+        for stage, result in results.items():
+            print("{:<10} {p50_us:>10.1f} {p90_us:>10.1f} {p99_us:>10.1f} {alloc_bytes:>12}".format(stage, **result))
+
+    if args.save_baseline:
+        args.save_baseline.write_text(json.dumps({
+            "python": sys.version.split()[0],
+            "machine": platform.machine(),
+            "stages": results,
+        }, indent=2) + "\n")
+
+    if args.check:
+        regressions = check(results, json.loads(args.check.read_text()), args.tolerance)
+        if regressions:
+            print("\nREGRESSIONS against {}:".format(args.check), file=sys.stderr)
+            for regression in regressions:
+                print("  " + regression, file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
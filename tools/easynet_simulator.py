@@ -0,0 +1,289 @@
+"""Offline stand-in for the Easynet register endpoint EcoGeoApi talks to.
+
+Implements the idOperacion 2001/2002 reads and 2011/2012 writes on
+recepcion_datos_4.cgi with the same framing EcoGeoApi._parse expects: an
+"error_geo_*=0" header line followed by "dir&num&value&..." with 4 digit hex
+registers and 0/1 coils. The register bank is seeded from Registers.csv.
+
+Latency, jitter and error injection are configurable, so polling, batching
+and connection reuse changes can be benchmarked without a heat pump:
+
+    python -m tools.easynet_simulator --port 8080 --latency 0.08 --jitter 0.02
+
+or in process, without sockets, through an httpx transport:
+
+    simulator = EasynetSimulator(latency=0.05)
+    client = httpx.AsyncClient(base_url="http://sim", transport=simulator.transport())
+    api = EcoGeoApi("http://sim", transport=EasynetTransport("http://sim", "user", "password", 4, client=client))
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import base64
+import csv
+import random
+import string
+from array import array
+from pathlib import Path
+from urllib.parse import parse_qsl
+
+import httpx
+
+REGISTERS_CSV = Path(__file__).resolve().parents[1] / "custom_components" / "ecoforest_ecogeo" / "Registers.csv"
+URL_CGI = "/recepcion_datos_4.cgi"
+
+OP_GET_COIL = 2001
+OP_GET_REGISTER = 2002
+OP_SET_COIL = 2011
+OP_SET_REGISTER = 2012
+
+COIL_SPACE = 512
+REGISTER_SPACE = 6000
+
+MODEL_ADDRESS = 5323
+MODEL_ALPHABET = ["--"] + [*string.digits] + [*string.ascii_uppercase]
+
+# typical readings per unit, in engineering units
+SEED_VALUES = {"°C": 21.5, "bar": 1.5, "W": 1200, "%": 50, "rpm": 3000}
+
+RESPONSE_KEYS = {
+    OP_GET_COIL: "error_geo_get_bit",
+    OP_GET_REGISTER: "error_geo_get_reg",
+    OP_SET_COIL: "error_geo_set_bit",
+    OP_SET_REGISTER: "error_geo_set_reg",
+}
+
+
+class RegisterBank:
+    """Coil and register values of a simulated heat pump."""
+
+    def __init__(self, model: str = "ECOGEO", csv_path: Path = REGISTERS_CSV) -> None:
+        self.coils = array("B", bytes(COIL_SPACE))
+        self.registers = array("h", bytes(2 * REGISTER_SPACE))
+        # addresses documented in Registers.csv, {op: set(addresses)}
+        self.known: dict[int, set[int]] = {OP_GET_COIL: set(), OP_GET_REGISTER: set()}
+
+        self._seed(csv_path)
+        self.set_model(model)
+
+    def _seed(self, csv_path: Path) -> None:
+        with open(csv_path, encoding="utf-8", newline="") as fh:
+            for row in csv.DictReader(fh):
+                address = int(row["BMS Address"])
+
+                if row["Type"] == "Coil":
+                    self.known[OP_GET_COIL].add(address)
+                    continue
+
+                self.known[OP_GET_REGISTER].add(address)
+                value = SEED_VALUES.get(row["Units"], _midpoint(row["Range - min"], row["Range - max"]))
+                # analog registers carry one decimal
+                self.registers[address] = int(value * 10) if row["Type"] == "Analog" else int(value)
+
+    def set_model(self, model: str) -> None:
+        for offset, char in enumerate(model[:6].ljust(6, "0")):
+            self.registers[MODEL_ADDRESS + offset] = MODEL_ALPHABET.index(char)
+
+    def read(self, op: int, address: int, length: int) -> list[str]:
+        if op == OP_GET_COIL:
+            return [str(value) for value in self.coils[address:address + length]]
+
+        return ["{:04x}".format(value & 0xFFFF) for value in self.registers[address:address + length]]
+
+    def write(self, op: int, address: int, words: list[str]) -> None:
+        for offset, word in enumerate(words):
+            if op == OP_SET_COIL:
+                self.coils[address + offset] = int(word) & 1
+            else:
+                self.registers[address + offset] = (int(word, 16) ^ 0x8000) - 0x8000
+
+
+def _midpoint(low: str, high: str) -> float:
+    try:
+        return (float(low) + float(high)) / 2
+    except ValueError:
+        return 0
+
+
+class EasynetSimulator:
+    """Easynet CGI behaviour with configurable latency, jitter and failures.
+
+    error_rate answers with a non zero error_geo_* header, http_error_rate with
+    HTTP 500. max_parallel makes requests beyond that many in flight fail like a
+    controller that can't handle overlapping requests, 0 disables the check.
+    """
+
+    def __init__(
+        self,
+        bank: RegisterBank | None = None,
+        *,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        http_error_rate: float = 0.0,
+        max_parallel: int = 0,
+        strict: bool = False,
+        credentials: tuple[str, str] | None = None,
+        seed: int | None = None,
+    ) -> None:
+        self.bank = bank or RegisterBank()
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.http_error_rate = http_error_rate
+        self.max_parallel = max_parallel
+        # reject reads touching addresses that are not in Registers.csv
+        self.strict = strict
+        self.credentials = credentials
+        self._random = random.Random(seed)
+        self._in_flight = 0
+        self.requests = 0
+
+    async def handle(self, form: list[tuple[str, str]], authorization: str | None = None) -> tuple[int, str]:
+        """Answer one CGI request, returns (http status, body)."""
+        self.requests += 1
+
+        if self.credentials is not None and authorization != _basic_auth(*self.credentials):
+            return 401, "Unauthorized"
+
+        self._in_flight += 1
+        try:
+            overlapping = self.max_parallel and self._in_flight > self.max_parallel
+            delay = self.latency + self._random.uniform(-self.jitter, self.jitter)
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            if self._random.random() < self.http_error_rate:
+                return 500, "Internal Server Error"
+
+            return 200, self._answer(form, overlapping or self._random.random() < self.error_rate)
+        finally:
+            self._in_flight -= 1
+
+    def _answer(self, form: list[tuple[str, str]], fail: bool) -> str:
+        fields = dict(form[:3])
+        op = int(fields.get("idOperacion", 0))
+        if op not in RESPONSE_KEYS:
+            return "error_operacion=1\n"
+
+        address = int(fields["dir"])
+        length = int(fields["num"])
+        key = RESPONSE_KEYS[op]
+        space = COIL_SPACE if op in (OP_GET_COIL, OP_SET_COIL) else REGISTER_SPACE
+
+        if fail or address < 0 or length < 1 or address + length > space:
+            return "{}=1\n".format(key)
+
+        if op in (OP_SET_COIL, OP_SET_REGISTER):
+            words = [word for word, _ in form[3:3 + length]]
+            if len(words) != length:
+                return "{}=1\n".format(key)
+            self.bank.write(op, address, words)
+        else:
+            if self.strict and not set(range(address, address + length)) <= self.bank.known[op]:
+                return "{}=1\n".format(key)
+            words = self.bank.read(op, address, length)
+
+        return "{}=0\n{}&{}&{}\n".format(key, address, length, "&".join(words))
+
+    def transport(self) -> httpx.AsyncBaseTransport:
+        """httpx transport answering from the simulator without opening sockets."""
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            status, body = await self.handle(
+                parse_qsl(request.content.decode()), request.headers.get("authorization")
+            )
+            return httpx.Response(status, text=body)
+
+        return httpx.MockTransport(handler)
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 0) -> asyncio.Server:
+        """Start a keep-alive capable HTTP/1.1 server, port 0 picks a free one."""
+        return await asyncio.start_server(self._serve_connection, host, port)
+
+    async def _serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+
+                headers = {}
+                while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+
+                if method != "POST" or path.split("?")[0] != URL_CGI:
+                    status, text = 404, "Not Found"
+                else:
+                    status, text = await self.handle(parse_qsl(body.decode()), headers.get("authorization"))
+
+                keep_alive = headers.get("connection", "").lower() != "close"
+                payload = text.encode()
+                writer.write(
+                    "HTTP/1.1 {} {}\r\nContent-Type: text/plain\r\nContent-Length: {}\r\nConnection: {}\r\n\r\n".format(
+                        status, "OK" if status == 200 else "Error", len(payload), "keep-alive" if keep_alive else "close"
+                    ).encode() + payload
+                )
+                await writer.drain()
+
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+def _basic_auth(user: str, password: str) -> str:
+    return "Basic " + base64.b64encode("{}:{}".format(user, password).encode()).decode()
+
+
+async def _main(args: argparse.Namespace) -> None:
+    simulator = EasynetSimulator(
+        RegisterBank(model=args.model),
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        http_error_rate=args.http_error_rate,
+        max_parallel=args.max_parallel,
+        strict=args.strict,
+        credentials=(args.username, args.password) if args.username else None,
+        seed=args.seed,
+    )
+    server = await simulator.serve(args.host, args.port)
+    for sock in server.sockets:
+        print("Easynet simulator listening on http://{}:{}/".format(*sock.getsockname()[:2]))
+
+    async with server:
+        await server.serve_forever()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Easynet register endpoint simulator")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--model", default="ECOGEO", help="model name served at the model address")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every request")
+    parser.add_argument("--jitter", type=float, default=0.0, help="+/- seconds of random latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with an error header")
+    parser.add_argument("--http-error-rate", type=float, default=0.0, help="share of requests answered with HTTP 500")
+    parser.add_argument("--max-parallel", type=int, default=0, help="fail requests beyond this many in flight")
+    parser.add_argument("--strict", action="store_true", help="fail reads of addresses missing from Registers.csv")
+    parser.add_argument("--username", help="require basic auth")
+    parser.add_argument("--password", default="")
+    parser.add_argument("--seed", type=int, help="random seed for jitter and error injection")
+
+    try:
+        asyncio.run(_main(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
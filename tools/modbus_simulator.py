@@ -0,0 +1,159 @@
+"""Offline stand-in for the Modbus TCP server of the heat pump controller.
+
+Serves function codes 1 and 3 (read coils, read holding registers) and 15 and
+16 (write multiple coils, write multiple registers) on the same register bank
+as the Easynet simulator, seeded from Registers.csv, so both transports of
+EcoGeoApi can be compared on the same values:
+
+    python -m tools.modbus_simulator --port 5020 --latency 0.005
+
+and point the integration, or an api built in process, at it:
+
+    api = EcoGeoApi("127.0.0.1", transport=ModbusTransport("127.0.0.1", 5020))
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import struct
+import sys
+from array import array
+
+from tools.easynet_simulator import COIL_SPACE, OP_GET_COIL, OP_GET_REGISTER, REGISTER_SPACE, RegisterBank
+
+FC_READ_COILS = 1
+FC_READ_HOLDING_REGISTERS = 3
+FC_WRITE_MULTIPLE_COILS = 15
+FC_WRITE_MULTIPLE_REGISTERS = 16
+
+ILLEGAL_FUNCTION = 1
+ILLEGAL_DATA_ADDRESS = 2
+ILLEGAL_DATA_VALUE = 3
+
+# most values a single request may carry, from the Modbus application protocol
+MAX_READ = {FC_READ_COILS: 2000, FC_READ_HOLDING_REGISTERS: 125}
+MAX_WRITE = {FC_WRITE_MULTIPLE_COILS: 1968, FC_WRITE_MULTIPLE_REGISTERS: 123}
+
+_LITTLE_ENDIAN = sys.byteorder == "little"
+
+
+class ModbusSimulator:
+    """Modbus TCP server answering from a RegisterBank.
+
+    strict rejects reads touching addresses missing from Registers.csv with an
+    illegal data address exception, like a controller that doesn't serve them.
+    """
+
+    def __init__(self, bank: RegisterBank | None = None, *, latency: float = 0.0, strict: bool = False) -> None:
+        self.bank = bank or RegisterBank()
+        self.latency = latency
+        self.strict = strict
+        self.requests = 0
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 0) -> asyncio.Server:
+        """Start the server, port 0 picks a free one."""
+        return await asyncio.start_server(self._serve_connection, host, port)
+
+    async def _serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                transaction, protocol, length, unit = struct.unpack(">HHHB", await reader.readexactly(7))
+                pdu = await reader.readexactly(length - 1)
+                self.requests += 1
+
+                if self.latency > 0:
+                    await asyncio.sleep(self.latency)
+
+                answer = self.answer(pdu)
+                writer.write(struct.pack(">HHHB", transaction, protocol, len(answer) + 1, unit) + answer)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    def answer(self, pdu: bytes) -> bytes:
+        """Answer one request PDU, function code first."""
+        function = pdu[0]
+
+        if function in MAX_READ:
+            if len(pdu) != 5:
+                return _exception(function, ILLEGAL_DATA_VALUE)
+            address, count = struct.unpack(">HH", pdu[1:5])
+            coils = function == FC_READ_COILS
+            if not 1 <= count <= MAX_READ[function]:
+                return _exception(function, ILLEGAL_DATA_VALUE)
+            if address + count > (COIL_SPACE if coils else REGISTER_SPACE) or (
+                self.strict and not set(range(address, address + count)) <= self.bank.known[OP_GET_COIL if coils else OP_GET_REGISTER]
+            ):
+                return _exception(function, ILLEGAL_DATA_ADDRESS)
+
+            if coils:
+                data = _pack_bits(self.bank.coils[address:address + count])
+            else:
+                words = self.bank.registers[address:address + count]
+                if _LITTLE_ENDIAN:
+                    words.byteswap()
+                data = words.tobytes()
+            return bytes([function, len(data)]) + data
+
+        if function in MAX_WRITE:
+            if len(pdu) < 6:
+                return _exception(function, ILLEGAL_DATA_VALUE)
+            address, count, size = struct.unpack(">HHB", pdu[1:6])
+            data = pdu[6:]
+            coils = function == FC_WRITE_MULTIPLE_COILS
+            if not 1 <= count <= MAX_WRITE[function] or size != len(data) or size != ((count + 7) // 8 if coils else 2 * count):
+                return _exception(function, ILLEGAL_DATA_VALUE)
+            if address + count > (COIL_SPACE if coils else REGISTER_SPACE):
+                return _exception(function, ILLEGAL_DATA_ADDRESS)
+
+            if coils:
+                for offset in range(count):
+                    self.bank.coils[address + offset] = (data[offset >> 3] >> (offset & 7)) & 1
+            else:
+                words = array("h", data)
+                if _LITTLE_ENDIAN:
+                    words.byteswap()
+                self.bank.registers[address:address + count] = words
+            return struct.pack(">BHH", function, address, count)
+
+        return _exception(function, ILLEGAL_FUNCTION)
+
+
+def _pack_bits(values: array) -> bytes:
+    bits = bytearray((len(values) + 7) // 8)
+    for index, value in enumerate(values):
+        if value:
+            bits[index >> 3] |= 1 << (index & 7)
+    return bytes(bits)
+
+
+def _exception(function: int, code: int) -> bytes:
+    return bytes([function | 0x80, code])
+
+
+async def _main(args: argparse.Namespace) -> None:
+    simulator = ModbusSimulator(RegisterBank(model=args.model), latency=args.latency, strict=args.strict)
+    server = await simulator.serve(args.host, args.port)
+    for sock in server.sockets:
+        print("Modbus simulator listening on {}:{}".format(*sock.getsockname()[:2]))
+
+    async with server:
+        await server.serve_forever()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Modbus TCP heat pump simulator")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5020)
+    parser.add_argument("--model", default="ECOGEO", help="model name served at the model address")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every request")
+    parser.add_argument("--strict", action="store_true", help="fail reads of addresses missing from Registers.csv")
+
+    asyncio.run(_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Dump every coil and register address of a heat pump to a CSV file.
+
+The command line counterpart of the scan_registers service, for working out
+which addresses a model serves without Home Assistant running. Run from the
+repository root:
+
+    python -m tools.register_scan http://192.168.1.200/ SERIAL PASSWORD --output scan.csv
+
+Point it at the simulator (python -m tools.easynet_simulator --strict) to try
+it out without a heat pump.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+from pathlib import Path
+
+from custom_components.ecoforest_ecogeo.overrides.api import ADDRESS_SPACE, EcoGeoApi, DataTypes
+from custom_components.ecoforest_ecogeo.overrides.catalog import read_registers_csv
+from custom_components.ecoforest_ecogeo.overrides.scan import SCAN_CONCURRENCY, RegisterScan
+
+DATA_TYPES = {"register": DataTypes.Register, "coil": DataTypes.Coil}
+
+
+async def _main(args: argparse.Namespace) -> None:
+    api = EcoGeoApi(args.host, args.username, args.password, max_concurrent_requests=args.concurrency)
+    try:
+        result = await RegisterScan(
+            api,
+            args.output,
+            read_registers_csv(),
+            [DATA_TYPES[data_type] for data_type in args.types],
+            concurrency=args.concurrency,
+            address_space={DataTypes.Register: args.registers, DataTypes.Coil: args.coils},
+        ).run()
+    finally:
+        await api.close()
+
+    print("read {} in {} requests and {} s to {}".format(
+        ", ".join("{} {}".format(count, data_type) for data_type, count in result.read.items()),
+        result.requests,
+        result.seconds,
+        args.output,
+    ))
+    for data_type, first, last in result.unsupported:
+        print("unsupported {} {}".format(data_type, first if first == last else "{}-{}".format(first, last)))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Easynet register scan")
+    parser.add_argument("host", help="Easynet URL, e.g. http://192.168.1.200/")
+    parser.add_argument("username", help="heat pump serial number")
+    parser.add_argument("password")
+    parser.add_argument("--output", type=Path, default=Path("scan.csv"))
+    parser.add_argument("--types", nargs="+", choices=list(DATA_TYPES), default=list(DATA_TYPES))
+    parser.add_argument("--registers", type=int, default=ADDRESS_SPACE[DataTypes.Register], help="registers scanned from 0")
+    parser.add_argument("--coils", type=int, default=ADDRESS_SPACE[DataTypes.Coil], help="coils scanned from 0")
+    parser.add_argument("--concurrency", type=int, default=SCAN_CONCURRENCY, help="requests in flight")
+
+    asyncio.run(_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()